@@ -0,0 +1,36 @@
+"""Index merma_events for keyset pagination
+
+Revision ID: 20261019_0018
+Revises: 20261019_0017
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0018"
+down_revision: Union[str, None] = "20261019_0017"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_merma_events_detected_at_id"
+
+
+def _has_index(bind, table: str, name: str) -> bool:
+    inspector = sa.inspect(bind)
+    return any(index["name"] == name for index in inspector.get_indexes(table))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_index(bind, "merma_events", INDEX_NAME):
+        op.create_index(INDEX_NAME, "merma_events", ["detected_at", "id"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_index(bind, "merma_events", INDEX_NAME):
+        op.drop_index(INDEX_NAME, table_name="merma_events")
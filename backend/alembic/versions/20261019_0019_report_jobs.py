@@ -0,0 +1,79 @@
+"""Add report jobs queue
+
+Revision ID: 20261019_0019
+Revises: 20261019_0018
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0019"
+down_revision: Union[str, None] = "20261019_0018"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1
+                FROM pg_type t
+                JOIN pg_namespace n ON n.oid = t.typnamespace
+                WHERE n.nspname = 'public' AND t.typname = 'reportjobstatus'
+            ) THEN
+                CREATE TYPE reportjobstatus AS ENUM ('pending', 'running', 'completed', 'failed');
+            END IF;
+        END$$;
+        """
+    )
+    status_enum = postgresql.ENUM(name="reportjobstatus", create_type=False)
+
+    if not insp.has_table("report_jobs"):
+        op.create_table(
+            "report_jobs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("report", sa.String(length=64), nullable=False),
+            sa.Column("format", sa.String(length=16), nullable=False),
+            sa.Column("params", sa.JSON(), nullable=False),
+            sa.Column("params_hash", sa.String(length=64), nullable=False),
+            sa.Column("status", status_enum, nullable=True),
+            sa.Column("result_path", sa.String(length=500), nullable=True),
+            sa.Column("row_count", sa.Integer(), nullable=True),
+            sa.Column("error", sa.String(length=1000), nullable=True),
+            sa.Column("requested_by_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_report_jobs_params_hash", "report_jobs", ["params_hash"])
+        op.create_index("ix_report_jobs_status_id", "report_jobs", ["status", "id"])
+        op.create_index(
+            "uq_report_jobs_active_params_hash",
+            "report_jobs",
+            ["params_hash"],
+            unique=True,
+            postgresql_where=sa.text("status IN ('pending', 'running')"),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if insp.has_table("report_jobs"):
+        op.drop_index("uq_report_jobs_active_params_hash", table_name="report_jobs")
+        op.drop_index("ix_report_jobs_status_id", table_name="report_jobs")
+        op.drop_index("ix_report_jobs_params_hash", table_name="report_jobs")
+        op.drop_table("report_jobs")
+    op.execute("DROP TYPE IF EXISTS reportjobstatus")
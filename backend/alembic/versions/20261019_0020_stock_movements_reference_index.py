@@ -0,0 +1,36 @@
+"""Index stock_movements by reference
+
+Revision ID: 20261019_0020
+Revises: 20261019_0019
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0020"
+down_revision: Union[str, None] = "20261019_0019"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_stock_movements_reference"
+
+
+def _has_index(bind, table: str, name: str) -> bool:
+    inspector = sa.inspect(bind)
+    return any(index["name"] == name for index in inspector.get_indexes(table))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_index(bind, "stock_movements", INDEX_NAME):
+        op.create_index(INDEX_NAME, "stock_movements", ["reference"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_index(bind, "stock_movements", INDEX_NAME):
+        op.drop_index(INDEX_NAME, table_name="stock_movements")
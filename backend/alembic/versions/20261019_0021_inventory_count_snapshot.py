@@ -0,0 +1,38 @@
+"""Add inventory count snapshot mark and expected quantity
+
+Revision ID: 20261019_0021
+Revises: 20261019_0020
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0021"
+down_revision: Union[str, None] = "20261019_0020"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(bind, table: str, column: str) -> bool:
+    inspector = sa.inspect(bind)
+    return any(item["name"] == column for item in inspector.get_columns(table))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_column(bind, "inventory_counts", "snapshot_movement_id"):
+        op.add_column("inventory_counts", sa.Column("snapshot_movement_id", sa.Integer(), nullable=True))
+    if not _has_column(bind, "inventory_count_items", "expected_quantity"):
+        op.add_column("inventory_count_items", sa.Column("expected_quantity", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_column(bind, "inventory_count_items", "expected_quantity"):
+        op.drop_column("inventory_count_items", "expected_quantity")
+    if _has_column(bind, "inventory_counts", "snapshot_movement_id"):
+        op.drop_column("inventory_counts", "snapshot_movement_id")
@@ -0,0 +1,52 @@
+"""Add lot_sequences counter and backfill it from production_lots
+
+Revision ID: 20261019_0022
+Revises: 20261019_0021
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0022"
+down_revision: Union[str, None] = "20261019_0021"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(bind, table: str) -> bool:
+    return sa.inspect(bind).has_table(table)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_table(bind, "lot_sequences"):
+        op.create_table(
+            "lot_sequences",
+            sa.Column("produced_at", sa.Date(), nullable=False),
+            sa.Column("production_line_id", sa.Integer(), sa.ForeignKey("production_lines.id"), nullable=False),
+            sa.Column("sku_id", sa.Integer(), sa.ForeignKey("skus.id"), nullable=False),
+            sa.Column("last_value", sa.Integer(), nullable=False, server_default="0"),
+            sa.PrimaryKeyConstraint("produced_at", "production_line_id", "sku_id"),
+        )
+    # Mismo criterio que la generación anterior: la secuencia es el último segmento numérico del código.
+    op.execute(
+        """
+        INSERT INTO lot_sequences (produced_at, production_line_id, sku_id, last_value)
+        SELECT produced_at, production_line_id, sku_id, MAX(CAST(substring(lot_code FROM '-([0-9]+)$') AS INTEGER))
+        FROM production_lots
+        WHERE production_line_id IS NOT NULL AND lot_code ~ '-[0-9]+$'
+        GROUP BY produced_at, production_line_id, sku_id
+        ON CONFLICT (produced_at, production_line_id, sku_id)
+        DO UPDATE SET last_value = GREATEST(lot_sequences.last_value, EXCLUDED.last_value)
+        """
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_table(bind, "lot_sequences"):
+        op.drop_table("lot_sequences")
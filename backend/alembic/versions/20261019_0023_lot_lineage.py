@@ -0,0 +1,70 @@
+"""Add lot_lineage edges and backfill them from stock movements
+
+Revision ID: 20261019_0023
+Revises: 20261019_0022
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0023"
+down_revision: Union[str, None] = "20261019_0022"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(bind, table: str) -> bool:
+    return sa.inspect(bind).has_table(table)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if _has_table(bind, "lot_lineage"):
+        return
+    op.create_table(
+        "lot_lineage",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("parent_lot_id", sa.Integer(), sa.ForeignKey("production_lots.id"), nullable=False),
+        sa.Column("child_lot_id", sa.Integer(), sa.ForeignKey("production_lots.id"), nullable=True),
+        sa.Column("remito_id", sa.Integer(), sa.ForeignKey("remitos.id"), nullable=True),
+        sa.Column("remito_item_id", sa.Integer(), sa.ForeignKey("remito_items.id"), nullable=True),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("stock_movement_id", sa.Integer(), sa.ForeignKey("stock_movements.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.CheckConstraint("child_lot_id IS NOT NULL OR remito_id IS NOT NULL", name="ck_lot_lineage_has_target"),
+    )
+    op.create_index("ix_lot_lineage_parent_lot_id", "lot_lineage", ["parent_lot_id"])
+    op.create_index("ix_lot_lineage_child_lot_id", "lot_lineage", ["child_lot_id"])
+    op.create_index("ix_lot_lineage_remito_id", "lot_lineage", ["remito_id"])
+
+    # Consumos de receta: sin referencia explícita, la producción usa el código del lote producido como referencia.
+    op.execute(
+        """
+        INSERT INTO lot_lineage (parent_lot_id, child_lot_id, quantity, stock_movement_id, created_at)
+        SELECT m.production_lot_id, produced.id, -m.quantity, m.id, m.created_at
+        FROM stock_movements m
+        JOIN stock_movement_types t ON t.id = m.movement_type_id AND t.code = 'CONSUMPTION'
+        JOIN production_lots produced ON produced.lot_code = m.reference
+        WHERE m.production_lot_id IS NOT NULL AND produced.id <> m.production_lot_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO lot_lineage (parent_lot_id, remito_id, remito_item_id, quantity, stock_movement_id, created_at)
+        SELECT m.production_lot_id, r.id, ri.id, -m.quantity, m.id, m.created_at
+        FROM stock_movements m
+        JOIN remitos r ON r.id = m.reference_id
+        LEFT JOIN remito_items ri ON ri.id = m.reference_item_id AND ri.remito_id = r.id
+        WHERE m.reference_type = 'REMITO' AND m.quantity < 0 AND m.production_lot_id IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_table(bind, "lot_lineage"):
+        op.drop_table("lot_lineage")
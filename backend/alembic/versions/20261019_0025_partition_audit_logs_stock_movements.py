@@ -0,0 +1,176 @@
+"""Partition audit_logs and stock_movements by month
+
+Revision ID: 20261019_0025
+Revises: 20261019_0024
+Create Date: 2026-10-19 00:00:00.000000
+
+Postgres no admite claves foráneas hacia una tabla particionada salvo que incluyan la clave de partición, así que
+las referencias a stock_movements.id (ítems de compra, conteos, mermas, linaje) quedan como columnas indexadas
+sin FK en la base; `archive_partitions` las vacía cuando archiva los movimientos a los que apuntaban.
+"""
+from datetime import date
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0025"
+down_revision: Union[str, None] = "20261019_0024"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONED_TABLES = {"audit_logs": "created_at", "stock_movements": "movement_date"}
+MONTHS_AHEAD = 3
+
+
+def _is_partitioned(bind, table: str) -> bool:
+    return bool(
+        bind.execute(
+            sa.text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"), {"table": table}
+        ).scalar()
+    )
+
+
+def _add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _referencing_foreign_keys(inspector, table: str) -> list[tuple[str, dict]]:
+    return [
+        (other, foreign_key)
+        for other in inspector.get_table_names()
+        for foreign_key in inspector.get_foreign_keys(other)
+        if foreign_key["referred_table"] == table and other != table
+    ]
+
+
+def _index_definitions(bind, table: str) -> list[tuple[str, str]]:
+    """Índices que no respaldan la PK ni una restricción, con su definición completa (método y WHERE incluidos)."""
+    rows = bind.execute(
+        sa.text(
+            """
+            SELECT i.relname, pg_get_indexdef(i.oid)
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = to_regclass(:table)
+              AND NOT x.indisprimary
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+            """
+        ),
+        {"table": table},
+    ).all()
+    # Los índices de una tabla particionada se definen "ON ONLY"; al recrearlos se aplican a toda la tabla.
+    return [(name, definition.replace(" ON ONLY ", " ON ", 1)) for name, definition in rows]
+
+
+def _with_partition_key(definition: str, partition_key: str) -> str:
+    """Postgres exige que los índices únicos de una tabla particionada incluyan la clave de partición."""
+    if not definition.startswith("CREATE UNIQUE INDEX"):
+        return definition
+    opening = definition.index("(", definition.index(" USING "))
+    depth = 0
+    for closing in range(opening, len(definition)):
+        depth += {"(": 1, ")": -1}.get(definition[closing], 0)
+        if depth == 0:
+            break
+    columns = [column.strip() for column in definition[opening + 1 : closing].split(",")]
+    if partition_key in columns:
+        return definition
+    return f"{definition[:closing]}, {partition_key}{definition[closing:]}"
+
+
+def _swap_table(bind, table: str, partition_key: str | None) -> None:
+    """Reconstruye la tabla (particionada si hay clave) copiando datos, índices, restricciones únicas, FKs salientes
+    y la secuencia del id."""
+    inspector = sa.inspect(bind)
+    indexes = _index_definitions(bind, table)
+    unique_constraints = inspector.get_unique_constraints(table)
+    foreign_keys = inspector.get_foreign_keys(table)
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+    legacy = f"{table}_legacy"
+
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey")
+    for name, _ in indexes:
+        op.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:50]}_legacy"')
+    for constraint in unique_constraints:
+        name = constraint["name"]
+        op.execute(f'ALTER TABLE {legacy} RENAME CONSTRAINT "{name}" TO "{name[:50]}_legacy"')
+
+    if partition_key:
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({partition_key})"
+        )
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {partition_key})")
+        first = bind.execute(sa.text(f"SELECT min({partition_key}) FROM {legacy}")).scalar() or date.today()
+        month = date(first.year, first.month, 1)
+        last = _add_months(date.today(), MONTHS_AHEAD)
+        while month <= last:
+            following = _add_months(month, 1)
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+            )
+            month = following
+        # Red de seguridad para fechas fuera de rango; `ensure_partitions` reubica sus filas al crear cada mes.
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    else:
+        op.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+
+    op.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+    op.execute(f"DROP TABLE {legacy}")
+
+    for _, definition in indexes:
+        op.execute(_with_partition_key(definition, partition_key) if partition_key else definition)
+    for constraint in unique_constraints:
+        columns = list(constraint["column_names"])
+        if partition_key and partition_key not in columns:
+            columns.append(partition_key)
+        op.create_unique_constraint(constraint["name"], table, columns)
+    for foreign_key in foreign_keys:
+        op.create_foreign_key(
+            foreign_key["name"],
+            table,
+            foreign_key["referred_table"],
+            foreign_key["constrained_columns"],
+            foreign_key["referred_columns"],
+        )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for table, partition_key in PARTITIONED_TABLES.items():
+        if _is_partitioned(bind, table):
+            continue
+        for other, foreign_key in _referencing_foreign_keys(sa.inspect(bind), table):
+            op.drop_constraint(foreign_key["name"], other, type_="foreignkey")
+            column = foreign_key["constrained_columns"][0]
+            if not any(index["column_names"] == [column] for index in sa.inspect(bind).get_indexes(other)):
+                op.create_index(f"ix_{other}_{column}", other, [column])
+        _swap_table(bind, table, partition_key)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table in PARTITIONED_TABLES:
+        if not _is_partitioned(bind, table):
+            continue
+        _swap_table(bind, table, None)
+
+    # Restituye las FKs que apuntaban a stock_movements.id.
+    inspector = sa.inspect(bind)
+    for other in ("purchase_receipt_items", "inventory_count_items", "merma_events", "lot_lineage"):
+        if not inspector.has_table(other):
+            continue
+        if any(fk["referred_table"] == "stock_movements" for fk in inspector.get_foreign_keys(other)):
+            continue
+        op.create_foreign_key(
+            f"{other}_stock_movement_id_fkey", other, "stock_movements", ["stock_movement_id"], ["id"]
+        )
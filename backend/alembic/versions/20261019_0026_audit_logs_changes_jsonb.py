@@ -0,0 +1,61 @@
+"""Store audit_logs.changes as JSONB with a containment index
+
+Revision ID: 20261019_0026
+Revises: 20261019_0025
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0026"
+down_revision: Union[str, None] = "20261019_0025"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHANGES_INDEX = "ix_audit_logs_changes"
+CURSOR_INDEX = "ix_audit_logs_created_at_id"
+
+
+def _has_index(bind, table: str, name: str) -> bool:
+    inspector = sa.inspect(bind)
+    return any(index["name"] == name for index in inspector.get_indexes(table))
+
+
+def _column_type(bind, table: str, column: str) -> str:
+    return bind.execute(
+        sa.text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+        ),
+        {"table": table, "column": column},
+    ).scalar()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if _column_type(bind, "audit_logs", "changes") != "jsonb":
+        op.execute("ALTER TABLE audit_logs ALTER COLUMN changes TYPE jsonb USING changes::jsonb")
+    if not _has_index(bind, "audit_logs", CHANGES_INDEX):
+        op.create_index(
+            CHANGES_INDEX,
+            "audit_logs",
+            ["changes"],
+            postgresql_using="gin",
+            postgresql_ops={"changes": "jsonb_path_ops"},
+        )
+    if not _has_index(bind, "audit_logs", CURSOR_INDEX):
+        op.create_index(CURSOR_INDEX, "audit_logs", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_index(bind, "audit_logs", CURSOR_INDEX):
+        op.drop_index(CURSOR_INDEX, table_name="audit_logs")
+    if _has_index(bind, "audit_logs", CHANGES_INDEX):
+        op.drop_index(CHANGES_INDEX, table_name="audit_logs")
+    if _column_type(bind, "audit_logs", "changes") == "jsonb":
+        op.execute("ALTER TABLE audit_logs ALTER COLUMN changes TYPE json USING changes::json")
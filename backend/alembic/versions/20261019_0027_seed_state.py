@@ -0,0 +1,38 @@
+"""Add seed_state to skip unchanged seeds
+
+Revision ID: 20261019_0027
+Revises: 20261019_0026
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0027"
+down_revision: Union[str, None] = "20261019_0026"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(bind, name: str) -> bool:
+    return sa.inspect(bind).has_table(name)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_table(bind, "seed_state"):
+        op.create_table(
+            "seed_state",
+            sa.Column("name", sa.String(length=50), primary_key=True),
+            sa.Column("content_hash", sa.String(length=64), nullable=False),
+            sa.Column("applied_at", sa.DateTime(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_table(bind, "seed_state"):
+        op.drop_table("seed_state")
@@ -0,0 +1,44 @@
+"""Index updated_at for conditional GET validators
+
+Revision ID: 20261019_0028
+Revises: 20261019_0027
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0028"
+down_revision: Union[str, None] = "20261019_0027"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_orders_destination_deposit_updated_at", "orders", ["destination_deposit_id", "updated_at"]),
+    ("ix_shipments_deposit_updated_at", "shipments", ["deposit_id", "updated_at"]),
+    ("ix_remitos_updated_at", "remitos", ["updated_at"]),
+    ("ix_stock_levels_updated_at", "stock_levels", ["updated_at"]),
+    ("ix_production_lots_deposit_updated_at", "production_lots", ["deposit_id", "updated_at"]),
+]
+
+
+def _has_index(bind, table: str, name: str) -> bool:
+    inspector = sa.inspect(bind)
+    return any(index["name"] == name for index in inspector.get_indexes(table))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for name, table, columns in INDEXES:
+        if not _has_index(bind, table, name):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for name, table, _ in INDEXES:
+        if _has_index(bind, table, name):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,53 @@
+"""Add sync_tombstones and (updated_at, id) indexes for delta sync
+
+Revision ID: 20261019_0029
+Revises: 20261019_0028
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0029"
+down_revision: Union[str, None] = "20261019_0028"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNC_TABLES = ["orders", "order_items", "shipments", "skus", "deposits", "production_lots"]
+TOMBSTONE_INDEX = "ix_sync_tombstones_deleted_at_id"
+
+
+def _has_index(bind, table: str, name: str) -> bool:
+    inspector = sa.inspect(bind)
+    return any(index["name"] == name for index in inspector.get_indexes(table))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("sync_tombstones"):
+        op.create_table(
+            "sync_tombstones",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("entity", sa.String(length=50), nullable=False),
+            sa.Column("entity_id", sa.Integer(), nullable=False),
+            sa.Column("deleted_at", sa.DateTime(), nullable=False),
+        )
+    if not _has_index(bind, "sync_tombstones", TOMBSTONE_INDEX):
+        op.create_index(TOMBSTONE_INDEX, "sync_tombstones", ["deleted_at", "id"])
+    for table in SYNC_TABLES:
+        name = f"ix_{table}_updated_at_id"
+        if not _has_index(bind, table, name):
+            op.create_index(name, table, ["updated_at", "id"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table in SYNC_TABLES:
+        name = f"ix_{table}_updated_at_id"
+        if _has_index(bind, table, name):
+            op.drop_index(name, table_name=table)
+    if sa.inspect(bind).has_table("sync_tombstones"):
+        op.drop_table("sync_tombstones")
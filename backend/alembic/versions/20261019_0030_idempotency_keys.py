@@ -0,0 +1,43 @@
+"""Add idempotency_keys for replaying retried writes
+
+Revision ID: 20261019_0030
+Revises: 20261019_0029
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0030"
+down_revision: Union[str, None] = "20261019_0029"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EXPIRES_INDEX = "ix_idempotency_keys_expires_at"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("idempotency_keys"):
+        op.create_table(
+            "idempotency_keys",
+            sa.Column("scope", sa.String(length=64), nullable=False),
+            sa.Column("key", sa.String(length=255), nullable=False),
+            sa.Column("request_hash", sa.String(length=64), nullable=False),
+            sa.Column("status_code", sa.Integer(), nullable=False),
+            sa.Column("response_headers", sa.JSON(), nullable=False),
+            sa.Column("response_body", sa.LargeBinary(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("scope", "key"),
+        )
+        op.create_index(EXPIRES_INDEX, "idempotency_keys", ["expires_at"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table("idempotency_keys"):
+        op.drop_table("idempotency_keys")
@@ -0,0 +1,38 @@
+"""Add heartbeat and attempt count to report_jobs
+
+Revision ID: 20261019_0031
+Revises: 20261019_0030
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0031"
+down_revision: Union[str, None] = "20261019_0030"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(bind, table: str, column: str) -> bool:
+    inspector = sa.inspect(bind)
+    return any(item["name"] == column for item in inspector.get_columns(table))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_column(bind, "report_jobs", "heartbeat_at"):
+        op.add_column("report_jobs", sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+    if not _has_column(bind, "report_jobs", "attempts"):
+        op.add_column("report_jobs", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_column(bind, "report_jobs", "attempts"):
+        op.drop_column("report_jobs", "attempts")
+    if _has_column(bind, "report_jobs", "heartbeat_at"):
+        op.drop_column("report_jobs", "heartbeat_at")
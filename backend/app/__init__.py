@@ -0,0 +1,4 @@
+import time
+
+# Referencia para medir el arranque en frío del proceso (ver app.main.lifespan).
+IMPORT_STARTED = time.perf_counter()
@@ -73,6 +73,21 @@ def require_roles(*roles: str):
     return _checker
 
 
+def assigned_permissions_statement(role_id: int):
+    return (
+        select(Permission.key)
+        .join(RolePermission, RolePermission.permission_id == Permission.id)
+        .where(RolePermission.role_id == role_id)
+    )
+
+
+def get_assigned_permissions(current_user: User, session: Session) -> set[str]:
+    """Claves de permiso (en minúsculas) del rol del usuario; vacío si no tiene rol."""
+    if current_user.role_id is None:
+        return set()
+    return {key.lower() for key in session.exec(assigned_permissions_statement(current_user.role_id)).all()}
+
+
 def require_permissions(*permissions: str):
     normalized = {permission.strip().lower() for permission in permissions}
 
@@ -83,12 +98,7 @@ def require_permissions(*permissions: str):
             return current_user
         if current_user.role_id is None:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Rol no asignado")
-        result = session.exec(
-            select(Permission.key)
-            .join(RolePermission, RolePermission.permission_id == Permission.id)
-            .where(RolePermission.role_id == current_user.role_id)
-        ).all()
-        assigned = {key.lower() for key in result}
+        assigned = get_assigned_permissions(current_user, session)
         if not normalized.intersection(assigned):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permiso insuficiente")
         return current_user
@@ -1,26 +1,79 @@
+import asyncio
+import base64
+import json
+import logging
 import re
+from collections import defaultdict
+from collections.abc import Callable, Iterator
 from datetime import date, datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from pydantic import ValidationError
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
-from sqlalchemy import and_, func, nulls_last, or_
-from sqlmodel import Session, select
-
+from sqlalchemy import (
+    Date,
+    Float,
+    Integer,
+    String,
+    and_,
+    case,
+    cast,
+    column,
+    func,
+    insert,
+    literal,
+    nulls_last,
+    or_,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased, selectinload
+from sqlmodel import Session, SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.audit import record_audit
+from ..core.catalog_cache import CATALOG_TABLES, catalog_cache, combined_version
+from ..core.conditional import ConditionalGet, etag_matches
 from ..core.config import get_settings
+from ..core.exports import export_response
+from ..core.imports import parse_purchase_import_file
+from ..core.pool import pool_stats
+from ..core.report_jobs import enqueue_report_job, resolve_report_result_path
 from ..core.storage import get_remitos_dir_new, resolve_remito_pdf_path
-from ..db import get_session
+from ..core.sync import SYNC_ENTITIES, TOMBSTONES_KEY, InvalidSyncToken, decode_sync_token, encode_sync_token
+from ..db import (
+    async_engine,
+    async_read_engine,
+    engine,
+    get_async_read_session,
+    get_read_session,
+    get_session,
+    read_engine,
+)
 from ..core.security import create_access_token, hash_password, is_legacy_hash, needs_rehash, verify_password
-from .deps import get_current_user, require_active_user, require_permissions
+from .deps import (
+    _is_superadmin,
+    assigned_permissions_statement,
+    get_assigned_permissions,
+    get_current_user,
+    require_active_user,
+    require_permissions,
+)
 from ..models import (
     AuditLog,
     AuditAction,
     Deposit,
     InventoryCount,
     InventoryCountItem,
+    LotLineage,
+    LotSequence,
     InventoryCountStatus,
     Permission,
     Recipe,
@@ -46,12 +99,16 @@ from ..models import (
     StockMovement,
     StockMovementType,
     Supplier,
+    SyncTombstone,
     PurchaseReceipt,
     PurchaseReceiptItem,
+    ReportJob,
     User,
 )
-from ..models.common import OrderStatus, RemitoStatus, ShipmentStatus, UnitOfMeasure
+from ..models.common import OrderStatus, RemitoStatus, ReportJobStatus, ShipmentStatus, UnitOfMeasure
 from ..schemas import (
+    BootstrapRead,
+    DbPoolStats,
     DepositCreate,
     DepositRead,
     DepositUpdate,
@@ -60,6 +117,7 @@ from ..schemas import (
     SKUTypeRead,
     SKUTypeUpdate,
     RecipeCreate,
+    RecipeItemRead,
     RecipeRead,
     RecipeUpdate,
     SKUCreate,
@@ -78,16 +136,28 @@ from ..schemas import (
     StockSummaryRow,
     MovementSummary,
     UnitRead,
+    ProductionLotAggregate,
     ProductionLotRead,
+    ProductionLotSummary,
+    LotTrace,
+    LotTraceDirection,
+    LotTraceEdge,
+    LotTraceNode,
+    LotTraceRemito,
     SupplierCreate,
     SupplierRead,
     SupplierUpdate,
     PurchaseReceiptCreate,
+    PurchaseReceiptImportProgress,
+    PurchaseReceiptImportRow,
     PurchaseReceiptRead,
     PurchaseReceiptItemRead,
+    PurchaseReceiptItemPayload,
     ExpiryReport,
     ExpiryReportRow,
     ExpiryReportStatus,
+    ProductionEfficiencyReport,
+    ProductionEfficiencyRow,
     LoginRequest,
     TokenResponse,
     UserCreate,
@@ -111,11 +181,18 @@ from ..schemas import (
     ShipmentItemUpdate,
     ShipmentRead,
     ShipmentUpdate,
+    SyncOrderItemRead,
+    SyncRead,
+    SyncTombstoneRead,
     MermaCauseCreate,
     MermaCauseRead,
     MermaCauseUpdate,
     MermaEventCreate,
     MermaEventRead,
+    MermaAnalyticsDimension,
+    MermaAnalyticsPeriod,
+    MermaAnalyticsReport,
+    MermaAnalyticsRow,
     MermaTypeCreate,
     MermaTypeRead,
     MermaTypeUpdate,
@@ -126,9 +203,18 @@ from ..schemas import (
     InventoryCountRead,
     InventoryCountUpdate,
     InventoryCountItemRead,
+    InventoryCountItemsDiff,
+    InventoryCountItemsPatch,
+    InventoryCountPrefillRequest,
+    InventoryCountPrefillResult,
     AuditLogRead,
+    ReportJobCreate,
+    ReportJobRead,
+    ExportFormat,
 )
 
+logger = logging.getLogger(__name__)
+
 public_router = APIRouter()
 router = APIRouter(dependencies=[Depends(require_active_user)])
 api_router = APIRouter()
@@ -138,16 +224,35 @@ SKU_CONSUMABLE_CODE = "CON"
 SKU_SEMI_CODE = "SEMI"
 OUTGOING_MOVEMENTS = {"CONSUMPTION", "MERMA", "REMITO"}
 INCOMING_MOVEMENTS = {"PRODUCTION", "PURCHASE", "ADJUSTMENT", "TRANSFER"}
+EXPORT_FETCH_SIZE = 1000
+PURCHASE_IMPORT_MAX_CHUNK_SIZE = 1000
+PRODUCTION_LOT_LIST_MAX_LIMIT = 500
+LOT_TRACE_DEFAULT_DEPTH = 10
+LOT_TRACE_MAX_DEPTH = 50
+PURCHASE_IMPORT_MAX_ERRORS = 20
 LOT_CODE_SEQUENCE_LENGTH = 3
 
 settings = get_settings()
 
 
-def _encode_changes(payload: dict | list | None) -> dict | None:
-    if payload is None:
-        return None
-    encoded = jsonable_encoder(payload, exclude_none=True)
-    return encoded if isinstance(encoded, dict) else {"items": encoded}
+def _stream_export_rows(bind: Engine, statement) -> Iterator[tuple]:
+    # La sesión del request se libera antes de terminar el streaming, así que el cursor usa una propia.
+    with Session(bind) as export_session:
+        yield from export_session.exec(statement.execution_options(yield_per=EXPORT_FETCH_SIZE))
+
+
+def _export_statement(
+    session: Session | AsyncSession, export_format: ExportFormat, filename: str, statement
+) -> StreamingResponse:
+    # Los endpoints async exportan con el engine sync de lectura: el streaming corre en el thread pool.
+    bind = read_engine if isinstance(session, AsyncSession) else session.get_bind()
+    columns = list(statement.selected_columns.keys())
+    return export_response(
+        export_format.value,
+        f"{filename}-{date.today():%Y%m%d}",
+        columns,
+        _stream_export_rows(bind, statement),
+    )
 
 
 def _log_audit(
@@ -158,15 +263,7 @@ def _log_audit(
     user_id: int | None = None,
     changes: dict | list | None = None,
 ) -> None:
-    session.add(
-        AuditLog(
-            entity_type=entity_type,
-            entity_id=entity_id,
-            action=action,
-            user_id=user_id,
-            changes=_encode_changes(changes),
-        )
-    )
+    record_audit(session, entity_type, entity_id, action, user_id, changes)
 
 
 def _map_user(user: User, session: Session) -> UserRead:
@@ -306,15 +403,34 @@ def _extract_sequence(lot_code: str) -> int:
 
 def _generate_lot_code(session: Session, sku: SKU, production_line: ProductionLine, produced_at: date) -> str:
     prefix = f"{_format_production_date(produced_at)}-{_line_code(production_line)}-{sku.code}"
-    existing_codes = session.exec(
-        select(ProductionLot.lot_code).where(
-            ProductionLot.sku_id == sku.id,
-            ProductionLot.production_line_id == production_line.id,
-            ProductionLot.produced_at == produced_at,
+    statement = pg_insert(LotSequence).values(
+        produced_at=produced_at, production_line_id=production_line.id, sku_id=sku.id, last_value=1
+    )
+    # El upsert toma el bloqueo de la fila: dos altas simultáneas reciben números distintos.
+    statement = statement.on_conflict_do_update(
+        index_elements=[LotSequence.produced_at, LotSequence.production_line_id, LotSequence.sku_id],
+        set_={"last_value": LotSequence.last_value + 1},
+    ).returning(LotSequence.last_value)
+    sequence = session.execute(statement).scalar_one()
+    return f"{prefix}-{sequence:0{LOT_CODE_SEQUENCE_LENGTH}d}"
+
+
+def _register_lot_sequence(
+    session: Session, lot_code: str, sku: SKU, production_line: ProductionLine, produced_at: date
+) -> None:
+    """Adelanta el contador cuando se carga un código manual para que la generación no lo repita."""
+    sequence = _extract_sequence(lot_code)
+    if not sequence:
+        return
+    statement = pg_insert(LotSequence).values(
+        produced_at=produced_at, production_line_id=production_line.id, sku_id=sku.id, last_value=sequence
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[LotSequence.produced_at, LotSequence.production_line_id, LotSequence.sku_id],
+            set_={"last_value": func.greatest(LotSequence.last_value, statement.excluded.last_value)},
         )
-    ).all()
-    max_seq = max((_extract_sequence(code) for code in existing_codes), default=0)
-    return f"{prefix}-{max_seq + 1:0{LOT_CODE_SEQUENCE_LENGTH}d}"
+    )
 
 
 def _upsert_semi_conversion_rule(session: Session, sku_id: int, units_per_kg: float) -> None:
@@ -338,15 +454,18 @@ def _delete_semi_conversion_rule(session: Session, sku_id: int) -> None:
 def _convert_to_base_quantity(sku: SKU, quantity: float, unit: UnitOfMeasure | None, session: Session) -> float:
     session.refresh(sku, attribute_names=["sku_type"])
     if sku.sku_type and sku.sku_type.code == SKU_SEMI_CODE:
-        units_per_kg = _get_semi_units_per_kg(session, sku.id)
-        if unit in (None, UnitOfMeasure.KG):
-            return quantity
-        if unit == UnitOfMeasure.UNIT:
-            return quantity / units_per_kg
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unidad no soportada para SEMI")
+        return _semi_quantity_in_kg(quantity, unit, _get_semi_units_per_kg(session, sku.id))
     return quantity
 
 
+def _semi_quantity_in_kg(quantity: float, unit: UnitOfMeasure | None, units_per_kg: float) -> float:
+    if unit in (None, UnitOfMeasure.KG):
+        return quantity
+    if unit == UnitOfMeasure.UNIT:
+        return quantity / units_per_kg
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unidad no soportada para SEMI")
+
+
 def _get_recipe_for_product(session: Session, product_id: int) -> Recipe | None:
     return session.exec(select(Recipe).where(Recipe.product_id == product_id, Recipe.is_active.is_(True))).first()
 
@@ -439,7 +558,16 @@ def _consume_recipe_components(
                 movement_date=movement_date,
                 created_by_user_id=created_by_user_id,
             )
-            _apply_stock_movement(session, movement_payload, allow_negative_balance=True)
+            _, movement = _apply_stock_movement(session, movement_payload, allow_negative_balance=True)
+            if lot and production_lot:
+                session.add(
+                    LotLineage(
+                        parent_lot_id=lot.id,
+                        child_lot_id=production_lot.id,
+                        quantity=quantity,
+                        stock_movement_id=movement.id,
+                    )
+                )
 
 
 def _map_sku(sku: SKU, session: Session) -> SKURead:
@@ -496,16 +624,20 @@ def _get_expiry_status(expiry_date: date | None, today: date) -> tuple[ExpiryRep
 
 def _map_stock_level(level: StockLevel, session: Session) -> StockLevelRead:
     session.refresh(level, attribute_names=["sku", "deposit"])
+    return _map_stock_level_row(level, level.sku, level.deposit)
+
+
+def _map_stock_level_row(level: StockLevel, sku: SKU, deposit: Deposit) -> StockLevelRead:
     return StockLevelRead(
         deposit_id=level.deposit_id,
-        deposit_name=level.deposit.name,
+        deposit_name=deposit.name,
         sku_id=level.sku_id,
-        sku_code=level.sku.code,
-        sku_name=level.sku.name,
+        sku_code=sku.code,
+        sku_name=sku.name,
         quantity=level.quantity,
-        alert_status=_get_stock_alert_status(level.quantity, level.sku),
-        alert_green_min=level.sku.alert_green_min,
-        alert_yellow_min=level.sku.alert_yellow_min,
+        alert_status=_get_stock_alert_status(level.quantity, sku),
+        alert_green_min=sku.alert_green_min,
+        alert_yellow_min=sku.alert_yellow_min,
     )
 
 
@@ -856,13 +988,42 @@ def _diff_order_header(before: dict, after: dict) -> dict:
 def _map_order(order: Order, session: Session) -> OrderRead:
     session.refresh(order, attribute_names=["items"])
     order_item_ids = [item.id for item in order.items]
-    dispatched_quantities = _get_dispatched_quantities(session, order_item_ids)
-    prepared_quantities = _get_prepared_quantities(session, order_item_ids)
-    items = []
+    item_rows = []
     for item in order.items:
         sku = session.get(SKU, item.sku_id)
-        sku_code = sku.code if sku else str(item.sku_id)
-        sku_name = sku.name if sku else f"SKU {item.sku_id}"
+        item_rows.append((item, sku.code if sku else None, sku.name if sku else None))
+
+    created_by_name = None
+    updated_by_name = None
+    if order.created_by_user_id:
+        user = session.get(User, order.created_by_user_id)
+        created_by_name = user.full_name if user else None
+    if order.updated_by_user_id:
+        user = session.get(User, order.updated_by_user_id)
+        updated_by_name = user.full_name if user else None
+
+    return _build_order_read(
+        order,
+        item_rows,
+        _get_dispatched_quantities(session, order_item_ids),
+        _get_prepared_quantities(session, order_item_ids),
+        _get_latest_shipment_date(session, order.id),
+        created_by_name,
+        updated_by_name,
+    )
+
+
+def _build_order_read(
+    order: Order,
+    item_rows: list[tuple[OrderItem, str | None, str | None]],
+    dispatched_quantities: dict[int, float],
+    prepared_quantities: dict[int, float],
+    estimated_delivery_date: date | None,
+    created_by_name: str | None,
+    updated_by_name: str | None,
+) -> OrderRead:
+    items = []
+    for item, sku_code, sku_name in item_rows:
         quantity_value = float(item.quantity)
         has_legacy_decimal = not quantity_value.is_integer()
         dispatched_quantity = dispatched_quantities.get(item.id, 0.0)
@@ -872,8 +1033,8 @@ def _map_order(order: Order, session: Session) -> OrderRead:
             {
                 "id": item.id,
                 "sku_id": item.sku_id,
-                "sku_code": sku_code,
-                "sku_name": sku_name,
+                "sku_code": sku_code or str(item.sku_id),
+                "sku_name": sku_name or f"SKU {item.sku_id}",
                 "quantity": quantity_value,
                 "current_stock": item.current_stock,
                 "prepared_quantity": prepared_quantity,
@@ -884,15 +1045,6 @@ def _map_order(order: Order, session: Session) -> OrderRead:
             }
         )
 
-    created_by_name = None
-    updated_by_name = None
-    if order.created_by_user_id:
-        user = session.get(User, order.created_by_user_id)
-        created_by_name = user.full_name if user else None
-    if order.updated_by_user_id:
-        user = session.get(User, order.updated_by_user_id)
-        updated_by_name = user.full_name if user else None
-
     return OrderRead(
         id=order.id,
         destination=order.destination,
@@ -900,7 +1052,7 @@ def _map_order(order: Order, session: Session) -> OrderRead:
         requested_for=order.requested_for,
         required_delivery_date=order.required_delivery_date,
         requested_by=order.requested_by,
-        estimated_delivery_date=_get_latest_shipment_date(session, order.id),
+        estimated_delivery_date=estimated_delivery_date,
         status=order.status,
         notes=order.notes,
         plant_internal_note=order.plant_internal_note,
@@ -916,6 +1068,78 @@ def _map_order(order: Order, session: Session) -> OrderRead:
     )
 
 
+async def _gather_reads(session: AsyncSession, *statements) -> list[list]:
+    """Ejecuta consultas independientes en paralelo, cada una en su propia conexión del engine de la sesión."""
+
+    async def run(statement) -> list:
+        async with AsyncSession(session.bind) as own_session:
+            return (await own_session.exec(statement)).all()
+
+    return list(await asyncio.gather(*(run(statement) for statement in statements)))
+
+
+async def _map_orders_async(session: AsyncSession, orders: list[Order]) -> list[OrderRead]:
+    if not orders:
+        return []
+    order_ids = [order.id for order in orders]
+    user_ids = {
+        user_id for order in orders for user_id in (order.created_by_user_id, order.updated_by_user_id) if user_id
+    }
+    shipment_totals = (
+        select(ShipmentItem.order_item_id, Shipment.status, func.sum(ShipmentItem.quantity))
+        .join(Shipment, Shipment.id == ShipmentItem.shipment_id)
+        .where(
+            ShipmentItem.order_item_id.in_(select(OrderItem.id).where(OrderItem.order_id.in_(order_ids))),
+            Shipment.status.in_({ShipmentStatus.DRAFT, ShipmentStatus.CONFIRMED, ShipmentStatus.DISPATCHED}),
+        )
+        .group_by(ShipmentItem.order_item_id, Shipment.status)
+    )
+    latest_shipments = (
+        select(ShipmentItem.order_id, func.max(Shipment.estimated_delivery_date))
+        .join(Shipment, Shipment.id == ShipmentItem.shipment_id)
+        .where(
+            ShipmentItem.order_id.in_(order_ids),
+            Shipment.status.in_({ShipmentStatus.CONFIRMED, ShipmentStatus.DISPATCHED}),
+        )
+        .group_by(ShipmentItem.order_id)
+    )
+    item_rows, total_rows, latest_rows, user_rows = await _gather_reads(
+        session,
+        select(OrderItem, SKU.code, SKU.name)
+        .outerjoin(SKU, SKU.id == OrderItem.sku_id)
+        .where(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.id),
+        shipment_totals,
+        latest_shipments,
+        select(User.id, User.full_name).where(User.id.in_(user_ids or {0})),
+    )
+
+    items_by_order: dict[int, list[tuple[OrderItem, str | None, str | None]]] = defaultdict(list)
+    for item, sku_code, sku_name in item_rows:
+        items_by_order[item.order_id].append((item, sku_code, sku_name))
+    dispatched: dict[int, float] = {}
+    prepared: dict[int, float] = defaultdict(float)
+    for order_item_id, shipment_status, quantity in total_rows:
+        if shipment_status == ShipmentStatus.DISPATCHED:
+            dispatched[order_item_id] = float(quantity or 0)
+        else:
+            prepared[order_item_id] += float(quantity or 0)
+    latest_dates = dict(latest_rows)
+    user_names = dict(user_rows)
+    return [
+        _build_order_read(
+            order,
+            items_by_order[order.id],
+            dispatched,
+            prepared,
+            latest_dates.get(order.id),
+            user_names.get(order.created_by_user_id),
+            user_names.get(order.updated_by_user_id),
+        )
+        for order in orders
+    ]
+
+
 def _get_deposit_or_404(session: Session, deposit_id: int) -> Deposit:
     deposit = session.get(Deposit, deposit_id)
     if not deposit:
@@ -1156,12 +1380,24 @@ def health() -> dict[str, str]:
     return {"status": "ok", "version": "0.1.0"}
 
 
+@router.get(
+    "/metrics/db-pool",
+    tags=["health"],
+    response_model=list[DbPoolStats],
+    dependencies=[Depends(require_permissions("audit.view"))],
+)
+def db_pool_metrics() -> list[DbPoolStats]:
+    engines = [engine, read_engine, async_engine, async_read_engine]
+    unique_engines = [item for index, item in enumerate(engines) if item not in engines[:index]]
+    return [DbPoolStats(**pool_stats(item)) for item in unique_engines]
+
+
 @router.get(
     "/roles",
     tags=["admin"],
     dependencies=[Depends(require_permissions("roles.view"))],
 )
-def list_roles(session: Session = Depends(get_session)) -> list[Role]:
+def list_roles(session: Session = Depends(get_read_session)) -> list[Role]:
     return session.exec(select(Role)).all()
 
 
@@ -1171,7 +1407,7 @@ def list_roles(session: Session = Depends(get_session)) -> list[Role]:
     response_model=list[PermissionRead],
     dependencies=[Depends(require_permissions("roles.view"))],
 )
-def list_permissions(session: Session = Depends(get_session)) -> list[PermissionRead]:
+def list_permissions(session: Session = Depends(get_read_session)) -> list[PermissionRead]:
     return session.exec(select(Permission)).all()
 
 
@@ -1181,7 +1417,7 @@ def list_permissions(session: Session = Depends(get_session)) -> list[Permission
     response_model=list[str],
     dependencies=[Depends(require_permissions("roles.view"))],
 )
-def list_role_permissions(role_id: int, session: Session = Depends(get_session)) -> list[str]:
+def list_role_permissions(role_id: int, session: Session = Depends(get_read_session)) -> list[str]:
     role = session.get(Role, role_id)
     if not role:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rol no encontrado")
@@ -1233,7 +1469,7 @@ def update_role_permissions(
     response_model=list[UserRead],
     dependencies=[Depends(require_permissions("users.view"))],
 )
-def list_users(session: Session = Depends(get_session)) -> list[UserRead]:
+def list_users(session: Session = Depends(get_read_session)) -> list[UserRead]:
     users = session.exec(select(User)).all()
     return [_map_user(user, session) for user in users]
 
@@ -1339,13 +1575,299 @@ def list_units() -> list[UnitRead]:
     return [{"code": code, "label": unit_labels.get(code, code)} for code in UnitOfMeasure]
 
 
+def _sku_read_statement():
+    return (
+        select(SKU, SKUType.code, SKUType.label, SemiConversionRule.units_per_kg)
+        .join(SKUType, SKUType.id == SKU.sku_type_id)
+        .outerjoin(SemiConversionRule, SemiConversionRule.sku_id == SKU.id)
+    )
+
+
+def _map_sku_row(sku: SKU, type_code: str, type_label: str, units_per_kg: float | None) -> SKURead:
+    """Equivalente a _map_sku para filas de _sku_read_statement (tipo y regla SEMI ya resueltos en la consulta)."""
+    is_semi = type_code == SKU_SEMI_CODE
+    return SKURead(
+        id=sku.id,
+        code=sku.code,
+        name=sku.name,
+        sku_type_id=sku.sku_type_id,
+        sku_type_code=type_code,
+        sku_type_label=type_label,
+        unit=sku.unit,
+        secondary_unit=UnitOfMeasure.UNIT if is_semi else None,
+        units_per_kg=(float(units_per_kg) if units_per_kg is not None else 1.0) if is_semi else None,
+        notes=sku.notes,
+        is_active=sku.is_active,
+        alert_green_min=sku.alert_green_min,
+        alert_yellow_min=sku.alert_yellow_min,
+    )
+
+
+def _bootstrap_skus(session: Session) -> list[SKURead]:
+    rows = session.exec(
+        _sku_read_statement()
+        .where(SKU.is_active.is_(True), SKUType.is_active.is_(True))
+        .order_by(SKU.name, SKU.code)
+    ).all()
+    return [_map_sku_row(*row) for row in rows]
+
+
+def _bootstrap_recipes(session: Session) -> list[RecipeRead]:
+    component = aliased(SKU)
+    rows = session.exec(
+        select(Recipe, RecipeItem, component.code, component.name, component.unit, SKUType.code)
+        .outerjoin(RecipeItem, RecipeItem.recipe_id == Recipe.id)
+        .outerjoin(component, component.id == RecipeItem.component_id)
+        .outerjoin(SKUType, SKUType.id == component.sku_type_id)
+        .where(Recipe.is_active.is_(True))
+        .order_by(Recipe.id, RecipeItem.id)
+    ).all()
+    recipes: dict[int, RecipeRead] = {}
+    for recipe, item, component_code, component_name, component_unit, component_type in rows:
+        mapped = recipes.setdefault(
+            recipe.id,
+            RecipeRead(id=recipe.id, product_id=recipe.product_id, name=recipe.name, items=[], is_active=recipe.is_active),
+        )
+        if item is None:
+            continue
+        mapped.items.append(
+            RecipeItemRead(
+                component_id=item.component_id,
+                quantity=item.quantity,
+                component_code=component_code or "",
+                component_name=component_name or f"SKU {item.component_id}",
+                component_unit=UnitOfMeasure.UNIT if component_type == SKU_SEMI_CODE else component_unit or UnitOfMeasure.UNIT,
+            )
+        )
+    return list(recipes.values())
+
+
+def _bootstrap_active(session: Session, model, read_model, *order_by) -> list:
+    rows = session.exec(select(model).where(model.is_active.is_(True)).order_by(*order_by)).all()
+    return [read_model.model_validate(row) for row in rows]
+
+
+# Catálogo -> (permiso requerido, constructor con una sola consulta). Mismos filtros por defecto que cada listado.
+BOOTSTRAP_CATALOGS: dict[str, tuple[str, Callable[[Session], list]]] = {
+    "units": ("units.view", lambda session: list_units()),
+    "sku_types": ("sku_types.view", lambda session: _bootstrap_active(session, SKUType, SKUTypeRead, SKUType.code)),
+    "skus": ("skus.view", _bootstrap_skus),
+    "deposits": ("deposits.view", lambda session: _bootstrap_active(session, Deposit, DepositRead, Deposit.name)),
+    "movement_types": (
+        "movement_types.view",
+        lambda session: _bootstrap_active(session, StockMovementType, StockMovementTypeRead, StockMovementType.code),
+    ),
+    "production_lines": (
+        "production_lines.view",
+        lambda session: [
+            ProductionLineRead.model_validate(line)
+            for line in session.exec(select(ProductionLine).order_by(ProductionLine.name)).all()
+        ],
+    ),
+    "merma_types": (
+        "mermas.view",
+        lambda session: _bootstrap_active(session, MermaType, MermaTypeRead, MermaType.stage, MermaType.label),
+    ),
+    "merma_causes": (
+        "mermas.view",
+        lambda session: _bootstrap_active(session, MermaCause, MermaCauseRead, MermaCause.stage, MermaCause.label),
+    ),
+    "recipes": ("recipes.view", _bootstrap_recipes),
+}
+
+
+def _parse_bootstrap_include(include: str | None, current_user: User, session: Session) -> list[str]:
+    requested = [name.strip() for name in include.split(",") if name.strip()] if include else []
+    unknown = [name for name in requested if name not in BOOTSTRAP_CATALOGS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Catálogos desconocidos: {', '.join(unknown)}"
+        )
+    if _is_superadmin(current_user):
+        return requested or list(BOOTSTRAP_CATALOGS)
+    assigned = get_assigned_permissions(current_user, session)
+    if not requested:
+        # Sin include se devuelven todos los catálogos que el usuario puede ver.
+        return [name for name, (permission, _) in BOOTSTRAP_CATALOGS.items() if permission in assigned]
+    denied = [name for name in requested if BOOTSTRAP_CATALOGS[name][0] not in assigned]
+    if denied:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=f"Permiso insuficiente para: {', '.join(denied)}"
+        )
+    return list(dict.fromkeys(requested))
+
+
+@router.get(
+    "/bootstrap",
+    tags=["catalogs"],
+    response_model=BootstrapRead,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Los catálogos no cambiaron desde el ETag enviado"}},
+)
+def bootstrap_catalogs(
+    request: Request,
+    include: str | None = Query(None, description=f"Separados por coma: {', '.join(CATALOG_TABLES)}"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Catálogos de arranque en una sola respuesta, servidos desde memoria y con ETag combinado.
+
+    Usa el primario: la caché es compartida entre clientes y se reconstruye justo después de cada escritura, así que
+    armarla desde una réplica atrasada serviría a todos datos viejos hasta que venza el TTL.
+    """
+    names = _parse_bootstrap_include(include, current_user, session)
+    versions: dict[str, str] = {}
+    payload: dict[str, list] = {}
+    for name in names:
+        build = BOOTSTRAP_CATALOGS[name][1]
+        versions[name], payload[name] = catalog_cache.get(name, lambda: build(session))
+    version = combined_version(versions)
+    headers = {"ETag": f'"{version}"', "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(content={"version": version, **payload}, headers=headers)
+
+
+# Entidad de /sync -> permiso de lectura requerido; las que el usuario no puede ver se omiten.
+SYNC_PERMISSIONS = {
+    "orders": "orders.view",
+    "order_items": "orders.view",
+    "shipments": "remitos.view",
+    "skus": "skus.view",
+    "deposits": "deposits.view",
+    "production_lots": "production.view",
+}
+SYNC_MAX_LIMIT = 1000
+
+
+def _sync_statements() -> dict[str, tuple]:
+    """Consulta de cada entidad de /sync con su clave de recorrido (updated_at, id)."""
+    return {
+        "orders": (select(Order), Order.updated_at, Order.id),
+        "order_items": (
+            select(OrderItem, SKU.code, SKU.name).outerjoin(SKU, SKU.id == OrderItem.sku_id),
+            OrderItem.updated_at,
+            OrderItem.id,
+        ),
+        "shipments": (
+            select(Shipment, Deposit.name).outerjoin(Deposit, Deposit.id == Shipment.deposit_id),
+            Shipment.updated_at,
+            Shipment.id,
+        ),
+        "skus": (_sku_read_statement(), SKU.updated_at, SKU.id),
+        "deposits": (select(Deposit), Deposit.updated_at, Deposit.id),
+        "production_lots": (_production_lot_read_statement(), ProductionLot.updated_at, ProductionLot.id),
+        TOMBSTONES_KEY: (select(SyncTombstone), SyncTombstone.deleted_at, SyncTombstone.id),
+    }
+
+
+def _sync_window(statement, timestamp_column, id_column, watermark, horizon: datetime, limit: int):
+    statement = statement.where(timestamp_column <= horizon)
+    if watermark is not None:
+        statement = statement.where(tuple_(timestamp_column, id_column) > tuple_(*watermark))
+    return statement.order_by(timestamp_column, id_column).limit(limit + 1)
+
+
+def _sync_row_key(name: str, row) -> tuple[datetime, int]:
+    record = row if isinstance(row, SQLModel) else row[0]
+    if name == TOMBSTONES_KEY:
+        return record.deleted_at, record.id
+    return record.updated_at, record.id
+
+
+async def _sync_allowed_entities(current_user: User, session: AsyncSession) -> list[str]:
+    if _is_superadmin(current_user):
+        return list(SYNC_ENTITIES)
+    if current_user.role_id is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Rol no asignado")
+    assigned = {key.lower() for key in (await session.exec(assigned_permissions_statement(current_user.role_id))).all()}
+    return [name for name in SYNC_ENTITIES if SYNC_PERMISSIONS[name] in assigned]
+
+
+@router.get("/sync", tags=["sync"], response_model=SyncRead)
+async def sync_changes(
+    since: str | None = Query(None, description="Token devuelto por la llamada anterior; vacío para la carga inicial"),
+    limit: int = 500,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_read_session),
+) -> SyncRead:
+    """Cambios (altas, ediciones, desactivaciones y borrados) desde `since`.
+
+    Cada entidad se recorre por (updated_at, id) hasta `limit` filas; si `has_more` es verdadero el cliente debe
+    volver a llamar con el token nuevo. Los borrados físicos llegan en `deleted`.
+    """
+    try:
+        watermarks = decode_sync_token(since) if since else {}
+    except InvalidSyncToken as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token de sincronización inválido") from exc
+    safe_limit = max(1, min(limit, SYNC_MAX_LIMIT))
+    horizon = datetime.utcnow() - timedelta(seconds=settings.sync_safety_lag_seconds)
+    entities = await _sync_allowed_entities(current_user, session)
+    statements = _sync_statements()
+    names = [*entities, TOMBSTONES_KEY]
+    tombstone_statement, deleted_at_column, tombstone_id = statements[TOMBSTONES_KEY]
+    statements[TOMBSTONES_KEY] = (
+        tombstone_statement.where(SyncTombstone.entity.in_(entities or [""])),
+        deleted_at_column,
+        tombstone_id,
+    )
+    results = await _gather_reads(
+        session,
+        *(_sync_window(*statements[name], watermarks.get(name), horizon, safe_limit) for name in names),
+    )
+
+    has_more = False
+    rows_by_entity: dict[str, list] = {}
+    for name, rows in zip(names, results):
+        if len(rows) > safe_limit:
+            rows = rows[:safe_limit]
+            has_more = True
+        if rows:
+            watermarks[name] = _sync_row_key(name, rows[-1])
+        rows_by_entity[name] = rows
+
+    payload = SyncRead(token=encode_sync_token(watermarks), has_more=has_more)
+    payload.orders = await _map_orders_async(session, list(rows_by_entity.get("orders", [])))
+    payload.order_items = [
+        SyncOrderItemRead(
+            id=item.id,
+            order_id=item.order_id,
+            sku_id=item.sku_id,
+            sku_code=sku_code or str(item.sku_id),
+            sku_name=sku_name or f"SKU {item.sku_id}",
+            quantity=float(item.quantity),
+            current_stock=item.current_stock,
+        )
+        for item, sku_code, sku_name in rows_by_entity.get("order_items", [])
+    ]
+    payload.shipments = [
+        ShipmentRead(
+            id=shipment.id,
+            deposit_id=shipment.deposit_id,
+            deposit_name=deposit_name,
+            estimated_delivery_date=shipment.estimated_delivery_date,
+            status=shipment.status,
+            created_at=shipment.created_at,
+            updated_at=shipment.updated_at,
+        )
+        for shipment, deposit_name in rows_by_entity.get("shipments", [])
+    ]
+    payload.skus = [_map_sku_row(*row) for row in rows_by_entity.get("skus", [])]
+    payload.deposits = [DepositRead.model_validate(deposit) for deposit in rows_by_entity.get("deposits", [])]
+    payload.production_lots = [_map_production_lot_row(*row) for row in rows_by_entity.get("production_lots", [])]
+    payload.deleted = [
+        SyncTombstoneRead(entity=tombstone.entity, id=tombstone.entity_id, deleted_at=tombstone.deleted_at)
+        for tombstone in rows_by_entity[TOMBSTONES_KEY]
+    ]
+    return payload
+
+
 @router.get(
     "/sku-types",
     tags=["catalogs"],
     response_model=list[SKUTypeRead],
     dependencies=[Depends(require_permissions("sku_types.view"))],
 )
-def list_sku_types(include_inactive: bool = False, session: Session = Depends(get_session)) -> list[SKUTypeRead]:
+def list_sku_types(include_inactive: bool = False, session: Session = Depends(get_read_session)) -> list[SKUTypeRead]:
     statement = select(SKUType)
     if not include_inactive:
         statement = statement.where(SKUType.is_active.is_(True))
@@ -1421,7 +1943,7 @@ def delete_sku_type(sku_type_id: int, session: Session = Depends(get_session)) -
 def list_merma_types(
     stage: MermaStage | None = None,
     include_inactive: bool = False,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ) -> list[MermaTypeRead]:
     statement = select(MermaType)
     if stage:
@@ -1506,7 +2028,7 @@ def delete_merma_type(type_id: int, session: Session = Depends(get_session)) ->
 def list_merma_causes(
     stage: MermaStage | None = None,
     include_inactive: bool = False,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ) -> list[MermaCauseRead]:
     statement = select(MermaCause)
     if stage:
@@ -1588,7 +2110,7 @@ def list_skus(
     tags: list[str] | None = Query(None, description="Alias para sku_type_code"),
     include_inactive: bool = False,
     search: str | None = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ) -> list[SKURead]:
     """Listado simple para bootstrap de catálogo."""
     statement = select(SKU).join(SKUType)
@@ -1756,7 +2278,7 @@ def update_sku_status(sku_id: int, payload: StatusUpdate, session: Session = Dep
 
 
 @router.get("/deposits", tags=["deposits"], response_model=list[DepositRead], dependencies=[Depends(require_permissions("deposits.view"))])
-def list_deposits(include_inactive: bool = False, session: Session = Depends(get_session)) -> list[Deposit]:
+def list_deposits(include_inactive: bool = False, session: Session = Depends(get_read_session)) -> list[Deposit]:
     statement = select(Deposit)
     if not include_inactive:
         statement = statement.where(Deposit.is_active.is_(True))
@@ -1799,6 +2321,7 @@ def update_deposit(deposit_id: int, payload: DepositUpdate, session: Session = D
     update_data = payload.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(deposit, field, value)
+    deposit.updated_at = datetime.utcnow()
     session.add(deposit)
     session.commit()
     session.refresh(deposit)
@@ -1868,7 +2391,7 @@ def update_deposit_status(deposit_id: int, payload: StatusUpdate, session: Sessi
     response_model=list[ProductionLineRead],
     dependencies=[Depends(require_permissions("production_lines.view"))],
 )
-def list_production_lines(session: Session = Depends(get_session)) -> list[ProductionLineRead]:
+def list_production_lines(session: Session = Depends(get_read_session)) -> list[ProductionLineRead]:
     lines = session.exec(select(ProductionLine).order_by(ProductionLine.name)).all()
     return [ProductionLineRead(id=line.id, name=line.name, is_active=line.is_active) for line in lines]
 
@@ -1953,7 +2476,7 @@ def _map_recipe(recipe: Recipe, session: Session) -> RecipeRead:
     response_model=list[RecipeRead],
     dependencies=[Depends(require_permissions("recipes.view"))],
 )
-def list_recipes(include_inactive: bool = False, session: Session = Depends(get_session)) -> list[RecipeRead]:
+def list_recipes(include_inactive: bool = False, session: Session = Depends(get_read_session)) -> list[RecipeRead]:
     statement = select(Recipe)
     if not include_inactive:
         statement = statement.where(Recipe.is_active.is_(True))
@@ -2099,18 +2622,42 @@ def update_recipe_status(recipe_id: int, payload: StatusUpdate, session: Session
     response_model=list[OrderRead],
     dependencies=[Depends(require_permissions("orders.view"))],
 )
-def list_orders(
+async def list_orders(
     status_filter: OrderStatus | None = None,
     destination_deposit_id: int | None = None,
-    session: Session = Depends(get_session),
+    export_format: ExportFormat | None = Query(None, alias="format"),
+    conditional: ConditionalGet = Depends(),
+    session: AsyncSession = Depends(get_async_read_session),
 ) -> list[OrderRead]:
-    statement = select(Order)
+    conditions = []
     if status_filter:
-        statement = statement.where(Order.status == status_filter)
+        conditions.append(Order.status == status_filter)
     if destination_deposit_id:
-        statement = statement.where(Order.destination_deposit_id == destination_deposit_id)
-    orders = session.exec(statement.order_by(Order.created_at.desc())).all()
-    return [_map_order(order, session) for order in orders]
+        conditions.append(Order.destination_deposit_id == destination_deposit_id)
+    if export_format:
+        statement = (
+            select(
+                Order.id.label("order_id"),
+                Order.status.label("status"),
+                Order.destination.label("destination"),
+                Order.requested_by.label("requested_by"),
+                Order.requested_for.label("requested_for"),
+                Order.required_delivery_date.label("required_delivery_date"),
+                Order.created_at.label("created_at"),
+                SKU.code.label("sku_code"),
+                SKU.name.label("sku_name"),
+                OrderItem.quantity.label("quantity"),
+            )
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .outerjoin(SKU, SKU.id == OrderItem.sku_id)
+            .where(*conditions)
+            .order_by(Order.created_at.desc(), Order.id.desc(), OrderItem.id)
+        )
+        return _export_statement(session, export_format, "pedidos", statement)
+    validator = conditional.statement(Order, conditions, joined=(OrderItem, SKU, User, Shipment))
+    conditional.check((await session.execute(validator)).one())
+    orders = (await session.exec(select(Order).where(*conditions).order_by(Order.created_at.desc()))).all()
+    return await _map_orders_async(session, list(orders))
 
 
 @router.get(
@@ -2119,7 +2666,7 @@ def list_orders(
     response_model=OrderRead,
     dependencies=[Depends(require_permissions("orders.view"))],
 )
-def get_order(order_id: int, session: Session = Depends(get_session)) -> OrderRead:
+def get_order(order_id: int, session: Session = Depends(get_read_session)) -> OrderRead:
     order = session.get(Order, order_id)
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pedido no encontrado")
@@ -2307,6 +2854,7 @@ def update_order(
                 if dispatched <= 0:
                     existing_item.quantity = int(item["quantity"])
                     existing_item.current_stock = int(item["current_stock"]) if item.get("current_stock") is not None else None
+                    existing_item.updated_at = datetime.utcnow()
                     session.add(existing_item)
                 continue
             session.add(
@@ -2469,18 +3017,20 @@ def list_shipments(
     status_filter: ShipmentStatus | None = None,
     date_from: date | None = None,
     date_to: date | None = None,
-    session: Session = Depends(get_session),
+    conditional: ConditionalGet = Depends(),
+    session: Session = Depends(get_read_session),
 ) -> list[ShipmentRead]:
-    statement = select(Shipment)
+    conditions = []
     if deposit_id:
-        statement = statement.where(Shipment.deposit_id == deposit_id)
+        conditions.append(Shipment.deposit_id == deposit_id)
     if status_filter:
-        statement = statement.where(Shipment.status == status_filter)
+        conditions.append(Shipment.status == status_filter)
     if date_from:
-        statement = statement.where(Shipment.estimated_delivery_date >= date_from)
+        conditions.append(Shipment.estimated_delivery_date >= date_from)
     if date_to:
-        statement = statement.where(Shipment.estimated_delivery_date <= date_to)
-    shipments = session.exec(statement.order_by(Shipment.created_at.desc())).all()
+        conditions.append(Shipment.estimated_delivery_date <= date_to)
+    conditional.check(session.execute(conditional.statement(Shipment, conditions, joined=(Deposit,))).one())
+    shipments = session.exec(select(Shipment).where(*conditions).order_by(Shipment.created_at.desc())).all()
     return [_map_shipment(shipment, session) for shipment in shipments]
 
 
@@ -2490,7 +3040,7 @@ def list_shipments(
     response_model=ShipmentDetail,
     dependencies=[Depends(require_permissions("remitos.view"))],
 )
-def get_shipment(shipment_id: int, session: Session = Depends(get_session)) -> ShipmentDetail:
+def get_shipment(shipment_id: int, session: Session = Depends(get_read_session)) -> ShipmentDetail:
     shipment = _get_shipment_or_404(session, shipment_id)
     return _map_shipment(shipment, session, include_items=True)
 
@@ -2626,6 +3176,8 @@ def add_orders_to_shipment(
         "order_ids": payload.order_ids,
         "items": added_items,
     }
+    shipment.updated_at = datetime.utcnow()
+    session.add(shipment)
     _log_audit(session, "shipments", shipment.id, AuditAction.UPDATE, current_user.id, audit_changes)
     _sync_order_statuses(session, set(payload.order_ids), current_user, shipment_id=shipment.id)
     session.commit()
@@ -2659,40 +3211,40 @@ def update_shipment_items(
     before_quantities = {item.order_item_id: item.quantity for item in items}
     changes = []
 
-    for update in payload:
-        if update.order_item_id not in item_map:
+    for item_update in payload:
+        if item_update.order_item_id not in item_map:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ítem no pertenece al envío")
-        if update.quantity < 0:
+        if item_update.quantity < 0:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La cantidad no puede ser negativa")
-        order_item = session.get(OrderItem, update.order_item_id)
+        order_item = session.get(OrderItem, item_update.order_item_id)
         if not order_item:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ítem de pedido no encontrado")
         remaining = float(order_item.quantity) - assigned_quantities.get(order_item.id, 0.0)
-        if update.quantity > remaining:
+        if item_update.quantity > remaining:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="La cantidad supera lo pendiente por preparar",
             )
-        shipment_item = item_map[update.order_item_id]
-        if update.quantity == 0:
+        shipment_item = item_map[item_update.order_item_id]
+        if item_update.quantity == 0:
             session.delete(shipment_item)
             changes.append(
                 {
-                    "order_item_id": update.order_item_id,
+                    "order_item_id": item_update.order_item_id,
                     "before": shipment_item.quantity,
                     "after": 0,
                 }
             )
             continue
-        if shipment_item.quantity != update.quantity:
+        if shipment_item.quantity != item_update.quantity:
             changes.append(
                 {
-                    "order_item_id": update.order_item_id,
+                    "order_item_id": item_update.order_item_id,
                     "before": shipment_item.quantity,
-                    "after": update.quantity,
+                    "after": item_update.quantity,
                 }
             )
-        shipment_item.quantity = update.quantity
+        shipment_item.quantity = item_update.quantity
         shipment_item.updated_at = datetime.utcnow()
         session.add(shipment_item)
 
@@ -2703,6 +3255,8 @@ def update_shipment_items(
         "changes": changes,
         "before": before_quantities,
     }
+    shipment.updated_at = datetime.utcnow()
+    session.add(shipment)
     _log_audit(session, "shipments", shipment.id, AuditAction.UPDATE, current_user.id, audit_changes)
     order_ids = {item.order_id for item in items}
     _sync_order_statuses(session, order_ids, current_user, shipment_id=shipment.id)
@@ -2920,16 +3474,43 @@ def list_remitos(
     status_filter: RemitoStatus | None = None,
     date_from: date | None = None,
     date_to: date | None = None,
-    session: Session = Depends(get_session),
+    export_format: ExportFormat | None = Query(None, alias="format"),
+    conditional: ConditionalGet = Depends(),
+    session: Session = Depends(get_read_session),
 ) -> list[RemitoRead]:
-    statement = select(Remito)
+    conditions = []
     if status_filter:
-        statement = statement.where(Remito.status == status_filter)
+        conditions.append(Remito.status == status_filter)
     if date_from:
-        statement = statement.where(Remito.issue_date >= date_from)
+        conditions.append(Remito.issue_date >= date_from)
     if date_to:
-        statement = statement.where(Remito.issue_date <= date_to)
-    remitos = session.exec(statement.order_by(Remito.created_at.desc())).all()
+        conditions.append(Remito.issue_date <= date_to)
+    if export_format:
+        source_deposit = aliased(Deposit)
+        destination_deposit = aliased(Deposit)
+        statement = (
+            select(
+                Remito.id.label("remito_id"),
+                Remito.order_id.label("order_id"),
+                Remito.shipment_id.label("shipment_id"),
+                Remito.status.label("status"),
+                Remito.destination.label("destination"),
+                source_deposit.name.label("source_deposit"),
+                destination_deposit.name.label("destination_deposit"),
+                Remito.issue_date.label("issue_date"),
+                Remito.dispatched_at.label("dispatched_at"),
+                Remito.received_at.label("received_at"),
+                Remito.cancelled_at.label("cancelled_at"),
+            )
+            .outerjoin(source_deposit, source_deposit.id == Remito.source_deposit_id)
+            .outerjoin(destination_deposit, destination_deposit.id == Remito.destination_deposit_id)
+            .where(*conditions)
+            .order_by(Remito.created_at.desc(), Remito.id.desc())
+        )
+        return _export_statement(session, export_format, "remitos", statement)
+    validator = conditional.statement(Remito, conditions, joined=(SKU, User, Deposit, Order))
+    conditional.check(session.execute(validator).one())
+    remitos = session.exec(select(Remito).where(*conditions).order_by(Remito.created_at.desc())).all()
     return [_map_remito(remito, session) for remito in remitos]
 
 
@@ -2939,7 +3520,7 @@ def list_remitos(
     response_model=RemitoRead,
     dependencies=[Depends(require_permissions("remitos.view"))],
 )
-def get_remito(remito_id: int, session: Session = Depends(get_session)) -> RemitoRead:
+def get_remito(remito_id: int, session: Session = Depends(get_read_session)) -> RemitoRead:
     remito = _get_remito_or_404(session, remito_id)
     return _map_remito(remito, session)
 
@@ -2950,7 +3531,7 @@ def get_remito(remito_id: int, session: Session = Depends(get_session)) -> Remit
     response_class=FileResponse,
     dependencies=[Depends(require_permissions("remitos.view"))],
 )
-def get_remito_pdf(remito_id: int, session: Session = Depends(get_session)) -> FileResponse:
+def get_remito_pdf(remito_id: int, session: Session = Depends(get_read_session)) -> FileResponse:
     remito = _get_remito_or_404(session, remito_id)
     if not remito.pdf_path:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="El remito no tiene PDF generado")
@@ -3030,7 +3611,17 @@ def dispatch_remito(
                     movement_date=movement_date,
                     created_by_user_id=current_user.id,
                 )
-                _apply_stock_movement(session, movement_payload, allow_negative_balance=False)
+                _, movement = _apply_stock_movement(session, movement_payload, allow_negative_balance=False)
+                if lot:
+                    session.add(
+                        LotLineage(
+                            parent_lot_id=lot.id,
+                            remito_id=remito.id,
+                            remito_item_id=item.id,
+                            quantity=quantity,
+                            stock_movement_id=movement.id,
+                        )
+                    )
         else:
             movement_payload = StockMovementCreate(
                 sku_id=item.sku_id,
@@ -3157,7 +3748,7 @@ def cancel_remito(
     dependencies=[Depends(require_permissions("movement_types.view"))],
 )
 def list_stock_movement_types(
-    include_inactive: bool = False, session: Session = Depends(get_session)
+    include_inactive: bool = False, session: Session = Depends(get_read_session)
 ) -> list[StockMovementTypeRead]:
     statement = select(StockMovementType)
     if not include_inactive:
@@ -3238,7 +3829,7 @@ def delete_stock_movement_type(movement_type_id: int, session: Session = Depends
     response_model=list[SupplierRead],
     dependencies=[Depends(require_permissions("suppliers.view"))],
 )
-def list_suppliers(include_inactive: bool = False, session: Session = Depends(get_session)) -> list[SupplierRead]:
+def list_suppliers(include_inactive: bool = False, session: Session = Depends(get_read_session)) -> list[SupplierRead]:
     statement = select(Supplier)
     if not include_inactive:
         statement = statement.where(Supplier.is_active.is_(True))
@@ -3311,7 +3902,7 @@ def list_purchase_receipts(
     supplier_id: int | None = None,
     date_from: date | None = None,
     date_to: date | None = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ) -> list[PurchaseReceiptRead]:
     statement = select(PurchaseReceipt)
     if supplier_id:
@@ -3330,7 +3921,7 @@ def list_purchase_receipts(
     response_model=PurchaseReceiptRead,
     dependencies=[Depends(require_permissions("purchases.view"))],
 )
-def get_purchase_receipt(receipt_id: int, session: Session = Depends(get_session)) -> PurchaseReceiptRead:
+def get_purchase_receipt(receipt_id: int, session: Session = Depends(get_read_session)) -> PurchaseReceiptRead:
     receipt = session.get(PurchaseReceipt, receipt_id)
     if not receipt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingreso de compra no encontrado")
@@ -3349,112 +3940,453 @@ def create_purchase_receipt(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ) -> PurchaseReceiptRead:
-    supplier = session.get(Supplier, payload.supplier_id)
-    if not supplier or not supplier.is_active:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Proveedor no encontrado")
-    deposit = session.get(Deposit, payload.deposit_id)
-    if not deposit:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Depósito no encontrado")
-    if not payload.items:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Debes cargar al menos un ítem")
-
-    sku_ids = {item.sku_id for item in payload.items}
-    skus = session.exec(select(SKU).where(SKU.id.in_(sku_ids))).all()
-    if len(skus) != len(sku_ids):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Algún SKU no existe")
+    receipt = _create_purchase_receipts(session, [payload], current_user.id)[0]
+    session.commit()
+    session.refresh(receipt)
+    return _map_purchase_receipt(receipt, session)
 
-    for item in payload.items:
-        if item.quantity <= 0:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La cantidad debe ser mayor a cero")
-        if deposit.controls_lot and not item.lot_code:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote es obligatorio para el depósito seleccionado")
 
-    receipt = PurchaseReceipt(
-        supplier_id=supplier.id,
-        deposit_id=deposit.id,
-        received_at=payload.received_at or date.today(),
-        document_number=payload.document_number,
-        notes=payload.notes,
-        created_by_user_id=current_user.id,
-        updated_by_user_id=current_user.id,
+@router.post(
+    "/purchases/receipts/import",
+    tags=["purchases"],
+    dependencies=[Depends(require_permissions("purchases.create"))],
+)
+def import_purchase_receipts(
+    file: UploadFile = File(...),
+    chunk_size: int | None = Query(None, ge=1, le=PURCHASE_IMPORT_MAX_CHUNK_SIZE),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    try:
+        rows = parse_purchase_import_file(file.file.read(), file.filename, file.content_type)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    payloads = _build_purchase_import_payloads(session, rows)
+    return StreamingResponse(
+        _run_purchase_import(session.get_bind(), payloads, chunk_size or settings.purchase_import_chunk_size, current_user.id),
+        media_type="application/x-ndjson",
     )
-    session.add(receipt)
-    session.flush()
 
-    movement_type = _get_movement_type_by_code(session, "PURCHASE")
-    reference_value = payload.document_number or f"COMPRA-{receipt.id}"
 
-    for item in payload.items:
-        record = PurchaseReceiptItem(
-            receipt_id=receipt.id,
-            sku_id=item.sku_id,
-            quantity=item.quantity,
-            unit=item.unit,
-            lot_code=item.lot_code,
-            expiry_date=item.expiry_date,
-            unit_cost=item.unit_cost,
+def _build_purchase_import_payloads(
+    session: Session, rows: list[PurchaseReceiptImportRow]
+) -> list[PurchaseReceiptCreate]:
+    """Resuelve proveedores, depósitos, SKUs y lotes del archivo completo antes de registrar nada.
+
+    Las filas se agrupan en ingresos por proveedor, depósito, comprobante y fecha, respetando el orden del archivo.
+    """
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo no tiene filas")
+
+    supplier_keys = {row.supplier.strip().lower() for row in rows}
+    suppliers: dict[str, Supplier] = {}
+    for supplier in session.exec(
+        select(Supplier).where(
+            Supplier.is_active.is_(True),
+            or_(func.lower(Supplier.name).in_(supplier_keys), func.lower(Supplier.tax_id).in_(supplier_keys)),
         )
-        session.add(record)
-        session.flush()
+    ):
+        suppliers.setdefault(supplier.name.lower(), supplier)
+        if supplier.tax_id:
+            suppliers.setdefault(supplier.tax_id.lower(), supplier)
+    deposits = {
+        deposit.name.lower(): deposit
+        for deposit in session.exec(
+            select(Deposit).where(func.lower(Deposit.name).in_({row.deposit.strip().lower() for row in rows}))
+        )
+    }
+    skus = {
+        sku.code: sku for sku in session.exec(select(SKU).where(SKU.code.in_({row.sku_code.strip() for row in rows})))
+    }
+    lot_codes = {row.lot_code.strip() for row in rows if row.lot_code and row.lot_code.strip()}
+    lots = (
+        {lot.lot_code: lot for lot in session.exec(select(ProductionLot).where(ProductionLot.lot_code.in_(lot_codes)))}
+        if lot_codes
+        else {}
+    )
 
-        movement_payload = StockMovementCreate(
-            sku_id=item.sku_id,
-            deposit_id=deposit.id,
-            movement_type_id=movement_type.id,
-            quantity=item.quantity,
-            unit=item.unit,
-            lot_code=item.lot_code,
-            expiry_date=item.expiry_date,
-            reference_type="PURCHASE_RECEIPT",
-            reference_id=receipt.id,
-            reference_item_id=record.id,
-            reference=reference_value,
-            movement_date=receipt.received_at,
-            created_by_user_id=current_user.id,
+    errors: list[str] = []
+    file_lots: dict[str, tuple[int, int]] = {}
+    grouped: dict[tuple, PurchaseReceiptCreate] = {}
+    for number, row in enumerate(rows, start=2):
+        supplier = suppliers.get(row.supplier.strip().lower())
+        deposit = deposits.get(row.deposit.strip().lower())
+        sku = skus.get(row.sku_code.strip())
+        lot_code = row.lot_code.strip() if row.lot_code and row.lot_code.strip() else None
+        if not supplier:
+            errors.append(f"Fila {number}: proveedor inexistente ({row.supplier})")
+        if not deposit:
+            errors.append(f"Fila {number}: depósito inexistente ({row.deposit})")
+        if not sku:
+            errors.append(f"Fila {number}: SKU inexistente ({row.sku_code})")
+        if row.quantity <= 0:
+            errors.append(f"Fila {number}: la cantidad debe ser mayor a cero")
+        if deposit and deposit.controls_lot and not lot_code:
+            errors.append(f"Fila {number}: el lote es obligatorio para el depósito {deposit.name}")
+        if not (supplier and deposit and sku):
+            continue
+        if lot_code:
+            owner = (sku.id, deposit.id)
+            lot = lots.get(lot_code)
+            if lot and (lot.sku_id, lot.deposit_id) != owner:
+                errors.append(f"Fila {number}: el lote {lot_code} pertenece a otro SKU o depósito")
+            elif lot and lot.is_blocked:
+                errors.append(f"Fila {number}: el lote {lot_code} está bloqueado")
+            elif file_lots.setdefault(lot_code, owner) != owner:
+                errors.append(f"Fila {number}: el lote {lot_code} se repite con otro SKU o depósito")
+
+        received_at = row.received_at or date.today()
+        key = (supplier.id, deposit.id, row.document_number, received_at)
+        receipt = grouped.get(key)
+        if not receipt:
+            receipt = grouped[key] = PurchaseReceiptCreate(
+                supplier_id=supplier.id,
+                deposit_id=deposit.id,
+                received_at=received_at,
+                document_number=row.document_number,
+                notes=row.notes,
+                items=[],
+            )
+        receipt.items.append(
+            PurchaseReceiptItemPayload(
+                sku_id=sku.id,
+                quantity=row.quantity,
+                unit=row.unit or sku.unit,
+                lot_code=lot_code,
+                expiry_date=row.expiry_date,
+                unit_cost=row.unit_cost,
+            )
         )
-        _, movement = _apply_stock_movement(session, movement_payload, allow_negative_balance=True)
-        record.stock_movement_id = movement.id
-        record.updated_at = datetime.utcnow()
-        session.add(record)
 
-    _log_audit(
-        session,
-        "purchase_receipts",
-        receipt.id,
-        AuditAction.CREATE,
-        current_user.id,
-        {"supplier_id": supplier.id, "deposit_id": deposit.id, "items": len(payload.items)},
-    )
-    session.commit()
-    session.refresh(receipt)
-    return _map_purchase_receipt(receipt, session)
+    if errors:
+        shown = "; ".join(errors[:PURCHASE_IMPORT_MAX_ERRORS])
+        extra = len(errors) - PURCHASE_IMPORT_MAX_ERRORS
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{shown}; y {extra} errores más" if extra > 0 else shown,
+        )
+    return list(grouped.values())
 
 
-def _ensure_stock_level(session: Session, deposit_id: int, sku_id: int) -> StockLevel:
-    stock_level = session.exec(
-        select(StockLevel).where(StockLevel.deposit_id == deposit_id, StockLevel.sku_id == sku_id)
-    ).first()
-    if stock_level:
-        return stock_level
+def _run_purchase_import(
+    bind, payloads: list[PurchaseReceiptCreate], chunk_size: int, user_id: int | None
+) -> Iterator[bytes]:
+    """Registra los ingresos en bloques con commit propio y emite una línea NDJSON de progreso por bloque."""
+    progress = PurchaseReceiptImportProgress(
+        status="running",
+        receipts_total=len(payloads),
+        items_total=sum(len(payload.items) for payload in payloads),
+    )
+    # La sesión de la petición se cierra antes de terminar la respuesta: el import usa la suya.
+    with Session(bind) as session:
+        for start in range(0, len(payloads), chunk_size):
+            chunk = payloads[start : start + chunk_size]
+            try:
+                receipts = _create_purchase_receipts(session, chunk, user_id)
+                session.commit()
+            except Exception as exc:  # noqa: BLE001 - el error se informa al cliente en la línea de progreso
+                session.rollback()
+                progress.status = "failed"
+                if isinstance(exc, HTTPException):
+                    progress.error = str(exc.detail)
+                else:
+                    logger.exception("Falló la importación de ingresos de compra")
+                    progress.error = "Error inesperado al registrar los ingresos"
+                yield (progress.model_dump_json() + "\n").encode()
+                return
+            progress.receipts_done += len(chunk)
+            progress.items_done += sum(len(payload.items) for payload in chunk)
+            progress.receipt_ids.extend(receipt.id for receipt in receipts)
+            yield (progress.model_dump_json() + "\n").encode()
+    progress.status = "completed"
+    yield (progress.model_dump_json() + "\n").encode()
+
+
+def _create_purchase_receipts(
+    session: Session, payloads: list[PurchaseReceiptCreate], user_id: int | None
+) -> list[PurchaseReceipt]:
+    supplier_ids = {payload.supplier_id for payload in payloads}
+    suppliers = {
+        supplier.id: supplier
+        for supplier in session.exec(select(Supplier).where(Supplier.id.in_(supplier_ids), Supplier.is_active.is_(True)))
+    }
+    if len(suppliers) != len(supplier_ids):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Proveedor no encontrado")
+    deposit_ids = {payload.deposit_id for payload in payloads}
+    deposits = {deposit.id: deposit for deposit in session.exec(select(Deposit).where(Deposit.id.in_(deposit_ids)))}
+    if len(deposits) != len(deposit_ids):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Depósito no encontrado")
 
-    stock_level = StockLevel(deposit_id=deposit_id, sku_id=sku_id, quantity=0)
-    session.add(stock_level)
+    sku_ids: set[int] = set()
+    for payload in payloads:
+        if not payload.items:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Debes cargar al menos un ítem")
+        for item in payload.items:
+            if item.quantity <= 0:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La cantidad debe ser mayor a cero")
+            if deposits[payload.deposit_id].controls_lot and not item.lot_code:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail="El lote es obligatorio para el depósito seleccionado"
+                )
+            sku_ids.add(item.sku_id)
+    skus = {
+        sku.id: sku
+        for sku in session.exec(select(SKU).where(SKU.id.in_(sku_ids)).options(selectinload(SKU.sku_type)))
+    }
+    if len(skus) != len(sku_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Algún SKU no existe")
+
+    receipts = [
+        PurchaseReceipt(
+            supplier_id=payload.supplier_id,
+            deposit_id=payload.deposit_id,
+            received_at=payload.received_at or date.today(),
+            document_number=payload.document_number,
+            notes=payload.notes,
+            created_by_user_id=user_id,
+            updated_by_user_id=user_id,
+        )
+        for payload in payloads
+    ]
+    session.add_all(receipts)
     session.flush()
-    return stock_level
+    _post_purchase_receipt_items(session, list(zip(receipts, payloads)), skus, deposits, user_id)
+
+    for receipt, payload in zip(receipts, payloads):
+        _log_audit(
+            session,
+            "purchase_receipts",
+            receipt.id,
+            AuditAction.CREATE,
+            user_id,
+            {"supplier_id": receipt.supplier_id, "deposit_id": receipt.deposit_id, "items": len(payload.items)},
+        )
+    return receipts
 
 
-def _apply_stock_movement(
+def _post_purchase_receipt_items(
     session: Session,
-    payload: StockMovementCreate,
-    allow_negative_balance: bool = True,
-) -> tuple[StockLevel, StockMovement]:
-    if payload.quantity <= 0:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La cantidad debe ser mayor a cero")
+    receipts: list[tuple[PurchaseReceipt, PurchaseReceiptCreate]],
+    skus: dict[int, SKU],
+    deposits: dict[int, Deposit],
+    user_id: int | None,
+) -> None:
+    """Inserta los ítems de los ingresos y aplica su efecto en stock y lotes en bloque.
 
-    movement_type = _get_movement_type_or_404(session, payload.movement_type_id)
+    Equivale a un movimiento PURCHASE por ítem: los lotes nuevos se crean una sola vez aunque el código se repita
+    y los existentes suman su cantidad; los ítems, movimientos, lotes y saldos se escriben con un único INSERT o
+    UPDATE por tabla.
+    """
+    movement_type = _get_movement_type_by_code(session, "PURCHASE")
     if not movement_type.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El tipo de movimiento está inactivo")
-
+    if any(not (sku.sku_type and sku.sku_type.is_active) for sku in skus.values()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El tipo del SKU está inactivo")
+    semi_units = {
+        sku.id: _get_semi_units_per_kg(session, sku.id) for sku in skus.values() if sku.sku_type.code == SKU_SEMI_CODE
+    }
+
+    lines = [
+        (
+            receipt,
+            item,
+            _semi_quantity_in_kg(item.quantity, item.unit, semi_units[item.sku_id])
+            if item.sku_id in semi_units
+            else item.quantity,
+        )
+        for receipt, payload in receipts
+        for item in payload.items
+    ]
+    now = datetime.utcnow()
+
+    lot_codes = {item.lot_code for _, item, _ in lines if item.lot_code}
+    existing_lots: dict[str, ProductionLot] = {}
+    if lot_codes:
+        existing_lots = {
+            lot.lot_code: lot
+            for lot in session.exec(
+                select(ProductionLot)
+                .where(ProductionLot.lot_code.in_(lot_codes))
+                .order_by(ProductionLot.id)
+                .with_for_update()
+            )
+        }
+    new_lots: dict[str, dict] = {}
+    lot_deltas: dict[int, float] = defaultdict(float)
+    lot_expiries: dict[int, date | None] = {}
+    for receipt, item, base_quantity in lines:
+        if not item.lot_code:
+            continue
+        lot = existing_lots.get(item.lot_code)
+        if lot:
+            if lot.sku_id != item.sku_id or lot.deposit_id != receipt.deposit_id:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote pertenece a otro SKU o depósito")
+            if lot.is_blocked:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote está bloqueado para movimientos")
+            # Igual que un movimiento PURCHASE sobre un lote producido; lot_expiries marca los ya validados.
+            if lot.production_line_id and lot.id not in lot_expiries:
+                _validate_lot_code(
+                    session,
+                    lot.lot_code,
+                    skus[item.sku_id],
+                    deposits[receipt.deposit_id],
+                    _get_production_line_or_404(session, lot.production_line_id),
+                    lot.produced_at,
+                    allow_existing_id=lot.id,
+                )
+            expiry_date = lot_expiries.get(lot.id, lot.expiry_date)
+            if item.expiry_date and expiry_date and item.expiry_date != expiry_date:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El vencimiento no coincide con el lote")
+            lot_expiries[lot.id] = expiry_date or item.expiry_date
+            lot_deltas[lot.id] += base_quantity
+            continue
+        pending = new_lots.get(item.lot_code)
+        if not pending:
+            new_lots[item.lot_code] = {
+                "lot_code": item.lot_code,
+                "sku_id": item.sku_id,
+                "deposit_id": receipt.deposit_id,
+                "production_line_id": None,
+                "produced_quantity": base_quantity,
+                "remaining_quantity": base_quantity,
+                "produced_at": receipt.received_at,
+                "expiry_date": item.expiry_date,
+                "is_blocked": False,
+                "notes": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            continue
+        if pending["sku_id"] != item.sku_id or pending["deposit_id"] != receipt.deposit_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote pertenece a otro SKU o depósito")
+        if item.expiry_date and pending["expiry_date"] and item.expiry_date != pending["expiry_date"]:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El vencimiento no coincide con el lote")
+        pending["expiry_date"] = pending["expiry_date"] or item.expiry_date
+        pending["produced_quantity"] += base_quantity
+        pending["remaining_quantity"] += base_quantity
+
+    lot_ids = {code: lot.id for code, lot in existing_lots.items()}
+    if new_lots:
+        created = session.execute(
+            insert(ProductionLot).returning(ProductionLot.lot_code, ProductionLot.id), list(new_lots.values())
+        ).all()
+        lot_ids.update({lot_code: lot_id for lot_code, lot_id in created})
+    if lot_deltas:
+        lot_values = values(
+            column("id", Integer), column("delta", Float), column("expiry_date", Date), name="lot_receipts"
+        ).data([(lot_id, delta, lot_expiries[lot_id]) for lot_id, delta in lot_deltas.items()])
+        session.execute(
+            update(ProductionLot)
+            .where(ProductionLot.id == lot_values.c.id)
+            .values(
+                remaining_quantity=ProductionLot.remaining_quantity + lot_values.c.delta,
+                expiry_date=cast(lot_values.c.expiry_date, Date),
+                updated_at=now,
+            )
+        )
+
+    level_deltas: dict[tuple[int, int], float] = defaultdict(float)
+    for receipt, item, base_quantity in lines:
+        level_deltas[(receipt.deposit_id, item.sku_id)] += base_quantity
+    levels: dict[tuple[int, int], StockLevel] = {}
+    for level in session.exec(
+        select(StockLevel)
+        .where(tuple_(StockLevel.deposit_id, StockLevel.sku_id).in_(list(level_deltas)))
+        .order_by(StockLevel.id)
+        .with_for_update()
+    ):
+        levels.setdefault((level.deposit_id, level.sku_id), level)
+    missing_levels = [
+        StockLevel(deposit_id=deposit_id, sku_id=sku_id, quantity=0)
+        for deposit_id, sku_id in sorted(level_deltas.keys() - levels.keys())
+    ]
+    if missing_levels:
+        session.add_all(missing_levels)
+        session.flush()
+        levels.update({(level.deposit_id, level.sku_id): level for level in missing_levels})
+    level_values = values(column("id", Integer), column("delta", Float), name="level_receipts").data(
+        [(levels[key].id, delta) for key, delta in level_deltas.items()]
+    )
+    session.execute(
+        update(StockLevel)
+        .where(StockLevel.id == level_values.c.id)
+        .values(quantity=StockLevel.quantity + level_values.c.delta, updated_at=now)
+    )
+
+    item_ids = session.execute(
+        insert(PurchaseReceiptItem).returning(PurchaseReceiptItem.id, sort_by_parameter_order=True),
+        [
+            {
+                "receipt_id": receipt.id,
+                "sku_id": item.sku_id,
+                "quantity": item.quantity,
+                "unit": item.unit,
+                "lot_code": item.lot_code,
+                "expiry_date": item.expiry_date,
+                "unit_cost": item.unit_cost,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for receipt, item, _ in lines
+        ],
+    ).scalars().all()
+    movement_ids = session.execute(
+        insert(StockMovement).returning(StockMovement.id, sort_by_parameter_order=True),
+        [
+            {
+                "sku_id": item.sku_id,
+                "deposit_id": receipt.deposit_id,
+                "movement_type_id": movement_type.id,
+                "quantity": base_quantity,
+                "reference_type": "PURCHASE_RECEIPT",
+                "reference_id": receipt.id,
+                "reference_item_id": item_id,
+                "reference": receipt.document_number or f"COMPRA-{receipt.id}",
+                "lot_code": item.lot_code,
+                "production_lot_id": lot_ids.get(item.lot_code) if item.lot_code else None,
+                "movement_date": receipt.received_at,
+                "created_by_user_id": user_id,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for (receipt, item, base_quantity), item_id in zip(lines, item_ids)
+        ],
+    ).scalars().all()
+    item_values = values(column("id", Integer), column("stock_movement_id", Integer), name="receipt_movements").data(
+        list(zip(item_ids, movement_ids))
+    )
+    session.execute(
+        update(PurchaseReceiptItem)
+        .where(PurchaseReceiptItem.id == item_values.c.id)
+        .values(stock_movement_id=item_values.c.stock_movement_id)
+    )
+
+
+def _ensure_stock_level(session: Session, deposit_id: int, sku_id: int) -> StockLevel:
+    stock_level = session.exec(
+        select(StockLevel).where(StockLevel.deposit_id == deposit_id, StockLevel.sku_id == sku_id)
+    ).first()
+    if stock_level:
+        return stock_level
+
+    stock_level = StockLevel(deposit_id=deposit_id, sku_id=sku_id, quantity=0)
+    session.add(stock_level)
+    session.flush()
+    return stock_level
+
+
+def _apply_stock_movement(
+    session: Session,
+    payload: StockMovementCreate,
+    allow_negative_balance: bool = True,
+) -> tuple[StockLevel, StockMovement]:
+    if payload.quantity <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La cantidad debe ser mayor a cero")
+
+    movement_type = _get_movement_type_or_404(session, payload.movement_type_id)
+    if not movement_type.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El tipo de movimiento está inactivo")
+
     sku = session.get(SKU, payload.sku_id)
     deposit = session.get(Deposit, payload.deposit_id)
     if not sku or not deposit:
@@ -3534,8 +4466,12 @@ def _apply_stock_movement(
     if movement_code == "PRODUCTION" and not production_lot:
         if not production_line:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La línea de producción es obligatoria")
-        lot_code = lot_code or _generate_lot_code(session, sku, production_line, produced_at)
-        _validate_lot_code(session, lot_code, sku, deposit, production_line, produced_at)
+        if lot_code:
+            _validate_lot_code(session, lot_code, sku, deposit, production_line, produced_at)
+            _register_lot_sequence(session, lot_code, sku, production_line, produced_at)
+        else:
+            lot_code = _generate_lot_code(session, sku, production_line, produced_at)
+            _validate_lot_code(session, lot_code, sku, deposit, production_line, produced_at)
         production_lot = ProductionLot(
             lot_code=lot_code,
             sku_id=sku.id,
@@ -3611,6 +4547,7 @@ def _apply_stock_movement(
         session.add(production_lot)
 
     stock_level.quantity = new_quantity
+    stock_level.updated_at = datetime.utcnow()
     movement = StockMovement(
         sku_id=payload.sku_id,
         deposit_id=payload.deposit_id,
@@ -3646,36 +4583,64 @@ def _apply_stock_movement(
 
 
 def _map_stock_movement(movement: StockMovement, session: Session) -> StockMovementRead:
-    session.refresh(movement, attribute_names=["sku", "deposit", "movement_type", "production_lot"])
-    production_line_id = None
-    production_line_name = None
-    expiry_date = None
-    if movement.production_lot:
-        session.refresh(movement.production_lot, attribute_names=["production_line"])
-        production_line_id = movement.production_lot.production_line_id
-        production_line_name = (
-            movement.production_lot.production_line.name if movement.production_lot.production_line else None
+    row = session.exec(_stock_movement_read_statement().where(StockMovement.id == movement.id)).one()
+    return _map_stock_movement_row(*row)
+
+
+def _stock_movement_read_statement():
+    current_balance = (
+        select(StockLevel.quantity)
+        .where(StockLevel.deposit_id == StockMovement.deposit_id, StockLevel.sku_id == StockMovement.sku_id)
+        .order_by(StockLevel.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            StockMovement,
+            SKU.code,
+            SKU.name,
+            Deposit.name,
+            StockMovementType.code,
+            StockMovementType.label,
+            ProductionLot.production_line_id,
+            ProductionLine.name,
+            ProductionLot.expiry_date,
+            current_balance,
+            User.full_name,
         )
-        expiry_date = movement.production_lot.expiry_date
-    stock_level = session.exec(
-        select(StockLevel).where(StockLevel.deposit_id == movement.deposit_id, StockLevel.sku_id == movement.sku_id)
-    ).first()
-    current_balance = stock_level.quantity if stock_level else 0
-    created_by_name = None
-    if movement.created_by_user_id:
-        user = session.get(User, movement.created_by_user_id)
-        created_by_name = user.full_name if user else None
+        .outerjoin(SKU, SKU.id == StockMovement.sku_id)
+        .outerjoin(Deposit, Deposit.id == StockMovement.deposit_id)
+        .outerjoin(StockMovementType, StockMovementType.id == StockMovement.movement_type_id)
+        .outerjoin(ProductionLot, ProductionLot.id == StockMovement.production_lot_id)
+        .outerjoin(ProductionLine, ProductionLine.id == ProductionLot.production_line_id)
+        .outerjoin(User, User.id == StockMovement.created_by_user_id)
+    )
 
+
+def _map_stock_movement_row(
+    movement: StockMovement,
+    sku_code: str | None,
+    sku_name: str | None,
+    deposit_name: str | None,
+    movement_type_code: str | None,
+    movement_type_label: str | None,
+    production_line_id: int | None,
+    production_line_name: str | None,
+    expiry_date: date | None,
+    current_balance: float | None,
+    created_by_name: str | None,
+) -> StockMovementRead:
     return StockMovementRead(
         id=movement.id,
         sku_id=movement.sku_id,
-        sku_code=movement.sku.code if movement.sku else str(movement.sku_id),
-        sku_name=movement.sku.name if movement.sku else f"SKU {movement.sku_id}",
+        sku_code=sku_code if sku_code is not None else str(movement.sku_id),
+        sku_name=sku_name if sku_name is not None else f"SKU {movement.sku_id}",
         deposit_id=movement.deposit_id,
-        deposit_name=movement.deposit.name if movement.deposit else "",
+        deposit_name=deposit_name or "",
         movement_type_id=movement.movement_type_id,
-        movement_type_code=movement.movement_type.code if movement.movement_type else "",
-        movement_type_label=movement.movement_type.label if movement.movement_type else "",
+        movement_type_code=movement_type_code or "",
+        movement_type_label=movement_type_label or "",
         quantity=movement.quantity,
         reference_type=movement.reference_type,
         reference_id=movement.reference_id,
@@ -3688,7 +4653,7 @@ def _map_stock_movement(movement: StockMovement, session: Session) -> StockMovem
         expiry_date=expiry_date,
         movement_date=movement.movement_date,
         created_at=movement.created_at,
-        current_balance=current_balance,
+        current_balance=current_balance or 0,
         created_by_user_id=movement.created_by_user_id,
         created_by_name=created_by_name,
     )
@@ -3710,6 +4675,7 @@ def _map_inventory_count_item(item: InventoryCountItem, session: Session) -> Inv
         counted_quantity=item.counted_quantity,
         system_quantity=item.system_quantity,
         difference=item.difference,
+        expected_quantity=item.expected_quantity,
         unit=item.unit,
         stock_movement_id=item.stock_movement_id,
     )
@@ -3748,6 +4714,7 @@ def _map_inventory_count(count: InventoryCount, session: Session) -> InventoryCo
         updated_by_name=updated_by_name,
         approved_by_user_id=count.approved_by_user_id,
         approved_by_name=approved_by_name,
+        snapshot_movement_id=count.snapshot_movement_id,
         items=[_map_inventory_count_item(item, session) for item in count.items],
     )
 
@@ -3794,11 +4761,7 @@ def _map_purchase_receipt(receipt: PurchaseReceipt, session: Session) -> Purchas
     )
 
 
-def _map_audit_log(record: AuditLog, session: Session) -> AuditLogRead:
-    user_name = None
-    if record.user_id:
-        user = session.get(User, record.user_id)
-        user_name = user.full_name if user else None
+def _map_audit_log(record: AuditLog, user_name: str | None) -> AuditLogRead:
     return AuditLogRead(
         id=record.id,
         entity_type=record.entity_type,
@@ -3813,20 +4776,7 @@ def _map_audit_log(record: AuditLog, session: Session) -> AuditLogRead:
 
 
 def _map_merma_event(event: MermaEvent, session: Session) -> MermaEventRead:
-    session.refresh(
-        event,
-        attribute_names=[
-            "sku",
-            "deposit",
-            "production_line",
-            "type",
-            "cause",
-            "remito",
-            "order",
-            "stock_movement",
-            "reported_by_user",
-        ],
-    )
+    session.refresh(event, attribute_names=["sku", "deposit", "production_line", "reported_by_user"])
     return MermaEventRead(
         id=event.id,
         stage=event.stage,
@@ -3849,6 +4799,7 @@ def _map_merma_event(event: MermaEvent, session: Session) -> MermaEventRead:
         production_line_id=event.production_line_id,
         production_line_name=event.production_line.name if event.production_line else None,
         reported_by_user_id=event.reported_by_user_id,
+        reported_by_user_name=event.reported_by_user.full_name if event.reported_by_user else None,
         reported_by_role=event.reported_by_role,
         notes=event.notes,
         detected_at=event.detected_at,
@@ -3866,9 +4817,17 @@ def _map_merma_event(event: MermaEvent, session: Session) -> MermaEventRead:
     response_model=list[StockLevelRead],
     dependencies=[Depends(require_permissions("stock.view"))],
 )
-def list_stock_levels(session: Session = Depends(get_session)) -> list[StockLevelRead]:
-    stock_levels = session.exec(select(StockLevel)).all()
-    return [_map_stock_level(level, session) for level in stock_levels]
+async def list_stock_levels(
+    conditional: ConditionalGet = Depends(), session: AsyncSession = Depends(get_async_read_session)
+) -> list[StockLevelRead]:
+    conditional.check((await session.execute(conditional.statement(StockLevel, [], joined=(SKU, Deposit)))).one())
+    rows = await session.exec(
+        select(StockLevel, SKU, Deposit)
+        .join(SKU, SKU.id == StockLevel.sku_id)
+        .join(Deposit, Deposit.id == StockLevel.deposit_id)
+        .order_by(StockLevel.id)
+    )
+    return [_map_stock_level_row(level, sku, deposit) for level, sku, deposit in rows.all()]
 
 
 @router.post(
@@ -3885,7 +4844,14 @@ def register_stock_movement(
 ) -> StockLevelRead:
     payload.created_by_user_id = payload.created_by_user_id or current_user.id
     stock_level, movement = _apply_stock_movement(session, payload)
-    _log_audit(session, "stock_movements", movement.id, AuditAction.CREATE, payload.created_by_user_id, payload.model_dump())
+    _log_audit(
+        session,
+        "stock_movements",
+        movement.id,
+        AuditAction.CREATE,
+        payload.created_by_user_id,
+        payload.model_dump(mode="json", exclude_none=True),
+    )
     session.commit()
     session.refresh(stock_level, attribute_names=["sku", "deposit"])
     return _map_stock_level(stock_level, session)
@@ -3897,7 +4863,7 @@ def register_stock_movement(
     response_model=StockMovementList,
     dependencies=[Depends(require_permissions("stock.view"))],
 )
-def list_stock_movements(
+async def list_stock_movements(
     sku_id: int | None = None,
     deposit_id: int | None = None,
     movement_type_id: int | None = None,
@@ -3910,71 +4876,181 @@ def list_stock_movements(
     date_to: date | None = None,
     limit: int = 50,
     offset: int = 0,
-    session: Session = Depends(get_session),
+    export_format: ExportFormat | None = Query(None, alias="format"),
+    session: AsyncSession = Depends(get_async_read_session),
 ) -> StockMovementList:
-    statement = select(StockMovement)
+    conditions = []
     if sku_id:
-        statement = statement.where(StockMovement.sku_id == sku_id)
+        conditions.append(StockMovement.sku_id == sku_id)
     if deposit_id:
-        statement = statement.where(StockMovement.deposit_id == deposit_id)
+        conditions.append(StockMovement.deposit_id == deposit_id)
     if movement_type_id:
-        statement = statement.where(StockMovement.movement_type_id == movement_type_id)
+        conditions.append(StockMovement.movement_type_id == movement_type_id)
     if movement_type_code:
-        statement = statement.join(StockMovementType).where(
-            StockMovementType.code == movement_type_code.strip().upper()
+        conditions.append(
+            StockMovement.movement_type_id.in_(
+                select(StockMovementType.id).where(StockMovementType.code == movement_type_code.strip().upper())
+            )
         )
     if production_line_id:
-        statement = statement.join(ProductionLot).where(ProductionLot.production_line_id == production_line_id)
+        conditions.append(
+            StockMovement.production_lot_id.in_(
+                select(ProductionLot.id).where(ProductionLot.production_line_id == production_line_id)
+            )
+        )
     if lot_code:
-        statement = statement.where(StockMovement.lot_code == lot_code)
+        conditions.append(StockMovement.lot_code == lot_code)
     if reference_type:
-        statement = statement.where(func.upper(StockMovement.reference_type) == reference_type.strip().upper())
+        conditions.append(func.upper(StockMovement.reference_type) == reference_type.strip().upper())
     if reference_id is not None:
-        statement = statement.where(StockMovement.reference_id == reference_id)
+        conditions.append(StockMovement.reference_id == reference_id)
     if date_from:
-        statement = statement.where(StockMovement.movement_date >= date_from)
+        conditions.append(StockMovement.movement_date >= date_from)
     if date_to:
-        statement = statement.where(StockMovement.movement_date <= date_to)
+        conditions.append(StockMovement.movement_date <= date_to)
+
+    if export_format:
+        export_statement = (
+            select(
+                StockMovement.id.label("movement_id"),
+                StockMovement.movement_date.label("movement_date"),
+                StockMovementType.code.label("movement_type"),
+                SKU.code.label("sku_code"),
+                SKU.name.label("sku_name"),
+                Deposit.name.label("deposit"),
+                StockMovement.quantity.label("quantity"),
+                StockMovement.lot_code.label("lot_code"),
+                StockMovement.reference_type.label("reference_type"),
+                StockMovement.reference_id.label("reference_id"),
+                StockMovement.reference.label("reference"),
+                StockMovement.created_at.label("created_at"),
+            )
+            .join(StockMovementType, StockMovementType.id == StockMovement.movement_type_id)
+            .join(SKU, SKU.id == StockMovement.sku_id)
+            .join(Deposit, Deposit.id == StockMovement.deposit_id)
+            .where(*conditions)
+            .order_by(StockMovement.movement_date.desc(), StockMovement.id.desc())
+        )
+        return _export_statement(session, export_format, "movimientos-stock", export_statement)
 
     safe_limit = max(1, min(limit, 200))
     safe_offset = max(offset, 0)
-    result = session.exec(
-        select(func.count()).select_from(statement.subquery())
+    total_rows, rows = await _gather_reads(
+        session,
+        select(func.count()).select_from(StockMovement).where(*conditions),
+        _stock_movement_read_statement()
+        .where(*conditions)
+        .order_by(StockMovement.movement_date.desc(), StockMovement.id.desc())
+        .offset(safe_offset)
+        .limit(safe_limit),
     )
-    total = result.first()
-    if isinstance(total, tuple):
-        total = total[0]
+    return StockMovementList(total=total_rows[0] or 0, items=[_map_stock_movement_row(*row) for row in rows])
 
-    records = session.exec(
-        statement.order_by(StockMovement.movement_date.desc(), StockMovement.id.desc())
-        .offset(safe_offset)
-        .limit(safe_limit)
+
+def _get_skus_by_id(session: Session, sku_ids: set[int]) -> dict[int, SKU]:
+    skus = {sku.id: sku for sku in session.exec(select(SKU).where(SKU.id.in_(sku_ids))).all()} if sku_ids else {}
+    if len(skus) != len(sku_ids):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="SKU no encontrado")
+    return skus
+
+
+def _net_movements_since(
+    session: Session,
+    deposit: Deposit,
+    snapshot_movement_id: int,
+    sku_ids: set[int],
+) -> dict[tuple[int, int | None], float]:
+    """Neto de movimientos posteriores al corte, agrupado por SKU (y lote si el depósito controla lotes)."""
+    if not sku_ids:
+        return {}
+    lot_column = StockMovement.production_lot_id if deposit.controls_lot else literal(None, type_=Integer)
+    rows = session.exec(
+        select(StockMovement.sku_id, lot_column, func.sum(StockMovement.quantity))
+        .where(
+            StockMovement.deposit_id == deposit.id,
+            StockMovement.id > snapshot_movement_id,
+            StockMovement.sku_id.in_(sku_ids),
+        )
+        .group_by(StockMovement.sku_id, lot_column)
     ).all()
-    return StockMovementList(total=total or 0, items=[_map_stock_movement(item, session) for item in records])
+    return {(sku_id, production_lot_id): float(quantity or 0) for sku_id, production_lot_id, quantity in rows}
+
+
+def _movement_key(deposit: Deposit, key: tuple[int, int | None]) -> tuple[int, int | None]:
+    return key if deposit.controls_lot else (key[0], None)
 
 
-def _resolve_system_quantity(
+def _resolve_system_quantities(
     session: Session,
     deposit: Deposit,
-    sku: SKU,
-    production_lot_id: int | None,
-) -> tuple[float, ProductionLot | None]:
+    keys: list[tuple[int, int | None]],
+    snapshot_movement_id: int | None = None,
+) -> dict[tuple[int, int | None], tuple[float, str | None]]:
+    """Resuelve el stock del sistema de todas las líneas con una consulta de lotes o una de saldos.
+
+    Con snapshot_movement_id se descuentan los movimientos posteriores al corte, de modo que todas las líneas
+    reflejan el stock al inicio del conteo sin importar cuándo se cargaron.
+    """
+    if not keys:
+        return {}
+    resolved = _resolve_current_quantities(session, deposit, keys)
+    if snapshot_movement_id is None:
+        return resolved
+    net = _net_movements_since(session, deposit, snapshot_movement_id, {sku_id for sku_id, _ in keys})
+    return {
+        key: (quantity - net.get(_movement_key(deposit, key), 0.0), lot_code)
+        for key, (quantity, lot_code) in resolved.items()
+    }
+
+
+def _resolve_current_quantities(
+    session: Session,
+    deposit: Deposit,
+    keys: list[tuple[int, int | None]],
+) -> dict[tuple[int, int | None], tuple[float, str | None]]:
     if deposit.controls_lot:
-        if not production_lot_id:
+        if any(production_lot_id is None for _, production_lot_id in keys):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El depósito requiere lote")
-        lot = session.get(ProductionLot, production_lot_id)
-        if not lot:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lote no encontrado")
-        if lot.deposit_id != deposit.id:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote pertenece a otro depósito")
-        if lot.sku_id != sku.id:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote no corresponde al SKU indicado")
-        return float(lot.remaining_quantity), lot
+        lot_ids = {production_lot_id for _, production_lot_id in keys}
+        lots = {lot.id: lot for lot in session.exec(select(ProductionLot).where(ProductionLot.id.in_(lot_ids))).all()}
+        resolved: dict[tuple[int, int | None], tuple[float, str | None]] = {}
+        for sku_id, production_lot_id in keys:
+            lot = lots.get(production_lot_id)
+            if not lot:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lote no encontrado")
+            if lot.deposit_id != deposit.id:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote pertenece a otro depósito")
+            if lot.sku_id != sku_id:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote no corresponde al SKU indicado")
+            resolved[(sku_id, production_lot_id)] = (float(lot.remaining_quantity), lot.lot_code)
+        return resolved
+
+    sku_ids = {sku_id for sku_id, _ in keys}
+    balances = dict(
+        session.exec(
+            select(StockLevel.sku_id, StockLevel.quantity).where(
+                StockLevel.deposit_id == deposit.id, StockLevel.sku_id.in_(sku_ids)
+            )
+        ).all()
+    )
+    return {key: (float(balances.get(key[0], 0.0)), None) for key in keys}
 
-    stock_level = session.exec(
-        select(StockLevel).where(StockLevel.deposit_id == deposit.id, StockLevel.sku_id == sku.id)
-    ).first()
-    return float(stock_level.quantity) if stock_level else 0.0, None
+
+def _build_inventory_count_item_read(item: InventoryCountItem, sku: SKU | None) -> InventoryCountItemRead:
+    return InventoryCountItemRead(
+        id=item.id,
+        sku_id=item.sku_id,
+        sku_code=sku.code if sku else str(item.sku_id),
+        sku_name=sku.name if sku else f"SKU {item.sku_id}",
+        production_lot_id=item.production_lot_id,
+        lot_code=item.lot_code,
+        counted_quantity=item.counted_quantity,
+        system_quantity=item.system_quantity,
+        difference=item.difference,
+        expected_quantity=item.expected_quantity,
+        unit=item.unit,
+        stock_movement_id=item.stock_movement_id,
+    )
 
 
 def _replace_inventory_count_items(
@@ -3988,11 +5064,12 @@ def _replace_inventory_count_items(
         session.delete(item)
     session.flush()
 
-    for payload in items:
-        sku = session.get(SKU, payload["sku_id"])
-        if not sku:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="SKU no encontrado")
-        system_quantity, lot = _resolve_system_quantity(session, deposit, sku, payload.get("production_lot_id"))
+    skus = _get_skus_by_id(session, {payload["sku_id"] for payload in items})
+    keys = [(payload["sku_id"], payload.get("production_lot_id")) for payload in items]
+    system_quantities = _resolve_system_quantities(session, deposit, keys, count.snapshot_movement_id)
+    for payload, key in zip(items, keys):
+        sku = skus[payload["sku_id"]]
+        system_quantity, lot_code = system_quantities[key]
         counted = float(payload["counted_quantity"])
         difference = counted - system_quantity
         session.add(
@@ -4000,7 +5077,7 @@ def _replace_inventory_count_items(
                 inventory_count_id=count.id,
                 sku_id=sku.id,
                 production_lot_id=payload.get("production_lot_id"),
-                lot_code=lot.lot_code if lot else None,
+                lot_code=lot_code,
                 counted_quantity=counted,
                 system_quantity=system_quantity,
                 difference=difference,
@@ -4020,7 +5097,7 @@ def list_inventory_counts(
     deposit_id: int | None = None,
     date_from: date | None = None,
     date_to: date | None = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
 ) -> list[InventoryCountRead]:
     statement = select(InventoryCount)
     if status_filter:
@@ -4041,7 +5118,7 @@ def list_inventory_counts(
     response_model=InventoryCountRead,
     dependencies=[Depends(require_permissions("inventory.view"))],
 )
-def get_inventory_count(count_id: int, session: Session = Depends(get_session)) -> InventoryCountRead:
+def get_inventory_count(count_id: int, session: Session = Depends(get_read_session)) -> InventoryCountRead:
     count = session.get(InventoryCount, count_id)
     if not count:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conteo no encontrado")
@@ -4071,6 +5148,7 @@ def create_inventory_count(
         notes=payload.notes,
         created_by_user_id=current_user.id,
         updated_by_user_id=current_user.id,
+        snapshot_movement_id=session.exec(select(func.coalesce(func.max(StockMovement.id), 0))).one(),
     )
     session.add(count)
     session.flush()
@@ -4121,106 +5199,310 @@ def update_inventory_count(
     return _map_inventory_count(count, session)
 
 
-@router.post(
-    "/inventory-counts/{count_id}/submit",
+@router.patch(
+    "/inventory-counts/{count_id}/items",
     tags=["inventory"],
-    response_model=InventoryCountRead,
-    dependencies=[Depends(require_permissions("inventory.close"))],
+    response_model=InventoryCountItemsDiff,
+    dependencies=[Depends(require_permissions("inventory.edit"))],
 )
-def submit_inventory_count(
+def patch_inventory_count_items(
     count_id: int,
+    payload: InventoryCountItemsPatch,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
-) -> InventoryCountRead:
-    count = session.get(InventoryCount, count_id)
+) -> InventoryCountItemsDiff:
+    # El bloqueo del conteo serializa los autoguardados concurrentes de distintas terminales.
+    count = session.exec(select(InventoryCount).where(InventoryCount.id == count_id).with_for_update()).first()
     if not count:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conteo no encontrado")
     if count.status != InventoryCountStatus.DRAFT:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El conteo ya fue enviado")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Solo se pueden editar conteos en borrador")
+    if not payload.items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Debes cargar al menos un ítem")
+
+    changes = {(item.sku_id, item.production_lot_id): item for item in payload.items}
+    if any(not item.remove and item.counted_quantity is None for item in changes.values()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Indica la cantidad contada")
+
+    deposit = _get_deposit_or_404(session, count.deposit_id)
+    skus = _get_skus_by_id(session, {sku_id for sku_id, _ in changes})
+    system_quantities = _resolve_system_quantities(
+        session,
+        deposit,
+        [key for key, item in changes.items() if not item.remove],
+        count.snapshot_movement_id,
+    )
+
+    existing: dict[tuple[int, int | None], list[InventoryCountItem]] = {}
+    for item in session.exec(
+        select(InventoryCountItem)
+        .where(
+            InventoryCountItem.inventory_count_id == count.id,
+            InventoryCountItem.sku_id.in_(skus.keys()),
+        )
+        .order_by(InventoryCountItem.id)
+    ).all():
+        existing.setdefault((item.sku_id, item.production_lot_id), []).append(item)
+
+    created: list[InventoryCountItem] = []
+    updated: list[InventoryCountItem] = []
+    removed: list[InventoryCountItemRead] = []
+    unchanged = 0
+    for key, change in changes.items():
+        current_items = existing.get(key, [])
+        if change.remove:
+            for item in current_items:
+                removed.append(_build_inventory_count_item_read(item, skus[item.sku_id]))
+                session.delete(item)
+            continue
+
+        # Un reemplazo completo previo pudo dejar la misma clave repetida: se conserva la primera línea.
+        for duplicate in current_items[1:]:
+            removed.append(_build_inventory_count_item_read(duplicate, skus[duplicate.sku_id]))
+            session.delete(duplicate)
+
+        system_quantity, lot_code = system_quantities[key]
+        counted = float(change.counted_quantity)
+        item = current_items[0] if current_items else None
+        if item is None:
+            item = InventoryCountItem(
+                inventory_count_id=count.id,
+                sku_id=key[0],
+                production_lot_id=key[1],
+                lot_code=lot_code,
+                counted_quantity=counted,
+                system_quantity=system_quantity,
+                difference=counted - system_quantity,
+                unit=skus[key[0]].unit,
+            )
+            created.append(item)
+        elif (item.counted_quantity, item.system_quantity, item.lot_code) == (counted, system_quantity, lot_code):
+            unchanged += 1
+            continue
+        else:
+            item.counted_quantity = counted
+            item.system_quantity = system_quantity
+            item.difference = counted - system_quantity
+            item.lot_code = lot_code
+            item.updated_at = datetime.utcnow()
+            updated.append(item)
+        session.add(item)
 
-    count.status = InventoryCountStatus.SUBMITTED
-    count.submitted_at = datetime.utcnow()
     count.updated_at = datetime.utcnow()
     count.updated_by_user_id = current_user.id
     session.add(count)
-    _log_audit(session, "inventory_counts", count.id, AuditAction.STATUS, current_user.id, {"status": count.status})
+    session.flush()
+    _log_audit(
+        session,
+        "inventory_counts",
+        count.id,
+        AuditAction.UPDATE,
+        current_user.id,
+        {"items": {"created": len(created), "updated": len(updated), "removed": len(removed)}},
+    )
+    diff = InventoryCountItemsDiff(
+        count_id=count.id,
+        created=[_build_inventory_count_item_read(item, skus[item.sku_id]) for item in created],
+        updated=[_build_inventory_count_item_read(item, skus[item.sku_id]) for item in updated],
+        removed=removed,
+        unchanged=unchanged,
+    )
     session.commit()
-    session.refresh(count)
-    return _map_inventory_count(count, session)
+    return diff
 
 
 @router.post(
-    "/inventory-counts/{count_id}/approve",
+    "/inventory-counts/{count_id}/prefill",
     tags=["inventory"],
-    response_model=InventoryCountRead,
-    dependencies=[Depends(require_permissions("inventory.close"))],
+    response_model=InventoryCountPrefillResult,
+    dependencies=[Depends(require_permissions("inventory.edit"))],
 )
-def approve_inventory_count(
+def prefill_inventory_count(
     count_id: int,
+    payload: InventoryCountPrefillRequest | None = None,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
-) -> InventoryCountRead:
-    count = session.get(InventoryCount, count_id)
+) -> InventoryCountPrefillResult:
+    payload = payload or InventoryCountPrefillRequest()
+    count = session.exec(select(InventoryCount).where(InventoryCount.id == count_id).with_for_update()).first()
     if not count:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conteo no encontrado")
-    if count.status != InventoryCountStatus.SUBMITTED:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El conteo debe estar enviado para aprobarse")
-
-    session.refresh(count, attribute_names=["items"])
+    if count.status != InventoryCountStatus.DRAFT:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Solo se pueden editar conteos en borrador")
     deposit = _get_deposit_or_404(session, count.deposit_id)
-    movement_type = _get_movement_type_by_code(session, "ADJUSTMENT")
-    reference = f"INVENTARIO-{count.id}"
 
-    for item in count.items:
-        if item.difference == 0:
-            continue
-        if deposit.controls_lot and not item.production_lot_id:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Falta lote en depósito con control de lotes")
-
-        lot_code = item.lot_code
-        if item.production_lot_id:
-            lot = session.get(ProductionLot, item.production_lot_id)
-            lot_code = lot.lot_code if lot else lot_code
+    # Las líneas precargadas arrancan con lo contado igual al sistema: sin ajuste hasta que se corrijan.
+    now = literal(datetime.utcnow())
+    snapshot_net = None
+    if count.snapshot_movement_id is not None:
+        lot_column = StockMovement.production_lot_id if deposit.controls_lot else literal(None, type_=Integer)
+        snapshot_net = (
+            select(
+                StockMovement.sku_id.label("sku_id"),
+                lot_column.label("production_lot_id"),
+                func.sum(StockMovement.quantity).label("quantity"),
+            )
+            .where(StockMovement.deposit_id == deposit.id, StockMovement.id > count.snapshot_movement_id)
+            .group_by(StockMovement.sku_id, lot_column)
+            .subquery("snapshot_net")
+        )
+    if deposit.controls_lot:
+        system_quantity = ProductionLot.remaining_quantity
+        if snapshot_net is not None:
+            system_quantity = system_quantity - func.coalesce(snapshot_net.c.quantity, 0.0)
+        source = (
+            select(
+                literal(count.id),
+                ProductionLot.sku_id,
+                ProductionLot.id,
+                ProductionLot.lot_code,
+                system_quantity,
+                system_quantity,
+                literal(0.0),
+                SKU.unit,
+                now,
+                now,
+            )
+            .join(SKU, SKU.id == ProductionLot.sku_id)
+            .where(ProductionLot.deposit_id == deposit.id)
+        )
+        if snapshot_net is not None:
+            source = source.outerjoin(
+                snapshot_net,
+                and_(
+                    snapshot_net.c.sku_id == ProductionLot.sku_id,
+                    snapshot_net.c.production_lot_id == ProductionLot.id,
+                ),
+            )
+        if not payload.include_empty:
+            source = source.where(system_quantity > 0)
+        if payload.production_line_id:
+            source = source.where(ProductionLot.production_line_id == payload.production_line_id)
+        existing_key = and_(
+            InventoryCountItem.sku_id == ProductionLot.sku_id,
+            InventoryCountItem.production_lot_id == ProductionLot.id,
+        )
+        source = source.order_by(SKU.code, ProductionLot.produced_at, ProductionLot.id)
+    else:
+        if payload.production_line_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El filtro por línea solo aplica a depósitos con control de lotes",
+            )
+        system_quantity = StockLevel.quantity
+        if snapshot_net is not None:
+            system_quantity = system_quantity - func.coalesce(snapshot_net.c.quantity, 0.0)
+        source = (
+            select(
+                literal(count.id),
+                StockLevel.sku_id,
+                literal(None, type_=Integer),
+                literal(None, type_=String),
+                system_quantity,
+                system_quantity,
+                literal(0.0),
+                SKU.unit,
+                now,
+                now,
+            )
+            .join(SKU, SKU.id == StockLevel.sku_id)
+            .where(StockLevel.deposit_id == deposit.id)
+        )
+        if snapshot_net is not None:
+            source = source.outerjoin(snapshot_net, snapshot_net.c.sku_id == StockLevel.sku_id)
+        if not payload.include_empty:
+            source = source.where(system_quantity != 0)
+        existing_key = and_(
+            InventoryCountItem.sku_id == StockLevel.sku_id,
+            InventoryCountItem.production_lot_id.is_(None),
+        )
+        source = source.order_by(SKU.code)
+    if payload.sku_type_ids:
+        source = source.where(SKU.sku_type_id.in_(payload.sku_type_ids))
+    source = source.where(
+        ~select(InventoryCountItem.id)
+        .where(InventoryCountItem.inventory_count_id == count.id, existing_key)
+        .exists()
+    )
 
-        movement_payload = StockMovementCreate(
-            sku_id=item.sku_id,
-            deposit_id=deposit.id,
-            movement_type_id=movement_type.id,
-            quantity=abs(item.difference),
-            is_outgoing=item.difference < 0,
-            reference_type="INVENTORY_COUNT",
-            reference_id=count.id,
-            reference_item_id=item.id,
-            reference=reference,
-            lot_code=lot_code,
-            production_lot_id=item.production_lot_id,
-            movement_date=date.today(),
-            created_by_user_id=current_user.id,
+    inserted_rows = (
+        insert(InventoryCountItem)
+        .from_select(
+            [
+                "inventory_count_id",
+                "sku_id",
+                "production_lot_id",
+                "lot_code",
+                "counted_quantity",
+                "system_quantity",
+                "difference",
+                "unit",
+                "created_at",
+                "updated_at",
+            ],
+            source,
         )
-        _, movement = _apply_stock_movement(session, movement_payload, allow_negative_balance=False)
-        item.stock_movement_id = movement.id
-        item.updated_at = datetime.utcnow()
-        session.add(item)
+        .returning(InventoryCountItem.id)
+        .cte("inserted_rows")
+    )
+    inserted = session.exec(select(func.count()).select_from(inserted_rows)).one()
 
-    count.status = InventoryCountStatus.APPROVED
-    count.approved_at = datetime.utcnow()
-    count.approved_by_user_id = current_user.id
     count.updated_at = datetime.utcnow()
     count.updated_by_user_id = current_user.id
     session.add(count)
-    _log_audit(session, "inventory_counts", count.id, AuditAction.APPROVE, current_user.id, {"status": count.status})
+    _log_audit(
+        session,
+        "inventory_counts",
+        count.id,
+        AuditAction.UPDATE,
+        current_user.id,
+        {"prefill": payload.model_dump(), "inserted": inserted},
+    )
     session.commit()
-    session.refresh(count)
-    return _map_inventory_count(count, session)
+    return InventoryCountPrefillResult(count_id=count.id, inserted=inserted)
+
+
+@router.get(
+    "/inventory-counts/{count_id}/sheet",
+    tags=["inventory"],
+    response_class=StreamingResponse,
+    dependencies=[Depends(require_permissions("inventory.view"))],
+)
+def export_inventory_count_sheet(
+    count_id: int,
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    session: Session = Depends(get_read_session),
+) -> StreamingResponse:
+    count = session.get(InventoryCount, count_id)
+    if not count:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conteo no encontrado")
+    statement = (
+        select(
+            InventoryCountItem.id.label("item_id"),
+            SKU.code.label("sku_code"),
+            SKU.name.label("sku_name"),
+            InventoryCountItem.lot_code.label("lot_code"),
+            ProductionLot.expiry_date.label("expiry_date"),
+            InventoryCountItem.unit.label("unit"),
+            InventoryCountItem.system_quantity.label("system_quantity"),
+            InventoryCountItem.counted_quantity.label("counted_quantity"),
+            InventoryCountItem.difference.label("difference"),
+        )
+        .join(SKU, SKU.id == InventoryCountItem.sku_id)
+        .outerjoin(ProductionLot, ProductionLot.id == InventoryCountItem.production_lot_id)
+        .where(InventoryCountItem.inventory_count_id == count.id)
+        .order_by(SKU.code, InventoryCountItem.lot_code, InventoryCountItem.id)
+    )
+    return _export_statement(session, export_format, f"conteo-{count.id}", statement)
 
 
 @router.post(
-    "/inventory-counts/{count_id}/close",
+    "/inventory-counts/{count_id}/submit",
     tags=["inventory"],
     response_model=InventoryCountRead,
     dependencies=[Depends(require_permissions("inventory.close"))],
 )
-def close_inventory_count(
+def submit_inventory_count(
     count_id: int,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
@@ -4228,11 +5510,227 @@ def close_inventory_count(
     count = session.get(InventoryCount, count_id)
     if not count:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conteo no encontrado")
-    if count.status != InventoryCountStatus.APPROVED:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Solo se pueden cerrar conteos aprobados")
+    if count.status != InventoryCountStatus.DRAFT:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El conteo ya fue enviado")
 
-    count.status = InventoryCountStatus.CLOSED
-    count.closed_at = datetime.utcnow()
+    count.status = InventoryCountStatus.SUBMITTED
+    count.submitted_at = datetime.utcnow()
+    count.updated_at = datetime.utcnow()
+    count.updated_by_user_id = current_user.id
+    session.add(count)
+    _log_audit(session, "inventory_counts", count.id, AuditAction.STATUS, current_user.id, {"status": count.status})
+    session.commit()
+    session.refresh(count)
+    return _map_inventory_count(count, session)
+
+
+def _post_inventory_count_adjustments(
+    session: Session,
+    count: InventoryCount,
+    deposit: Deposit,
+    movement_type: StockMovementType,
+    reference: str,
+    user_id: int | None,
+) -> None:
+    """Registra los ajustes del conteo en bloque.
+
+    Los saldos se validan netos por SKU y por lote antes de escribir nada; luego se insertan todos los
+    movimientos en un único INSERT y cada saldo se actualiza con un único UPDATE ... FROM (VALUES ...).
+    """
+    items = [item for item in count.items if item.difference != 0]
+    if not items:
+        return
+    if not movement_type.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El tipo de movimiento está inactivo")
+    if deposit.controls_lot and any(not item.production_lot_id for item in items):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Falta lote en depósito con control de lotes")
+
+    sku_ids = {item.sku_id for item in items}
+    sku_types = session.exec(
+        select(SKU.id, SKUType.code, SKUType.is_active)
+        .join(SKUType, SKUType.id == SKU.sku_type_id)
+        .where(SKU.id.in_(sku_ids))
+    ).all()
+    if any(not is_active for _, _, is_active in sku_types):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El tipo del SKU está inactivo")
+    # Las diferencias están en la unidad del conteo; saldos y movimientos se llevan en la unidad base (kg para SEMI).
+    semi_units_per_kg = {
+        sku_id: _get_semi_units_per_kg(session, sku_id) for sku_id, code, _ in sku_types if code == SKU_SEMI_CODE
+    }
+    differences = {
+        item.id: (
+            _semi_quantity_in_kg(item.difference, item.unit, semi_units_per_kg[item.sku_id])
+            if item.sku_id in semi_units_per_kg
+            else item.difference
+        )
+        for item in items
+    }
+
+    # Bloqueos en orden de id para que dos aprobaciones concurrentes no se crucen.
+    lot_ids = {item.production_lot_id for item in items if item.production_lot_id}
+    lots: dict[int, ProductionLot] = {}
+    if lot_ids:
+        lots = {
+            lot.id: lot
+            for lot in session.exec(
+                select(ProductionLot).where(ProductionLot.id.in_(lot_ids)).order_by(ProductionLot.id).with_for_update()
+            )
+        }
+    levels: dict[int, StockLevel] = {}
+    for level in session.exec(
+        select(StockLevel)
+        .where(StockLevel.deposit_id == deposit.id, StockLevel.sku_id.in_(sku_ids))
+        .order_by(StockLevel.id)
+        .with_for_update()
+    ):
+        levels.setdefault(level.sku_id, level)
+    missing_levels = [StockLevel(deposit_id=deposit.id, sku_id=sku_id, quantity=0) for sku_id in sorted(sku_ids - levels.keys())]
+    if missing_levels:
+        session.add_all(missing_levels)
+        session.flush()
+        levels.update({level.sku_id: level for level in missing_levels})
+
+    level_deltas: dict[int, float] = defaultdict(float)
+    lot_deltas: dict[int, float] = defaultdict(float)
+    for item in items:
+        level_deltas[item.sku_id] += differences[item.id]
+        if not item.production_lot_id:
+            continue
+        lot = lots.get(item.production_lot_id)
+        if not lot:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lote de producción no encontrado")
+        if lot.sku_id != item.sku_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote no corresponde al SKU indicado")
+        if lot.deposit_id != deposit.id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote pertenece a otro depósito")
+        if lot.is_blocked:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote está bloqueado para movimientos")
+        lot_deltas[lot.id] += differences[item.id]
+    if any(levels[sku_id].quantity + delta < 0 for sku_id, delta in level_deltas.items()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stock insuficiente en el depósito")
+    if any(lots[lot_id].remaining_quantity + delta < 0 for lot_id, delta in lot_deltas.items()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote no tiene stock suficiente")
+
+    now = datetime.utcnow()
+    movement_ids = session.execute(
+        insert(StockMovement)
+        .values(
+            [
+                {
+                    "sku_id": item.sku_id,
+                    "deposit_id": deposit.id,
+                    "movement_type_id": movement_type.id,
+                    "quantity": differences[item.id],
+                    "reference_type": "INVENTORY_COUNT",
+                    "reference_id": count.id,
+                    "reference_item_id": item.id,
+                    "reference": reference,
+                    "lot_code": lots[item.production_lot_id].lot_code if item.production_lot_id else item.lot_code,
+                    "production_lot_id": item.production_lot_id,
+                    "movement_date": now.date(),
+                    "created_by_user_id": user_id,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for item in items
+            ]
+        )
+        .returning(StockMovement.reference_item_id, StockMovement.id)
+    ).all()
+
+    level_values = values(column("id", Integer), column("delta", Float), name="level_deltas").data(
+        [(levels[sku_id].id, delta) for sku_id, delta in level_deltas.items()]
+    )
+    session.execute(
+        update(StockLevel)
+        .where(StockLevel.id == level_values.c.id)
+        .values(quantity=StockLevel.quantity + level_values.c.delta, updated_at=now)
+    )
+    if lot_deltas:
+        lot_values = values(column("id", Integer), column("delta", Float), name="lot_deltas").data(
+            list(lot_deltas.items())
+        )
+        session.execute(
+            update(ProductionLot)
+            .where(ProductionLot.id == lot_values.c.id)
+            .values(remaining_quantity=ProductionLot.remaining_quantity + lot_values.c.delta, updated_at=now)
+        )
+    item_values = values(column("id", Integer), column("stock_movement_id", Integer), name="item_movements").data(
+        [tuple(row) for row in movement_ids]
+    )
+    session.execute(
+        update(InventoryCountItem)
+        .where(InventoryCountItem.id == item_values.c.id)
+        .values(stock_movement_id=item_values.c.stock_movement_id, updated_at=now)
+    )
+
+
+@router.post(
+    "/inventory-counts/{count_id}/approve",
+    tags=["inventory"],
+    response_model=InventoryCountRead,
+    dependencies=[Depends(require_permissions("inventory.close"))],
+)
+def approve_inventory_count(
+    count_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+) -> InventoryCountRead:
+    count = session.get(InventoryCount, count_id)
+    if not count:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conteo no encontrado")
+    if count.status != InventoryCountStatus.SUBMITTED:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El conteo debe estar enviado para aprobarse")
+
+    session.refresh(count, attribute_names=["items"])
+    deposit = _get_deposit_or_404(session, count.deposit_id)
+    movement_type = _get_movement_type_by_code(session, "ADJUSTMENT")
+    reference = f"INVENTARIO-{count.id}"
+
+    # system_quantity refleja el stock al corte; lo movido desde entonces se suma para obtener el esperado
+    # actual. El ajuste sigue siendo la diferencia contada, que se aplica sobre ese saldo esperado.
+    if count.snapshot_movement_id is not None:
+        net_movements = _net_movements_since(
+            session, deposit, count.snapshot_movement_id, {item.sku_id for item in count.items}
+        )
+        for item in count.items:
+            net = net_movements.get(_movement_key(deposit, (item.sku_id, item.production_lot_id)), 0.0)
+            item.expected_quantity = item.system_quantity + net
+            session.add(item)
+
+    _post_inventory_count_adjustments(session, count, deposit, movement_type, reference, current_user.id)
+
+    count.status = InventoryCountStatus.APPROVED
+    count.approved_at = datetime.utcnow()
+    count.approved_by_user_id = current_user.id
+    count.updated_at = datetime.utcnow()
+    count.updated_by_user_id = current_user.id
+    session.add(count)
+    _log_audit(session, "inventory_counts", count.id, AuditAction.APPROVE, current_user.id, {"status": count.status})
+    session.commit()
+    session.refresh(count)
+    return _map_inventory_count(count, session)
+
+
+@router.post(
+    "/inventory-counts/{count_id}/close",
+    tags=["inventory"],
+    response_model=InventoryCountRead,
+    dependencies=[Depends(require_permissions("inventory.close"))],
+)
+def close_inventory_count(
+    count_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+) -> InventoryCountRead:
+    count = session.get(InventoryCount, count_id)
+    if not count:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conteo no encontrado")
+    if count.status != InventoryCountStatus.APPROVED:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Solo se pueden cerrar conteos aprobados")
+
+    count.status = InventoryCountStatus.CLOSED
+    count.closed_at = datetime.utcnow()
     count.updated_at = datetime.utcnow()
     count.updated_by_user_id = current_user.id
     session.add(count)
@@ -4270,6 +5768,9 @@ def cancel_inventory_count(
     return _map_inventory_count(count, session)
 
 
+AUDIT_LOG_LIST_MAX_LIMIT = 500
+
+
 @router.get(
     "/audit/logs",
     tags=["audit"],
@@ -4277,60 +5778,231 @@ def cancel_inventory_count(
     dependencies=[Depends(require_permissions("audit.view"))],
 )
 def list_audit_logs(
+    response: Response,
     entity_type: str | None = None,
     entity_id: int | None = None,
     user_id: int | None = None,
     date_from: date | None = None,
     date_to: date | None = None,
+    contains: str | None = Query(None, description='Objeto JSON contenido en changes, p. ej. {"status": "cancelled"}'),
     limit: int = 200,
-    session: Session = Depends(get_session),
+    cursor: str | None = None,
+    export_format: ExportFormat | None = Query(None, alias="format"),
+    session: Session = Depends(get_read_session),
 ) -> list[AuditLogRead]:
-    statement = select(AuditLog)
+    conditions = []
     if entity_type:
-        statement = statement.where(AuditLog.entity_type == entity_type)
+        conditions.append(AuditLog.entity_type == entity_type)
     if entity_id is not None:
-        statement = statement.where(AuditLog.entity_id == entity_id)
+        conditions.append(AuditLog.entity_id == entity_id)
     if user_id:
-        statement = statement.where(AuditLog.user_id == user_id)
+        conditions.append(AuditLog.user_id == user_id)
     if date_from:
-        statement = statement.where(AuditLog.created_at >= datetime.combine(date_from, datetime.min.time()))
+        conditions.append(AuditLog.created_at >= datetime.combine(date_from, datetime.min.time()))
     if date_to:
-        statement = statement.where(AuditLog.created_at <= datetime.combine(date_to, datetime.max.time()))
-    safe_limit = max(1, min(limit, 500))
-    records = session.exec(statement.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(safe_limit)).all()
-    return [_map_audit_log(record, session) for record in records]
+        conditions.append(AuditLog.created_at <= datetime.combine(date_to, datetime.max.time()))
+    if contains:
+        conditions.append(AuditLog.changes.contains(_parse_audit_contains(contains)))
+    if export_format:
+        export_statement = (
+            select(
+                AuditLog.id.label("audit_id"),
+                AuditLog.created_at.label("created_at"),
+                AuditLog.entity_type.label("entity_type"),
+                AuditLog.entity_id.label("entity_id"),
+                AuditLog.action.label("action"),
+                User.full_name.label("user"),
+                AuditLog.ip_address.label("ip_address"),
+                AuditLog.changes.label("changes"),
+            )
+            .outerjoin(User, User.id == AuditLog.user_id)
+            .where(*conditions)
+            .order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+        )
+        return _export_statement(session, export_format, "auditoria", export_statement)
+    statement = select(AuditLog, User.full_name).outerjoin(User, User.id == AuditLog.user_id).where(*conditions)
+    if cursor:
+        cursor_created_at, cursor_id = _decode_keyset_cursor(cursor)
+        statement = statement.where(tuple_(AuditLog.created_at, AuditLog.id) < tuple_(cursor_created_at, cursor_id))
+    safe_limit = max(1, min(limit, AUDIT_LOG_LIST_MAX_LIMIT))
+    rows = session.exec(
+        statement.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(safe_limit + 1)
+    ).all()
+    if len(rows) > safe_limit:
+        rows = rows[:safe_limit]
+        last_record = rows[-1][0]
+        response.headers["X-Next-Cursor"] = _encode_keyset_cursor(last_record.created_at, last_record.id)
+    return [_map_audit_log(record, user_name) for record, user_name in rows]
+
+
+def _parse_audit_contains(raw: str) -> dict:
+    try:
+        value = json.loads(raw)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="El filtro contains debe ser JSON válido"
+        ) from exc
+    if not isinstance(value, dict) or not value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="El filtro contains debe ser un objeto JSON no vacío"
+        )
+    return value
 
 
 @router.get(
     "/production/lots",
     tags=["production"],
-    response_model=list[ProductionLotRead],
+    response_model=list[ProductionLotRead] | list[ProductionLotSummary],
     dependencies=[Depends(require_permissions("production.view"))],
 )
 def list_production_lots(
+    response: Response,
     deposit_id: int | None = None,
     sku_id: int | None = None,
     production_line_id: int | None = None,
     lot_code: str | None = None,
     available_only: bool = False,
     include_blocked: bool = False,
-    session: Session = Depends(get_session),
-) -> list[ProductionLotRead]:
-    statement = select(ProductionLot)
+    aggregate: ProductionLotAggregate | None = None,
+    limit: int = 200,
+    cursor: str | None = None,
+    export_format: ExportFormat | None = Query(None, alias="format"),
+    conditional: ConditionalGet = Depends(),
+    session: Session = Depends(get_read_session),
+):
+    conditions = []
     if deposit_id:
-        statement = statement.where(ProductionLot.deposit_id == deposit_id)
+        conditions.append(ProductionLot.deposit_id == deposit_id)
     if sku_id:
-        statement = statement.where(ProductionLot.sku_id == sku_id)
+        conditions.append(ProductionLot.sku_id == sku_id)
     if production_line_id:
-        statement = statement.where(ProductionLot.production_line_id == production_line_id)
+        conditions.append(ProductionLot.production_line_id == production_line_id)
     if lot_code:
-        statement = statement.where(ProductionLot.lot_code == lot_code)
+        conditions.append(ProductionLot.lot_code == lot_code)
     if available_only:
-        statement = statement.where(ProductionLot.remaining_quantity > 0)
+        conditions.append(ProductionLot.remaining_quantity > 0)
     if not include_blocked:
-        statement = statement.where(ProductionLot.is_blocked.is_(False))
-    lots = session.exec(statement.order_by(ProductionLot.produced_at.desc(), ProductionLot.id.desc())).all()
-    return [_map_production_lot(lot, session) for lot in lots]
+        conditions.append(ProductionLot.is_blocked.is_(False))
+    if export_format:
+        export_statement = (
+            select(
+                ProductionLot.id.label("lot_id"),
+                ProductionLot.lot_code.label("lot_code"),
+                SKU.code.label("sku_code"),
+                SKU.name.label("sku_name"),
+                Deposit.name.label("deposit"),
+                ProductionLine.name.label("production_line"),
+                ProductionLot.produced_quantity.label("produced_quantity"),
+                ProductionLot.remaining_quantity.label("remaining_quantity"),
+                ProductionLot.produced_at.label("produced_at"),
+                ProductionLot.expiry_date.label("expiry_date"),
+                ProductionLot.is_blocked.label("is_blocked"),
+            )
+            .join(SKU, SKU.id == ProductionLot.sku_id)
+            .join(Deposit, Deposit.id == ProductionLot.deposit_id)
+            .outerjoin(ProductionLine, ProductionLine.id == ProductionLot.production_line_id)
+            .where(*conditions)
+            .order_by(ProductionLot.produced_at.desc(), ProductionLot.id.desc())
+        )
+        return _export_statement(session, export_format, "lotes", export_statement)
+    if aggregate:
+        return _summarize_production_lots(session, aggregate, conditions)
+
+    validator = conditional.statement(ProductionLot, conditions, joined=(SKU, Deposit, ProductionLine))
+    conditional.check(session.execute(validator).one())
+    statement = _production_lot_read_statement().where(*conditions)
+    if cursor:
+        cursor_produced_at, cursor_id = _decode_keyset_cursor(cursor)
+        statement = statement.where(
+            tuple_(ProductionLot.produced_at, ProductionLot.id) < tuple_(cursor_produced_at.date(), cursor_id)
+        )
+    safe_limit = max(1, min(limit, PRODUCTION_LOT_LIST_MAX_LIMIT))
+    rows = session.exec(
+        statement.order_by(ProductionLot.produced_at.desc(), ProductionLot.id.desc()).limit(safe_limit + 1)
+    ).all()
+    if len(rows) > safe_limit:
+        rows = rows[:safe_limit]
+        last_lot = rows[-1][0]
+        response.headers["X-Next-Cursor"] = _encode_keyset_cursor(last_lot.produced_at, last_lot.id)
+    return [_map_production_lot_row(*row) for row in rows]
+
+
+def _production_lot_read_statement():
+    return (
+        select(ProductionLot, SKU.code, SKU.name, Deposit.name, ProductionLine.name)
+        .join(SKU, SKU.id == ProductionLot.sku_id)
+        .join(Deposit, Deposit.id == ProductionLot.deposit_id)
+        .outerjoin(ProductionLine, ProductionLine.id == ProductionLot.production_line_id)
+    )
+
+
+def _map_production_lot_row(
+    lot: ProductionLot,
+    sku_code: str,
+    sku_name: str,
+    deposit_name: str,
+    production_line_name: str | None,
+) -> ProductionLotRead:
+    return ProductionLotRead(
+        id=lot.id,
+        lot_code=lot.lot_code,
+        sku_id=lot.sku_id,
+        sku_code=sku_code,
+        sku_name=sku_name,
+        deposit_id=lot.deposit_id,
+        deposit_name=deposit_name,
+        production_line_id=lot.production_line_id,
+        production_line_name=production_line_name,
+        produced_quantity=float(lot.produced_quantity),
+        remaining_quantity=float(lot.remaining_quantity),
+        produced_at=lot.produced_at,
+        expiry_date=lot.expiry_date,
+        is_blocked=lot.is_blocked,
+        notes=lot.notes,
+    )
+
+
+# Clave, código y nombre de cada agrupación del resumen de lotes.
+PRODUCTION_LOT_AGGREGATE_COLUMNS = {
+    ProductionLotAggregate.SKU: (ProductionLot.sku_id, SKU.code, SKU.name),
+    ProductionLotAggregate.DEPOSIT: (ProductionLot.deposit_id, None, Deposit.name),
+    ProductionLotAggregate.LINE: (ProductionLot.production_line_id, None, ProductionLine.name),
+}
+
+
+def _summarize_production_lots(
+    session: Session, aggregate: ProductionLotAggregate, conditions: list
+) -> list[ProductionLotSummary]:
+    key_column, code_column, name_column = PRODUCTION_LOT_AGGREGATE_COLUMNS[aggregate]
+    group_columns = [column for column in (key_column, code_column, name_column) if column is not None]
+    statement = (
+        select(
+            key_column,
+            code_column if code_column is not None else literal(None, String),
+            name_column,
+            func.count(ProductionLot.id),
+            func.coalesce(func.sum(ProductionLot.produced_quantity), 0),
+            func.coalesce(func.sum(ProductionLot.remaining_quantity), 0),
+        )
+        .select_from(ProductionLot)
+        .join(SKU, SKU.id == ProductionLot.sku_id)
+        .join(Deposit, Deposit.id == ProductionLot.deposit_id)
+        .outerjoin(ProductionLine, ProductionLine.id == ProductionLot.production_line_id)
+        .where(*conditions)
+        .group_by(*group_columns)
+        .order_by(nulls_last(name_column.asc()), key_column)
+    )
+    return [
+        ProductionLotSummary(
+            group_id=group_id,
+            group_code=group_code,
+            group_name=group_name,
+            lot_count=lot_count,
+            produced_quantity=float(produced_quantity),
+            remaining_quantity=float(remaining_quantity),
+        )
+        for group_id, group_code, group_name, lot_count, produced_quantity, remaining_quantity in session.exec(statement)
+    ]
 
 
 @router.get(
@@ -4339,13 +6011,116 @@ def list_production_lots(
     response_model=ProductionLotRead,
     dependencies=[Depends(require_permissions("production.view"))],
 )
-def get_production_lot(lot_id: int, session: Session = Depends(get_session)) -> ProductionLotRead:
+def get_production_lot(lot_id: int, session: Session = Depends(get_read_session)) -> ProductionLotRead:
     lot = session.get(ProductionLot, lot_id)
     if not lot:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lote de producción no encontrado")
     return _map_production_lot(lot, session)
 
 
+@router.get(
+    "/production/lots/{lot_id}/trace",
+    tags=["production"],
+    response_model=LotTrace,
+    dependencies=[Depends(require_permissions("production.view"))],
+)
+def trace_production_lot(
+    lot_id: int,
+    direction: LotTraceDirection = LotTraceDirection.DOWN,
+    depth: int = Query(LOT_TRACE_DEFAULT_DEPTH, ge=1, le=LOT_TRACE_MAX_DEPTH),
+    session: Session = Depends(get_read_session),
+) -> LotTrace:
+    if not session.get(ProductionLot, lot_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lote de producción no encontrado")
+
+    # Hacia abajo se siguen los consumos (lote -> lotes que lo usaron); hacia arriba, el camino inverso.
+    if direction == LotTraceDirection.DOWN:
+        source_column, target_column = LotLineage.parent_lot_id, LotLineage.child_lot_id
+    else:
+        source_column, target_column = LotLineage.child_lot_id, LotLineage.parent_lot_id
+    trace = select(literal(lot_id, Integer).label("lot_id"), literal(0, Integer).label("depth")).cte(
+        "lot_trace", recursive=True
+    )
+    trace = trace.union(
+        select(target_column.label("lot_id"), (trace.c.depth + 1).label("depth"))
+        .select_from(LotLineage)
+        .join(trace, source_column == trace.c.lot_id)
+        .where(LotLineage.child_lot_id.is_not(None), trace.c.depth < depth)
+    )
+    reached = (
+        select(trace.c.lot_id, func.min(trace.c.depth).label("depth")).group_by(trace.c.lot_id).subquery("reached")
+    )
+    node_rows = session.exec(
+        select(ProductionLot, SKU.code, SKU.name, Deposit.name, reached.c.depth)
+        .join(reached, reached.c.lot_id == ProductionLot.id)
+        .join(SKU, SKU.id == ProductionLot.sku_id)
+        .join(Deposit, Deposit.id == ProductionLot.deposit_id)
+        .order_by(reached.c.depth, ProductionLot.id)
+    ).all()
+    nodes = [
+        LotTraceNode(
+            lot_id=lot.id,
+            lot_code=lot.lot_code,
+            sku_id=lot.sku_id,
+            sku_code=sku_code,
+            sku_name=sku_name,
+            deposit_id=lot.deposit_id,
+            deposit_name=deposit_name,
+            produced_at=lot.produced_at,
+            remaining_quantity=lot.remaining_quantity,
+            is_blocked=lot.is_blocked,
+            depth=node_depth,
+        )
+        for lot, sku_code, sku_name, deposit_name, node_depth in node_rows
+    ]
+    lot_ids = [node.lot_id for node in nodes]
+
+    edge_rows = session.exec(
+        select(LotLineage.parent_lot_id, LotLineage.child_lot_id, func.sum(LotLineage.quantity))
+        .where(LotLineage.parent_lot_id.in_(lot_ids), LotLineage.child_lot_id.in_(lot_ids))
+        .group_by(LotLineage.parent_lot_id, LotLineage.child_lot_id)
+        .order_by(LotLineage.parent_lot_id, LotLineage.child_lot_id)
+    ).all()
+    remitos: list[LotTraceRemito] = []
+    if direction == LotTraceDirection.DOWN:
+        remito_rows = session.exec(
+            select(
+                Remito.id,
+                LotLineage.parent_lot_id,
+                func.sum(LotLineage.quantity),
+                Remito.status,
+                Remito.destination,
+                Remito.dispatched_at,
+            )
+            .join(Remito, Remito.id == LotLineage.remito_id)
+            .where(LotLineage.parent_lot_id.in_(lot_ids))
+            .group_by(Remito.id, LotLineage.parent_lot_id)
+            .order_by(Remito.id, LotLineage.parent_lot_id)
+        ).all()
+        remitos = [
+            LotTraceRemito(
+                remito_id=remito_id,
+                lot_id=parent_lot_id,
+                quantity=quantity,
+                status=remito_status,
+                destination=destination,
+                dispatched_at=dispatched_at,
+            )
+            for remito_id, parent_lot_id, quantity, remito_status, destination, dispatched_at in remito_rows
+        ]
+    return LotTrace(
+        lot_id=lot_id,
+        direction=direction,
+        depth=depth,
+        nodes=nodes,
+        edges=[
+            LotTraceEdge(parent_lot_id=parent_id, child_lot_id=child_id, quantity=quantity)
+            for parent_id, child_id, quantity in edge_rows
+        ],
+        remitos=remitos,
+    )
+
+
 @router.post(
     "/mermas",
     tags=["mermas"],
@@ -4488,25 +6263,18 @@ def create_merma_event(
     return _map_merma_event(event, session)
 
 
-@router.get(
-    "/mermas",
-    tags=["mermas"],
-    response_model=list[MermaEventRead],
-    dependencies=[Depends(require_permissions("mermas.view"))],
-)
-def list_merma_events(
-    date_from: date | None = None,
-    date_to: date | None = None,
-    stage: MermaStage | None = None,
-    deposit_id: int | None = None,
-    production_line_id: int | None = None,
-    sku_id: int | None = None,
-    type_id: int | None = None,
-    cause_id: int | None = None,
-    affects_stock: bool | None = None,
-    session: Session = Depends(get_session),
-) -> list[MermaEventRead]:
-    statement = select(MermaEvent)
+def _apply_merma_filters(
+    statement,
+    date_from: date | None,
+    date_to: date | None,
+    stage: MermaStage | None,
+    deposit_id: int | None,
+    production_line_id: int | None,
+    sku_id: int | None,
+    type_id: int | None,
+    cause_id: int | None,
+    affects_stock: bool | None,
+):
     if date_from:
         statement = statement.where(MermaEvent.detected_at >= datetime.combine(date_from, datetime.min.time()))
     if date_to:
@@ -4525,9 +6293,288 @@ def list_merma_events(
         statement = statement.where(MermaEvent.cause_id == cause_id)
     if affects_stock is not None:
         statement = statement.where(MermaEvent.affects_stock.is_(affects_stock))
+    return statement
+
+
+MERMA_LIST_MAX_LIMIT = 500
 
-    events = session.exec(statement.order_by(MermaEvent.detected_at.desc(), MermaEvent.id.desc())).all()
-    return [_map_merma_event(event, session) for event in events]
+
+def _encode_keyset_cursor(timestamp: date | datetime, row_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_keyset_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido") from exc
+
+
+def _parse_response_fields(fields: str | None, model: type[SQLModel]) -> set[str] | None:
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos desconocidos: {', '.join(sorted(unknown))}",
+        )
+    return requested | {"id"}
+
+
+def _merma_event_read_statement():
+    return (
+        select(
+            MermaEvent,
+            SKU.code,
+            SKU.name,
+            Deposit.name,
+            ProductionLine.name,
+            User.full_name,
+        )
+        .join(SKU, SKU.id == MermaEvent.sku_id)
+        .outerjoin(Deposit, Deposit.id == MermaEvent.deposit_id)
+        .outerjoin(ProductionLine, ProductionLine.id == MermaEvent.production_line_id)
+        .outerjoin(User, User.id == MermaEvent.reported_by_user_id)
+    )
+
+
+def _map_merma_event_row(
+    event: MermaEvent,
+    sku_code: str,
+    sku_name: str,
+    deposit_name: str | None,
+    production_line_name: str | None,
+    reported_by_user_name: str | None,
+) -> MermaEventRead:
+    return MermaEventRead.model_validate(
+        event,
+        update={
+            "sku_code": sku_code,
+            "sku_name": sku_name,
+            "deposit_name": deposit_name,
+            "production_line_name": production_line_name,
+            "reported_by_user_name": reported_by_user_name,
+        },
+    )
+
+
+@router.get(
+    "/mermas",
+    tags=["mermas"],
+    response_model=list[MermaEventRead],
+    dependencies=[Depends(require_permissions("mermas.view"))],
+)
+def list_merma_events(
+    response: Response,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    stage: MermaStage | None = None,
+    deposit_id: int | None = None,
+    production_line_id: int | None = None,
+    sku_id: int | None = None,
+    type_id: int | None = None,
+    cause_id: int | None = None,
+    affects_stock: bool | None = None,
+    limit: int = 200,
+    cursor: str | None = None,
+    fields: str | None = None,
+    export_format: ExportFormat | None = Query(None, alias="format"),
+    session: Session = Depends(get_read_session),
+):
+    if export_format:
+        export_statement = _apply_merma_filters(
+            select(
+                MermaEvent.id.label("merma_id"),
+                MermaEvent.detected_at.label("detected_at"),
+                MermaEvent.stage.label("stage"),
+                MermaEvent.type_label.label("type"),
+                MermaEvent.cause_label.label("cause"),
+                SKU.code.label("sku_code"),
+                SKU.name.label("sku_name"),
+                MermaEvent.quantity.label("quantity"),
+                MermaEvent.unit.label("unit"),
+                MermaEvent.lot_code.label("lot_code"),
+                Deposit.name.label("deposit"),
+                ProductionLine.name.label("production_line"),
+                User.full_name.label("reported_by"),
+                MermaEvent.affects_stock.label("affects_stock"),
+                MermaEvent.notes.label("notes"),
+            )
+            .join(SKU, SKU.id == MermaEvent.sku_id)
+            .outerjoin(Deposit, Deposit.id == MermaEvent.deposit_id)
+            .outerjoin(ProductionLine, ProductionLine.id == MermaEvent.production_line_id)
+            .outerjoin(User, User.id == MermaEvent.reported_by_user_id),
+            date_from,
+            date_to,
+            stage,
+            deposit_id,
+            production_line_id,
+            sku_id,
+            type_id,
+            cause_id,
+            affects_stock,
+        ).order_by(MermaEvent.detected_at.desc(), MermaEvent.id.desc())
+        return _export_statement(session, export_format, "mermas", export_statement)
+
+    selected_fields = _parse_response_fields(fields, MermaEventRead)
+    statement = _apply_merma_filters(
+        _merma_event_read_statement(),
+        date_from,
+        date_to,
+        stage,
+        deposit_id,
+        production_line_id,
+        sku_id,
+        type_id,
+        cause_id,
+        affects_stock,
+    )
+    if cursor:
+        cursor_detected_at, cursor_id = _decode_keyset_cursor(cursor)
+        statement = statement.where(
+            tuple_(MermaEvent.detected_at, MermaEvent.id) < tuple_(cursor_detected_at, cursor_id)
+        )
+
+    safe_limit = max(1, min(limit, MERMA_LIST_MAX_LIMIT))
+    rows = session.exec(
+        statement.order_by(MermaEvent.detected_at.desc(), MermaEvent.id.desc()).limit(safe_limit + 1)
+    ).all()
+    headers: dict[str, str] = {}
+    if len(rows) > safe_limit:
+        rows = rows[:safe_limit]
+        last_event = rows[-1][0]
+        headers["X-Next-Cursor"] = _encode_keyset_cursor(last_event.detected_at, last_event.id)
+    response.headers.update(headers)
+
+    items = [_map_merma_event_row(*row) for row in rows]
+    if selected_fields is None:
+        return items
+    # Con fields= se omite la validación del response_model para devolver solo las claves pedidas.
+    return JSONResponse(
+        content=jsonable_encoder([item.model_dump(include=selected_fields) for item in items]),
+        headers=headers,
+    )
+
+
+# Cada dimensión se agrupa por su clave y sus columnas descriptivas; la primera columna es la clave.
+MERMA_ANALYTICS_COLUMNS = {
+    MermaAnalyticsDimension.STAGE: (("stage", MermaEvent.stage),),
+    MermaAnalyticsDimension.TYPE: (("type_id", MermaEvent.type_id), ("type_label", MermaType.label)),
+    MermaAnalyticsDimension.CAUSE: (("cause_id", MermaEvent.cause_id), ("cause_label", MermaCause.label)),
+    MermaAnalyticsDimension.PRODUCTION_LINE: (
+        ("production_line_id", MermaEvent.production_line_id),
+        ("production_line_name", ProductionLine.name),
+    ),
+    MermaAnalyticsDimension.DEPOSIT: (("deposit_id", MermaEvent.deposit_id), ("deposit_name", Deposit.name)),
+    MermaAnalyticsDimension.SKU: (("sku_id", MermaEvent.sku_id), ("sku_code", SKU.code), ("sku_name", SKU.name)),
+}
+
+
+def _merma_base_quantity_expression():
+    # Misma regla que _convert_to_base_quantity: los SEMI cargados en unidades se expresan en kg.
+    return case(
+        (
+            and_(SKUType.code == SKU_SEMI_CODE, MermaEvent.unit == UnitOfMeasure.UNIT),
+            MermaEvent.quantity / func.coalesce(SemiConversionRule.units_per_kg, 1.0),
+        ),
+        else_=MermaEvent.quantity,
+    )
+
+
+@router.get(
+    "/mermas/analytics",
+    tags=["mermas"],
+    response_model=MermaAnalyticsReport,
+    dependencies=[Depends(require_permissions("mermas.view"))],
+)
+def merma_analytics(
+    group_by: list[MermaAnalyticsDimension] | None = Query(None),
+    period: MermaAnalyticsPeriod | None = None,
+    rollup: bool = True,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    stage: MermaStage | None = None,
+    deposit_id: int | None = None,
+    production_line_id: int | None = None,
+    sku_id: int | None = None,
+    type_id: int | None = None,
+    cause_id: int | None = None,
+    affects_stock: bool | None = None,
+    session: Session = Depends(get_read_session),
+) -> MermaAnalyticsReport:
+    dimensions = list(dict.fromkeys(group_by or [MermaAnalyticsDimension.STAGE]))
+
+    # (nombre, columnas) en el orden del ROLLUP; el período siempre encabeza la jerarquía.
+    levels: list[tuple[str, tuple[tuple[str, object], ...]]] = []
+    if period:
+        period_column = cast(func.date_trunc(period.value, MermaEvent.detected_at), Date)
+        levels.append(("period", (("period_start", period_column),)))
+    levels.extend((dimension.value, MERMA_ANALYTICS_COLUMNS[dimension]) for dimension in dimensions)
+
+    group_columns = [column for _, columns in levels for _, column in columns]
+    selected_columns = [column.label(field) for _, columns in levels for field, column in columns]
+    grouping_columns = [
+        func.grouping(columns[0][1]).label(f"grouping_{name}") for name, columns in levels
+    ]
+    base_quantity = _merma_base_quantity_expression()
+    statement = (
+        select(
+            *selected_columns,
+            *grouping_columns,
+            func.coalesce(func.sum(MermaEvent.quantity), 0.0).label("quantity"),
+            func.coalesce(func.sum(base_quantity), 0.0).label("base_quantity"),
+            func.count(MermaEvent.id).label("events"),
+        )
+        .select_from(MermaEvent)
+        .join(SKU, SKU.id == MermaEvent.sku_id)
+        .join(SKUType, SKUType.id == SKU.sku_type_id)
+        .join(MermaType, MermaType.id == MermaEvent.type_id)
+        .join(MermaCause, MermaCause.id == MermaEvent.cause_id)
+        .outerjoin(SemiConversionRule, SemiConversionRule.sku_id == MermaEvent.sku_id)
+        .outerjoin(Deposit, Deposit.id == MermaEvent.deposit_id)
+        .outerjoin(ProductionLine, ProductionLine.id == MermaEvent.production_line_id)
+    )
+    statement = _apply_merma_filters(
+        statement,
+        date_from,
+        date_to,
+        stage,
+        deposit_id,
+        production_line_id,
+        sku_id,
+        type_id,
+        cause_id,
+        affects_stock,
+    )
+    if rollup:
+        statement = statement.group_by(
+            func.rollup(*(tuple_(*(column for _, column in columns)) for _, columns in levels))
+        )
+    else:
+        statement = statement.group_by(*group_columns)
+    statement = statement.order_by(*(nulls_last(column.asc()) for column in group_columns))
+
+    rows: list[MermaAnalyticsRow] = []
+    for result in session.exec(statement).all():
+        values = result._mapping
+        rolled_up = [name for name, _ in levels if values[f"grouping_{name}"]]
+        data = {field: values[field] for _, columns in levels for field, _ in columns}
+        rows.append(
+            MermaAnalyticsRow(
+                **data,
+                rolled_up=rolled_up,
+                is_total=len(rolled_up) == len(levels),
+                quantity=float(values["quantity"]),
+                base_quantity=float(values["base_quantity"]),
+                events=values["events"],
+            )
+        )
+    return MermaAnalyticsReport(group_by=dimensions, period=period, rows=rows)
 
 
 @router.get(
@@ -4536,7 +6583,7 @@ def list_merma_events(
     response_model=MermaEventRead,
     dependencies=[Depends(require_permissions("mermas.view"))],
 )
-def get_merma_event(merma_id: int, session: Session = Depends(get_session)) -> MermaEventRead:
+def get_merma_event(merma_id: int, session: Session = Depends(get_read_session)) -> MermaEventRead:
     event = session.get(MermaEvent, merma_id)
     if not event:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Merma no encontrada")
@@ -4549,28 +6596,31 @@ def get_merma_event(merma_id: int, session: Session = Depends(get_session)) -> M
     response_model=StockReportRead,
     dependencies=[Depends(require_permissions("reports.view"))],
 )
-def stock_summary(session: Session = Depends(get_session)) -> StockReportRead:
-    stock_levels = session.exec(select(StockLevel)).all()
-    totals_by_tag: dict[str, float] = {}
-    totals_by_deposit: dict[str, float] = {}
-
-    for level in stock_levels:
-        session.refresh(level, attribute_names=["sku", "deposit"])
-        session.refresh(level.sku, attribute_names=["sku_type"])
-        type_code = level.sku.sku_type.code if level.sku and level.sku.sku_type else "SIN_TIPO"
-        totals_by_tag[type_code] = totals_by_tag.get(type_code, 0) + level.quantity
-        totals_by_deposit[level.deposit.name] = totals_by_deposit.get(level.deposit.name, 0) + level.quantity
-
+async def stock_summary(session: AsyncSession = Depends(get_async_read_session)) -> StockReportRead:
+    type_code = func.coalesce(SKUType.code, "SIN_TIPO")
     movements_cutoff = date.today() - timedelta(days=7)
-    movements = session.exec(select(StockMovement).where(StockMovement.movement_date >= movements_cutoff)).all()
-    movement_totals: dict[str, dict[str, float | str]] = {}
-    for mov in movements:
-        session.refresh(mov, attribute_names=["movement_type"])
-        code = mov.movement_type.code if mov.movement_type else "UNKNOWN"
-        label = mov.movement_type.label if mov.movement_type else code
-        if code not in movement_totals:
-            movement_totals[code] = {"quantity": 0.0, "label": label}
-        movement_totals[code]["quantity"] = float(movement_totals[code]["quantity"]) + mov.quantity
+    tag_rows, deposit_rows, movement_rows = await _gather_reads(
+        session,
+        select(type_code, func.sum(StockLevel.quantity))
+        .join(SKU, SKU.id == StockLevel.sku_id)
+        .outerjoin(SKUType, SKUType.id == SKU.sku_type_id)
+        .group_by(type_code)
+        .order_by(type_code),
+        select(Deposit.name, func.sum(StockLevel.quantity))
+        .join(Deposit, Deposit.id == StockLevel.deposit_id)
+        .group_by(Deposit.name)
+        .order_by(Deposit.name),
+        select(StockMovementType.code, StockMovementType.label, func.sum(StockMovement.quantity))
+        .join(StockMovementType, StockMovementType.id == StockMovement.movement_type_id)
+        .where(StockMovement.movement_date >= movements_cutoff)
+        .group_by(StockMovementType.code, StockMovementType.label)
+        .order_by(StockMovementType.code),
+    )
+    totals_by_tag = {tag: float(quantity or 0) for tag, quantity in tag_rows}
+    totals_by_deposit = {deposit: float(quantity or 0) for deposit, quantity in deposit_rows}
+    movement_totals = {
+        code: {"quantity": float(quantity or 0), "label": label or code} for code, label, quantity in movement_rows
+    }
 
     return StockReportRead(
         totals_by_tag=[StockSummaryRow(group="tag", label=tag, quantity=qty) for tag, qty in totals_by_tag.items()],
@@ -4590,7 +6640,7 @@ def stock_summary(session: Session = Depends(get_session)) -> StockReportRead:
     response_model=StockAlertReport,
     dependencies=[Depends(require_permissions("reports.view"))],
 )
-def stock_alerts_report(
+async def stock_alerts_report(
     sku_type_ids: list[int] | None = Query(None),
     deposit_ids: list[int] | None = Query(None),
     alert_status: list[str] | None = Query(None),
@@ -4599,9 +6649,14 @@ def stock_alerts_report(
     max_quantity: float | None = None,
     only_configured: bool = False,
     include_inactive: bool = False,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_read_session),
 ) -> StockAlertReport:
-    statement = select(StockLevel).join(SKU).join(SKUType).join(Deposit)
+    statement = (
+        select(StockLevel, SKU, SKUType, Deposit)
+        .join(SKU, SKU.id == StockLevel.sku_id)
+        .join(SKUType, SKUType.id == SKU.sku_type_id)
+        .join(Deposit, Deposit.id == StockLevel.deposit_id)
+    )
     if sku_type_ids:
         statement = statement.where(SKU.sku_type_id.in_(sku_type_ids))
     if deposit_ids:
@@ -4616,53 +6671,242 @@ def stock_alerts_report(
     if max_quantity is not None:
         statement = statement.where(StockLevel.quantity <= max_quantity)
 
-    levels = session.exec(statement.order_by(StockLevel.quantity.asc(), StockLevel.id.asc())).all()
+    rows = await session.exec(statement.order_by(StockLevel.quantity.asc(), StockLevel.id.asc()))
     items: list[StockAlertRead] = []
-    for level in levels:
-        session.refresh(level, attribute_names=["sku", "deposit"])
-        session.refresh(level.sku, attribute_names=["sku_type"])
-        status = _get_stock_alert_status(level.quantity, level.sku)
-        if only_configured and not _has_alert_thresholds(level.sku):
+    for level, sku, sku_type, deposit in rows.all():
+        status = _get_stock_alert_status(level.quantity, sku)
+        if only_configured and not _has_alert_thresholds(sku):
             continue
         if alert_status and status not in alert_status:
             continue
         items.append(
             StockAlertRead(
                 deposit_id=level.deposit_id,
-                deposit_name=level.deposit.name,
+                deposit_name=deposit.name,
                 sku_id=level.sku_id,
-                sku_code=level.sku.code,
-                sku_name=level.sku.name,
-                sku_type_id=level.sku.sku_type_id,
-                sku_type_code=level.sku.sku_type.code if level.sku.sku_type else "",
-                sku_type_label=level.sku.sku_type.label if level.sku.sku_type else "",
-                unit=level.sku.unit,
+                sku_code=sku.code,
+                sku_name=sku.name,
+                sku_type_id=sku.sku_type_id,
+                sku_type_code=sku_type.code,
+                sku_type_label=sku_type.label,
+                unit=sku.unit,
                 quantity=level.quantity,
                 alert_status=status,
-                alert_green_min=level.sku.alert_green_min,
-                alert_yellow_min=level.sku.alert_yellow_min,
+                alert_green_min=sku.alert_green_min,
+                alert_yellow_min=sku.alert_yellow_min,
             )
         )
 
     return StockAlertReport(total=len(items), items=items)
 
 
+def _build_efficiency_row(values, **keys) -> ProductionEfficiencyRow:
+    produced = float(values["produced_quantity"] or 0)
+    theoretical = float(values["theoretical_consumption"] or 0)
+    actual = float(values["actual_consumption"] or 0)
+    variance = actual - theoretical
+    return ProductionEfficiencyRow(
+        **keys,
+        lots=values["lots"],
+        produced_quantity=produced,
+        theoretical_consumption=theoretical,
+        actual_consumption=actual,
+        variance=variance,
+        variance_pct=round(variance / theoretical * 100, 2) if theoretical else None,
+        yield_pct=round(theoretical / actual * 100, 2) if actual else None,
+    )
+
+
+@router.get(
+    "/reports/production-efficiency",
+    tags=["reports"],
+    response_model=ProductionEfficiencyReport,
+    dependencies=[Depends(require_permissions("reports.view"))],
+)
+async def production_efficiency_report(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    sku_id: int | None = None,
+    production_line_id: int | None = None,
+    session: AsyncSession = Depends(get_async_read_session),
+) -> ProductionEfficiencyReport:
+    production_type_id = (
+        select(StockMovementType.id).where(StockMovementType.code == "PRODUCTION").scalar_subquery()
+    )
+    consumption_type_id = (
+        select(StockMovementType.id).where(StockMovementType.code == "CONSUMPTION").scalar_subquery()
+    )
+
+    lot_conditions = []
+    if date_from:
+        lot_conditions.append(ProductionLot.produced_at >= date_from)
+    if date_to:
+        lot_conditions.append(ProductionLot.produced_at <= date_to)
+    if sku_id:
+        lot_conditions.append(ProductionLot.sku_id == sku_id)
+    if production_line_id:
+        lot_conditions.append(ProductionLot.production_line_id == production_line_id)
+    lots = (
+        select(
+            ProductionLot.id,
+            ProductionLot.lot_code,
+            ProductionLot.sku_id,
+            ProductionLot.production_line_id,
+            ProductionLot.produced_at,
+        )
+        .where(*lot_conditions)
+        .cte("lots")
+    )
+
+    # Cada ingreso de producción consume componentes con reference = referencia del ingreso o código de lote.
+    consumption_reference = func.coalesce(StockMovement.reference, lots.c.lot_code)
+    production = (
+        select(
+            lots.c.id.label("lot_id"),
+            consumption_reference.label("reference"),
+            func.sum(StockMovement.quantity).label("produced"),
+        )
+        .join(lots, lots.c.id == StockMovement.production_lot_id)
+        .where(StockMovement.movement_type_id == production_type_id)
+        .group_by(lots.c.id, consumption_reference)
+        .cte("production")
+    )
+    produced = (
+        select(production.c.lot_id, func.sum(production.c.produced).label("produced"))
+        .group_by(production.c.lot_id)
+        .cte("produced")
+    )
+    actual = (
+        select(production.c.lot_id, (-func.sum(StockMovement.quantity)).label("consumed"))
+        .join(StockMovement, StockMovement.reference == production.c.reference)
+        .where(StockMovement.movement_type_id == consumption_type_id)
+        .group_by(production.c.lot_id)
+        .cte("actual")
+    )
+    # Misma receta que usa _get_recipe_for_product: la primera activa del producto.
+    active_recipes = (
+        select(Recipe.id, Recipe.product_id)
+        .where(Recipe.is_active.is_(True))
+        .distinct(Recipe.product_id)
+        .order_by(Recipe.product_id, Recipe.id)
+        .cte("active_recipes")
+    )
+    coefficients = (
+        select(active_recipes.c.product_id, func.sum(RecipeItem.quantity).label("coefficient"))
+        .join(RecipeItem, RecipeItem.recipe_id == active_recipes.c.id)
+        .group_by(active_recipes.c.product_id)
+        .cte("recipe_coefficients")
+    )
+    lot_metrics = (
+        select(
+            lots.c.id.label("lot_id"),
+            lots.c.lot_code,
+            lots.c.produced_at,
+            SKU.id.label("sku_id"),
+            SKU.code.label("sku_code"),
+            SKU.name.label("sku_name"),
+            ProductionLine.id.label("production_line_id"),
+            ProductionLine.name.label("production_line_name"),
+            produced.c.produced,
+            (produced.c.produced * func.coalesce(coefficients.c.coefficient, 0.0)).label("theoretical"),
+            func.coalesce(actual.c.consumed, 0.0).label("actual"),
+        )
+        .select_from(lots)
+        .join(produced, produced.c.lot_id == lots.c.id)
+        .join(SKU, SKU.id == lots.c.sku_id)
+        .outerjoin(ProductionLine, ProductionLine.id == lots.c.production_line_id)
+        .outerjoin(coefficients, coefficients.c.product_id == lots.c.sku_id)
+        .outerjoin(actual, actual.c.lot_id == lots.c.id)
+        .cte("lot_metrics")
+    )
+
+    m = lot_metrics.c
+    lot_set = (
+        m.lot_id,
+        m.lot_code,
+        m.produced_at,
+        m.sku_id,
+        m.sku_code,
+        m.sku_name,
+        m.production_line_id,
+        m.production_line_name,
+    )
+    line_set = (m.production_line_id, m.production_line_name)
+    sku_set = (m.sku_id, m.sku_code, m.sku_name)
+    statement = (
+        select(
+            *lot_set,
+            func.grouping(m.lot_id).label("grouping_lot"),
+            func.grouping(m.production_line_id).label("grouping_line"),
+            func.grouping(m.sku_id).label("grouping_sku"),
+            func.count(m.lot_id).label("lots"),
+            func.sum(m.produced).label("produced_quantity"),
+            func.sum(m.theoretical).label("theoretical_consumption"),
+            func.sum(m.actual).label("actual_consumption"),
+        )
+        .group_by(func.grouping_sets(tuple_(*lot_set), tuple_(*line_set), tuple_(*sku_set), tuple_()))
+        .order_by(nulls_last(m.produced_at.desc()), m.lot_id, m.production_line_name, m.sku_code)
+    )
+
+    lot_rows: list[ProductionEfficiencyRow] = []
+    line_rows: list[ProductionEfficiencyRow] = []
+    sku_rows: list[ProductionEfficiencyRow] = []
+    totals: ProductionEfficiencyRow | None = None
+    for result in (await session.exec(statement)).all():
+        values = result._mapping
+        if not values["grouping_lot"]:
+            lot_rows.append(_build_efficiency_row(values, **{column.name: values[column.name] for column in lot_set}))
+        elif not values["grouping_line"]:
+            line_rows.append(
+                _build_efficiency_row(
+                    values,
+                    production_line_id=values["production_line_id"],
+                    production_line_name=values["production_line_name"],
+                )
+            )
+        elif not values["grouping_sku"]:
+            sku_rows.append(
+                _build_efficiency_row(
+                    values, sku_id=values["sku_id"], sku_code=values["sku_code"], sku_name=values["sku_name"]
+                )
+            )
+        else:
+            totals = _build_efficiency_row(values)
+
+    if totals is None:
+        totals = _build_efficiency_row(
+            {"lots": 0, "produced_quantity": 0, "theoretical_consumption": 0, "actual_consumption": 0}
+        )
+    return ProductionEfficiencyReport(
+        date_from=date_from,
+        date_to=date_to,
+        lots=lot_rows,
+        by_line=line_rows,
+        by_sku=sku_rows,
+        totals=totals,
+    )
+
+
 @router.get(
     "/reports/stock-expirations",
     tags=["reports"],
     response_model=ExpiryReport,
     dependencies=[Depends(require_permissions("reports.view"))],
 )
-def stock_expirations_report(
+async def stock_expirations_report(
     sku_id: int | None = None,
     deposit_id: int | None = None,
     status: list[ExpiryReportStatus] | None = Query(None),
     expiry_from: date | None = None,
     expiry_to: date | None = None,
     include_no_expiry: bool = True,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_read_session),
 ) -> ExpiryReport:
-    statement = select(ProductionLot).join(SKU).join(Deposit)
+    statement = (
+        select(ProductionLot, SKU, Deposit)
+        .join(SKU, SKU.id == ProductionLot.sku_id)
+        .join(Deposit, Deposit.id == ProductionLot.deposit_id)
+    )
     if sku_id:
         statement = statement.where(ProductionLot.sku_id == sku_id)
     if deposit_id:
@@ -4681,18 +6925,17 @@ def stock_expirations_report(
     elif not include_no_expiry:
         statement = statement.where(ProductionLot.expiry_date.is_not(None))
 
-    lots = session.exec(
+    rows = await session.exec(
         statement.where(ProductionLot.remaining_quantity > 0).order_by(
             nulls_last(ProductionLot.expiry_date),
             ProductionLot.produced_at,
             ProductionLot.id,
         )
-    ).all()
+    )
 
     today = date.today()
     items: list[ExpiryReportRow] = []
-    for lot in lots:
-        session.refresh(lot, attribute_names=["sku", "deposit"])
+    for lot, sku, deposit in rows.all():
         status_value, days = _get_expiry_status(lot.expiry_date, today)
         if status and status_value not in status:
             continue
@@ -4701,12 +6944,12 @@ def stock_expirations_report(
                 lot_id=lot.id,
                 lot_code=lot.lot_code,
                 sku_id=lot.sku_id,
-                sku_code=lot.sku.code if lot.sku else str(lot.sku_id),
-                sku_name=lot.sku.name if lot.sku else f"SKU {lot.sku_id}",
+                sku_code=sku.code,
+                sku_name=sku.name,
                 deposit_id=lot.deposit_id,
-                deposit_name=lot.deposit.name if lot.deposit else "",
+                deposit_name=deposit.name,
                 remaining_quantity=float(lot.remaining_quantity),
-                unit=lot.sku.unit if lot.sku else UnitOfMeasure.UNIT,
+                unit=sku.unit,
                 produced_at=lot.produced_at,
                 expiry_date=lot.expiry_date,
                 days_to_expiry=days,
@@ -4717,5 +6960,74 @@ def stock_expirations_report(
     return ExpiryReport(total=len(items), items=items)
 
 
+def _map_report_job(job: ReportJob) -> ReportJobRead:
+    download_url = None
+    if job.status == ReportJobStatus.COMPLETED and job.result_path:
+        download_url = f"{get_settings().api_prefix}/reports/jobs/{job.id}/download"
+    return ReportJobRead.model_validate(job, update={"download_url": download_url})
+
+
+def _get_owned_report_job_or_404(session: Session, job_id: int, current_user: User) -> ReportJob:
+    job = session.get(ReportJob, job_id)
+    # Los trabajos de otros usuarios se tratan como inexistentes para no exponer sus parámetros ni resultados.
+    if not job or (job.requested_by_user_id != current_user.id and not _is_admin_account(current_user, session)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reporte no encontrado")
+    return job
+
+
+@router.post(
+    "/reports/jobs",
+    tags=["reports"],
+    response_model=ReportJobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(require_permissions("reports.export"))],
+)
+def create_report_job(
+    payload: ReportJobCreate,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+) -> ReportJobRead:
+    try:
+        job = enqueue_report_job(session, payload.report, payload.format, payload.params, current_user.id)
+    except ValidationError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=jsonable_encoder(exc.errors(include_url=False, include_context=False)),
+        ) from exc
+    return _map_report_job(job)
+
+
+@router.get(
+    "/reports/jobs/{job_id}",
+    tags=["reports"],
+    response_model=ReportJobRead,
+    dependencies=[Depends(require_permissions("reports.view"))],
+)
+def get_report_job(
+    job_id: int,
+    session: Session = Depends(get_read_session),
+    current_user: User = Depends(get_current_user),
+) -> ReportJobRead:
+    return _map_report_job(_get_owned_report_job_or_404(session, job_id, current_user))
+
+
+@router.get(
+    "/reports/jobs/{job_id}/download",
+    tags=["reports"],
+    response_class=FileResponse,
+    dependencies=[Depends(require_permissions("reports.export"))],
+)
+def download_report_job(
+    job_id: int,
+    session: Session = Depends(get_read_session),
+    current_user: User = Depends(get_current_user),
+) -> FileResponse:
+    job = _get_owned_report_job_or_404(session, job_id, current_user)
+    path = resolve_report_result_path(job)
+    if not path:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El reporte todavía no está disponible")
+    return FileResponse(path, media_type="application/gzip", filename=path.name)
+
+
 api_router.include_router(public_router)
 api_router.include_router(router)
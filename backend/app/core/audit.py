@@ -0,0 +1,168 @@
+import logging
+import queue
+import threading
+from collections.abc import Callable
+from datetime import date, datetime
+from enum import Enum
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import event, insert
+from sqlmodel import Session
+
+from ..models import AuditAction, AuditLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_PENDING_KEY = "audit_pending"
+
+_outbox: "AuditOutbox | None" = None
+
+
+def _compact(value: object) -> object:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        # Un None explícito registra que el campo se vació; solo se descarta el estado interno de SQLAlchemy.
+        return {str(key): _compact(item) for key, item in value.items() if not str(key).startswith("_sa_")}
+    if isinstance(value, (list, tuple, set)):
+        return [_compact(item) for item in value]
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return jsonable_encoder(value)
+
+
+def record_audit(
+    session: Session,
+    entity_type: str,
+    entity_id: int | None,
+    action: AuditAction,
+    user_id: int | None = None,
+    changes: dict | list | None = None,
+) -> None:
+    """Anota el evento en la sesión; se escribe junto con el resto de la transacción al hacer commit."""
+    encoded = _compact(changes)
+    now = datetime.utcnow()
+    session.info.setdefault(AUDIT_PENDING_KEY, []).append(
+        {
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "action": action,
+            "user_id": user_id,
+            "changes": encoded if encoded is None or isinstance(encoded, dict) else {"items": encoded},
+            "created_at": now,
+            "updated_at": now,
+        }
+    )
+
+
+def _insert_audit_rows(session: Session, rows: list[dict]) -> None:
+    session.execute(insert(AuditLog.__table__).values(rows))
+
+
+@event.listens_for(Session, "before_commit")
+def _write_pending_audit(session: Session) -> None:
+    if _outbox is not None:
+        return
+    rows = session.info.pop(AUDIT_PENDING_KEY, None)
+    if rows:
+        _insert_audit_rows(session, rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_pending_audit(session: Session) -> None:
+    rows = session.info.pop(AUDIT_PENDING_KEY, None)
+    if rows and _outbox is not None:
+        _outbox.put(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_audit(session: Session) -> None:
+    session.info.pop(AUDIT_PENDING_KEY, None)
+
+
+class AuditOutbox:
+    """Escribe la auditoría fuera de la transacción del request, en lotes, desde un hilo propio.
+
+    Los eventos se encolan solo cuando la transacción que los generó confirma; si el proceso termina de forma
+    abrupta se pierden los que aún estén en la cola.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], batch_size: int, poll_seconds: float) -> None:
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._poll_seconds = poll_seconds
+        self._queue: queue.Queue[list[dict]] = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-outbox", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def put(self, rows: list[dict]) -> None:
+        self._queue.put(rows)
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+    def _drain(self, block: bool) -> list[dict]:
+        rows: list[dict] = []
+        try:
+            rows.extend(self._queue.get(timeout=self._poll_seconds) if block else self._queue.get_nowait())
+            while len(rows) < self._batch_size:
+                rows.extend(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return rows
+
+    def flush(self) -> int:
+        written = 0
+        while rows := self._drain(block=False):
+            self._write(rows)
+            written += len(rows)
+        return written
+
+    def _write(self, rows: list[dict]) -> None:
+        with self._session_factory() as session:
+            _insert_audit_rows(session, rows)
+            session.commit()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            rows = self._drain(block=True)
+            if not rows:
+                continue
+            try:
+                self._write(rows)
+            except Exception:  # noqa: BLE001 - el hilo no debe morir por un error de conexión
+                logger.exception("No se pudo escribir la auditoría; se reintenta")
+                self._queue.put(rows)
+                self._stop_event.wait(self._poll_seconds)
+        try:
+            self.flush()
+        except Exception:  # noqa: BLE001
+            logger.exception("No se pudo vaciar la cola de auditoría al detener el hilo")
+
+
+def start_audit_outbox(
+    session_factory: Callable[[], Session], batch_size: int = 500, poll_seconds: float = 1.0
+) -> AuditOutbox:
+    global _outbox
+    outbox = AuditOutbox(session_factory, batch_size, poll_seconds)
+    outbox.start()
+    _outbox = outbox
+    return outbox
+
+
+def stop_audit_outbox(timeout: float | None = None) -> None:
+    global _outbox
+    outbox, _outbox = _outbox, None
+    if outbox is not None:
+        outbox.stop(timeout)
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from .config import get_settings
+
+# Catálogo -> tablas de las que depende; una escritura en cualquiera de ellas lo invalida.
+CATALOG_TABLES: dict[str, set[str]] = {
+    "units": set(),
+    "sku_types": {"sku_types"},
+    "skus": {"skus", "sku_types", "semi_conversion_rules"},
+    "deposits": {"deposits"},
+    "movement_types": {"stock_movement_types"},
+    "production_lines": {"production_lines"},
+    "merma_types": {"merma_types"},
+    "merma_causes": {"merma_causes"},
+    "recipes": {"recipes", "recipe_items", "skus", "sku_types"},
+}
+_PENDING_KEY = "catalog_cache_pending_tables"
+
+
+class CatalogCache:
+    """Memoiza cada catálogo ya serializado junto con un hash de su contenido, que sirve de versión para el ETag.
+
+    Las entradas se descartan al confirmarse una escritura sobre sus tablas y, como respaldo para escrituras de
+    otros procesos, al vencer el TTL; como la versión es un hash, reconstruir datos iguales no cambia el ETag.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, tuple[float, str, list]] = {}
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, build: Callable[[], list]) -> tuple[str, list]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                return entry[1], entry[2]
+            generation = self._generations.get(name, 0)
+        payload = jsonable_encoder(build())
+        version = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            # Si hubo una escritura mientras se construía, no se guarda: la próxima lectura reconstruye.
+            if self._generations.get(name, 0) == generation:
+                self._entries[name] = (time.monotonic(), version, payload)
+        return version, payload
+
+    def invalidate_tables(self, tables: Iterable[str]) -> None:
+        touched = set(tables)
+        with self._lock:
+            for name, dependencies in CATALOG_TABLES.items():
+                if dependencies & touched:
+                    self._entries.pop(name, None)
+                    self._generations[name] = self._generations.get(name, 0) + 1
+
+    def clear(self) -> None:
+        self.invalidate_tables(set().union(*CATALOG_TABLES.values()))
+
+
+def combined_version(versions: dict[str, str]) -> str:
+    digest = hashlib.sha256("|".join(f"{name}:{versions[name]}" for name in sorted(versions)).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def install_invalidation(cache: CatalogCache) -> None:
+    """Registra en todas las sesiones el seguimiento de tablas escritas e invalida al confirmar."""
+
+    def _pending(session: Session) -> set[str]:
+        return session.info.setdefault(_PENDING_KEY, set())
+
+    @event.listens_for(Session, "after_flush")
+    def _track_flush(session: Session, _flush_context) -> None:
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(type(instance), "__tablename__", None)
+            if table:
+                _pending(session).add(table)
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _track_bulk(state: ORMExecuteState) -> None:
+        # INSERT/UPDATE/DELETE ejecutados como sentencia (p. ej. el seed con ON CONFLICT) no pasan por el flush.
+        if state.is_insert or state.is_update or state.is_delete:
+            table = getattr(state.statement, "table", None)
+            if table is not None and getattr(table, "name", None):
+                _pending(state.session).add(table.name)
+
+    @event.listens_for(Session, "after_commit")
+    def _invalidate(session: Session) -> None:
+        tables = session.info.pop(_PENDING_KEY, None)
+        if tables:
+            cache.invalidate_tables(tables)
+
+    @event.listens_for(Session, "after_rollback")
+    def _discard(session: Session) -> None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+catalog_cache = CatalogCache(get_settings().catalog_cache_ttl_seconds)
+install_invalidation(catalog_cache)
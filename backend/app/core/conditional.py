@@ -0,0 +1,82 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.sql import Select
+
+
+class NotModified(Exception):
+    """Corta el handler antes del mapeo; main.py la traduce a una respuesta 304 con los validadores."""
+
+    def __init__(self, headers: dict[str, str]) -> None:
+        super().__init__("Not Modified")
+        self.headers = headers
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110): admite listas, `*` y validadores con prefijo W/."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def _parse_http_date(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class ConditionalGet:
+    """Dependencia para GET de colecciones filtradas.
+
+    El validador es `count(*)` y `max(updated_at)` sobre los mismos filtros del listado (resuelto por índice), así
+    que depende de que las escrituras actualicen `updated_at`. Las tablas cuyos datos entran en la respuesta por join
+    (nombres de SKU, depósito o usuario) se pasan en `joined`: su `max(updated_at)` global entra al validador para que
+    un renombre invalide el ETag aunque las filas del listado no cambien. `check()` fija ETag/Last-Modified en la respuesta y
+    lanza NotModified si el cliente ya tiene esa versión, antes de cargar y mapear las filas.
+    """
+
+    def __init__(self, request: Request, response: Response) -> None:
+        self.request = request
+        self.response = response
+
+    @staticmethod
+    def statement(model, conditions, joined=()) -> Select:
+        last_updated = func.max(model.updated_at)
+        if joined:
+            # greatest() ignora los NULL de tablas vacías; cada subconsulta se resuelve con el índice de updated_at.
+            last_updated = func.greatest(
+                last_updated, *(select(func.max(table.updated_at)).scalar_subquery() for table in joined)
+            )
+        return select(func.count(), last_updated).select_from(model).where(*conditions)
+
+    def check(self, row) -> None:
+        count, last_updated = row
+        last_modified = last_updated.replace(tzinfo=timezone.utc, microsecond=0) if last_updated else None
+        # La URL (con sus filtros) identifica la colección; el ETag solo cubre su contenido.
+        digest = hashlib.sha256(f"{count}:{last_updated.isoformat() if last_updated else ''}".encode("utf-8"))
+        headers = {"ETag": f'W/"{digest.hexdigest()[:24]}"', "Cache-Control": "private, no-cache"}
+        if last_modified is not None:
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+        self.response.headers.update(headers)
+
+        if_none_match = self.request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if etag_matches(if_none_match, headers["ETag"]):
+                raise NotModified(headers)
+            return
+        # If-Modified-Since solo se evalúa sin If-None-Match y no detecta bajas que no cambian el máximo.
+        if_modified_since = _parse_http_date(self.request.headers.get("if-modified-since"))
+        if last_modified is not None and if_modified_since is not None and last_modified <= if_modified_since:
+            raise NotModified(headers)
@@ -0,0 +1,150 @@
+import hashlib
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session
+
+from ..models import IdempotencyKey
+from .security import decode_access_token
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+# Headers que Starlette recalcula o que no tiene sentido repetir en una respuesta reproducida.
+_SKIPPED_HEADERS = {"content-length", "date", "server"}
+
+
+def _advisory_lock_id(scope: str, key: str) -> int:
+    digest = hashlib.sha256(f"idempotency:{scope}:{key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+def _request_scope(request: Request) -> str | None:
+    """Usuario autenticado (`sub` del token): la clave sobrevive a la renovación del token y no se comparte entre
+    llamadas anónimas. Sin token válido no hay alcance y la solicitud sigue sin idempotencia.
+    """
+    scheme, _, token = (request.headers.get("authorization") or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    try:
+        payload = decode_access_token(token.strip())
+    except HTTPException:
+        return None
+    sub = payload.get("sub")
+    return f"user:{sub}" if sub else None
+
+
+def _request_hash(request: Request, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (request.method.encode(), request.url.path.encode(), request.url.query.encode(), body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _is_streaming(response: Response) -> bool:
+    # Las respuestas con cuerpo fijo traen Content-Length; 204 y 304 no lo llevan pero tampoco tienen cuerpo.
+    if response.status_code in {status.HTTP_204_NO_CONTENT, status.HTTP_304_NOT_MODIFIED}:
+        return False
+    return not any(name.lower() == b"content-length" for name, _ in response.raw_headers)
+
+
+def _replay(record: IdempotencyKey) -> Response:
+    response = Response(content=record.response_body, status_code=record.status_code)
+    for name, value in record.response_headers:
+        response.headers.append(name, value)
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def idempotency_middleware(engine: AsyncEngine, ttl_seconds: int):
+    """Middleware HTTP que honra Idempotency-Key en métodos de escritura.
+
+    La clave se toma bajo un advisory lock transaccional (en una conexión propia del engine async), así que un
+    duplicado concurrente espera a que termine el primero y luego recibe su respuesta guardada sin volver a ejecutar
+    el handler. Solo se guardan respuestas < 500: tras un error del servidor el reintento vuelve a ejecutarse.
+    Las respuestas en streaming (sin Content-Length, como el NDJSON de importación de compras) se devuelven tal cual,
+    sin guardarlas, para no acumular todo el cuerpo en memoria.
+    """
+
+    async def _middleware(request: Request, call_next):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None or request.method not in IDEMPOTENT_METHODS:
+            return await call_next(request)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"detail": f"El header {IDEMPOTENCY_HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres"},
+            )
+        scope = _request_scope(request)
+        if scope is None:
+            return await call_next(request)
+        request_hash = _request_hash(request, await request.body())
+
+        async with engine.connect() as connection:
+            await connection.execute(
+                text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": _advisory_lock_id(scope, key)}
+            )
+            record = (
+                await connection.execute(
+                    select(IdempotencyKey).where(
+                        IdempotencyKey.scope == scope,
+                        IdempotencyKey.key == key,
+                        IdempotencyKey.expires_at > datetime.utcnow(),
+                    )
+                )
+            ).first()
+            if record is not None:
+                await connection.rollback()
+                if record.request_hash != request_hash:
+                    return JSONResponse(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        content={"detail": "La clave de idempotencia ya se usó con otra solicitud"},
+                    )
+                return _replay(record)
+
+            response = await call_next(request)
+            if response.status_code >= 500 or _is_streaming(response):
+                await connection.rollback()
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            raw_headers = [(name, value) for name, value in response.raw_headers if name.lower() != b"content-length"]
+            headers = [
+                [name.decode("latin-1"), value.decode("latin-1")]
+                for name, value in raw_headers
+                if name.decode("latin-1").lower() not in _SKIPPED_HEADERS
+            ]
+            now = datetime.utcnow()
+            values = {
+                "request_hash": request_hash,
+                "status_code": response.status_code,
+                "response_headers": headers,
+                "response_body": body,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=ttl_seconds),
+            }
+            # Una fila vencida con la misma clave se reemplaza.
+            await connection.execute(
+                pg_insert(IdempotencyKey)
+                .values(scope=scope, key=key, **values)
+                .on_conflict_do_update(index_elements=["scope", "key"], set_=values)
+            )
+            await connection.commit()
+        replayable = Response(content=body, status_code=response.status_code, background=response.background)
+        # Se conservan los headers originales tal cual (incluidos varios Set-Cookie) con el largo del cuerpo leído.
+        replayable.raw_headers = [*raw_headers, (b"content-length", str(len(body)).encode("latin-1"))]
+        return replayable
+
+    return _middleware
+
+
+def sweep_expired_idempotency_keys(session: Session, now: datetime | None = None) -> int:
+    result = session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= (now or datetime.utcnow())))
+    session.commit()
+    return result.rowcount or 0
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+
+from pydantic import ValidationError
+
+from ..schemas import PurchaseReceiptImportRow
+
+JSON_MEDIA_TYPES = {"application/json", "text/json"}
+
+
+def _is_json(filename: str | None, content_type: str | None) -> bool:
+    if filename and filename.lower().endswith(".json"):
+        return True
+    return (content_type or "").split(";")[0].strip().lower() in JSON_MEDIA_TYPES
+
+
+def _read_records(content: bytes, filename: str | None, content_type: str | None) -> list[dict]:
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError as exc:
+        raise ValueError("El archivo debe estar codificado en UTF-8") from exc
+    if _is_json(filename, content_type):
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise ValueError("El archivo JSON no es válido") from exc
+        if isinstance(data, dict):
+            data = data.get("items")
+        if not isinstance(data, list) or not all(isinstance(record, dict) for record in data):
+            raise ValueError("El archivo JSON debe ser una lista de filas")
+        return data
+    reader = csv.DictReader(io.StringIO(text), delimiter=";" if text.split("\n", 1)[0].count(";") else ",")
+    # Las celdas vacías de la planilla equivalen a campos no informados.
+    return [
+        {key.strip(): (value.strip() or None) if isinstance(value, str) else value for key, value in record.items() if key}
+        for record in reader
+    ]
+
+
+def parse_purchase_import_file(
+    content: bytes, filename: str | None, content_type: str | None
+) -> list[PurchaseReceiptImportRow]:
+    """Lee un archivo de remitos de proveedor (CSV o JSON) en filas validadas.
+
+    Los errores de formato se acumulan con el número de fila (la fila 1 es el encabezado del CSV).
+    """
+    rows: list[PurchaseReceiptImportRow] = []
+    errors: list[str] = []
+    for number, record in enumerate(_read_records(content, filename, content_type), start=2):
+        try:
+            rows.append(PurchaseReceiptImportRow.model_validate(record))
+        except ValidationError as exc:
+            fields = ", ".join(".".join(str(part) for part in error["loc"]) for error in exc.errors())
+            errors.append(f"Fila {number}: datos inválidos ({fields})")
+    if errors:
+        raise ValueError("; ".join(errors[:20]))
+    return rows
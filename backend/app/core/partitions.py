@@ -0,0 +1,177 @@
+import gzip
+import logging
+import re
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from .storage import get_archives_dir
+
+logger = logging.getLogger(__name__)
+
+# Tabla particionada -> columna de partición (rango mensual). Debe coincidir con la migración 20261019_0025.
+PARTITIONED_TABLES = {"audit_logs": "created_at", "stock_movements": "movement_date"}
+# Columnas que guardan ids de la tabla particionada sin FK (ver la migración); se vacían al archivar sus filas.
+ARCHIVED_REFERENCES = {
+    "stock_movements": (
+        ("purchase_receipt_items", "stock_movement_id"),
+        ("inventory_count_items", "stock_movement_id"),
+        ("merma_events", "stock_movement_id"),
+        ("lot_lineage", "stock_movement_id"),
+    ),
+}
+ARCHIVE_FETCH_SIZE = 1000
+
+
+def add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _partition_month(table: str, name: str) -> date | None:
+    match = re.fullmatch(rf"{re.escape(table)}_p(\d{{4}})(\d{{2}})", name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def is_partitioned(session: Session, table: str) -> bool:
+    return bool(
+        session.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"), {"table": table}
+        ).scalar()
+    )
+
+
+def _table_exists(session: Session, name: str) -> bool:
+    return session.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def _default_partition_months(session: Session, table: str, default: str) -> set[date]:
+    key = PARTITIONED_TABLES[table]
+    rows = session.execute(text(f"SELECT DISTINCT date_trunc('month', {key})::date FROM {default}")).scalars()
+    return set(rows)
+
+
+def ensure_partitions(session: Session, table: str, months_ahead: int, today: date | None = None) -> list[str]:
+    """Crea las particiones mensuales faltantes desde el mes actual hasta `months_ahead` meses adelante.
+
+    Postgres no deja crear una partición cuyo rango tiene filas en la partición DEFAULT, así que con DEFAULT la
+    partición se crea suelta, recibe las filas de su mes y recién entonces se adjunta. También se crean los meses
+    de las filas que hayan caído en DEFAULT, para que esta quede vacía.
+    """
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"Tabla no particionada: {table}")
+    if not is_partitioned(session, table):
+        return []
+    key = PARTITIONED_TABLES[table]
+    default = f"{table}_default"
+    current = add_months(today or date.today(), 0)
+    months = {add_months(current, offset) for offset in range(months_ahead + 1)}
+    has_default = _table_exists(session, default)
+    if has_default:
+        # Bloquea las escrituras que irían a DEFAULT mientras se reubican sus filas.
+        session.execute(text(f"LOCK TABLE {default} IN ACCESS EXCLUSIVE MODE"))
+        months |= _default_partition_months(session, table, default)
+    created: list[str] = []
+    for month in sorted(months):
+        name = partition_name(table, month)
+        if _table_exists(session, name):
+            continue
+        bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        if has_default:
+            session.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+            moved = session.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {default} WHERE {key} >= :start AND {key} < :end RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ),
+                {"start": month, "end": add_months(month, 1)},
+            ).rowcount
+            session.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} {bounds}"))
+            if moved:
+                logger.info("Partición %s creada con %s filas tomadas de %s", name, moved, default)
+        else:
+            session.execute(text(f"CREATE TABLE {name} PARTITION OF {table} {bounds}"))
+        created.append(name)
+    session.commit()
+    return created
+
+
+def _archivable_partitions(session: Session, table: str, before: date) -> list[tuple[str, bool]]:
+    """Particiones mensuales anteriores a `before`, adjuntas o ya separadas por una corrida interrumpida."""
+    rows = session.execute(
+        text(
+            """
+            SELECT c.relname, i.inhparent IS NOT NULL AS attached
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_inherits i ON i.inhrelid = c.oid AND i.inhparent = to_regclass(:table)
+            WHERE n.nspname = current_schema() AND c.relkind = 'r' AND c.relname LIKE :pattern
+            ORDER BY c.relname
+            """
+        ),
+        {"table": table, "pattern": f"{table}\\_p%"},
+    ).all()
+    return [
+        (name, attached)
+        for name, attached in rows
+        if (month := _partition_month(table, name)) is not None and month < before
+    ]
+
+
+def _export_partition(session: Session, name: str, target: Path) -> int:
+    partial = target.with_name(f".{target.name}.partial")
+    count = 0
+    try:
+        result = session.execute(
+            text(f"SELECT row_to_json(t)::text FROM {name} AS t ORDER BY t.id").execution_options(
+                yield_per=ARCHIVE_FETCH_SIZE
+            )
+        )
+        with gzip.open(partial, "wt", encoding="utf-8") as handle:
+            for (line,) in result:
+                handle.write(line)
+                handle.write("\n")
+                count += 1
+        partial.replace(target)
+    except Exception:
+        partial.unlink(missing_ok=True)
+        raise
+    return count
+
+
+def archive_partitions(session: Session, table: str, before: date) -> list[Path]:
+    """Separa las particiones de meses anteriores a `before`, las exporta a JSONL comprimido y las elimina.
+
+    Cada partición se separa y confirma antes de exportarla, de modo que las consultas dejan de verla enseguida;
+    si la exportación falla, la tabla separada queda en la base y la próxima corrida la retoma. Las referencias
+    de ARCHIVED_REFERENCES a las filas archivadas se vacían en la misma transacción que el DROP.
+    """
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"Tabla no particionada: {table}")
+    if not is_partitioned(session, table):
+        return []
+    archive_dir = get_archives_dir() / table
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    archived: list[Path] = []
+    for name, attached in _archivable_partitions(session, table, add_months(before, 0)):
+        if attached:
+            session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            session.commit()
+        target = archive_dir / f"{name}.jsonl.gz"
+        count = _export_partition(session, name, target)
+        # Sin FK que lo impida, las referencias quedarían apuntando a filas que ya no existen.
+        for other, column in ARCHIVED_REFERENCES.get(table, ()):
+            session.execute(text(f"UPDATE {other} SET {column} = NULL WHERE {column} IN (SELECT id FROM {name})"))
+        session.execute(text(f"DROP TABLE {name}"))
+        session.commit()
+        logger.info("Partición %s archivada en %s (%s filas)", name, target, count)
+        archived.append(target)
+    return archived
@@ -0,0 +1,97 @@
+import threading
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+POOL_CLASSES: dict[str, type[Pool]] = {"queue": QueuePool, "null": NullPool}
+ASYNC_POOL_CLASSES: dict[str, type[Pool]] = {"queue": AsyncAdaptedQueuePool, "null": NullPool}
+
+
+@dataclass
+class PoolMetrics:
+    """Contadores acumulados de espera al obtener conexiones del pool (desde el arranque del proceso)."""
+
+    role: str
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_total_seconds: float = 0.0
+    wait_max_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_seconds += waited
+            self.wait_max_seconds = max(self.wait_max_seconds, waited)
+
+
+def instrumented_pool_class(base: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """Subclase del pool que mide cuánto espera cada checkout; `recreate()` conserva la clase y las métricas."""
+
+    class InstrumentedPool(base):
+        pool_metrics = metrics
+
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                entry = super()._do_get()
+            except PoolTimeoutError:
+                self.pool_metrics.record(time.perf_counter() - started, timed_out=True)
+                raise
+            self.pool_metrics.record(time.perf_counter() - started)
+            return entry
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+def apply_session_timeouts(engine: Engine, statement_timeout_ms: int, lock_timeout_ms: int) -> None:
+    """Fija statement_timeout/lock_timeout en cada conexión nueva (0 deja el valor del servidor)."""
+    if not statement_timeout_ms and not lock_timeout_ms:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_timeouts(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        if statement_timeout_ms:
+            cursor.execute(f"SET statement_timeout = {int(statement_timeout_ms)}")
+        if lock_timeout_ms:
+            cursor.execute(f"SET lock_timeout = {int(lock_timeout_ms)}")
+        cursor.close()
+        # Sin autocommit el SET abre una transacción; se confirma para que el rollback del pool no lo revierta.
+        dbapi_connection.commit()
+
+
+def pool_stats(engine: Engine | AsyncEngine) -> dict:
+    pool = engine.pool
+    metrics: PoolMetrics | None = getattr(pool, "pool_metrics", None)
+    stats: dict = {"role": metrics.role if metrics else "unknown", "pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        stats.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_in=pool.checkedin(),
+            checked_out=checked_out,
+            overflow=max(pool.overflow(), 0),
+            saturation=round(checked_out / capacity, 3) if capacity > 0 else None,
+        )
+    if metrics:
+        with metrics._lock:
+            attempts = metrics.checkouts + metrics.timeouts
+            stats.update(
+                checkouts=metrics.checkouts,
+                timeouts=metrics.timeouts,
+                wait_avg_ms=round(metrics.wait_total_seconds * 1000 / attempts, 3) if attempts else 0.0,
+                wait_max_ms=round(metrics.wait_max_seconds * 1000, 3),
+            )
+    return stats
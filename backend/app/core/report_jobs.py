@@ -0,0 +1,394 @@
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, func, or_, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, SQLModel, select
+
+from ..models import Deposit, MermaEvent, ProductionLine, SKU, StockMovement, StockMovementType
+from ..models.common import ReportJobStatus
+from ..models.report import ACTIVE_REPORT_JOB_PREDICATE, ReportJob
+from ..schemas import MermaReportParams, ReportJobFormat, ReportJobName, StockMovementReportParams
+from .storage import get_reports_dir, get_storage_root
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (ReportJobStatus.PENDING, ReportJobStatus.RUNNING)
+REPORT_FETCH_SIZE = 1000
+DEFAULT_LEASE_SECONDS = 300.0
+# Un trabajo que tumba al worker cada vez que se ejecuta no se reintenta indefinidamente.
+MAX_REPORT_JOB_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class ReportDefinition:
+    params_model: type[SQLModel]
+    columns: tuple[str, ...]
+    rows: Callable[[Session, SQLModel], Iterable[tuple]]
+
+
+def _stock_movement_rows(session: Session, params: StockMovementReportParams) -> Iterator[tuple]:
+    statement = (
+        select(
+            StockMovement.id,
+            StockMovement.movement_date,
+            StockMovementType.code,
+            SKU.code,
+            SKU.name,
+            Deposit.name,
+            StockMovement.quantity,
+            StockMovement.lot_code,
+            StockMovement.reference_type,
+            StockMovement.reference_id,
+            StockMovement.reference,
+        )
+        .join(StockMovementType, StockMovementType.id == StockMovement.movement_type_id)
+        .join(SKU, SKU.id == StockMovement.sku_id)
+        .join(Deposit, Deposit.id == StockMovement.deposit_id)
+    )
+    if params.date_from:
+        statement = statement.where(StockMovement.movement_date >= params.date_from)
+    if params.date_to:
+        statement = statement.where(StockMovement.movement_date <= params.date_to)
+    if params.sku_id:
+        statement = statement.where(StockMovement.sku_id == params.sku_id)
+    if params.deposit_id:
+        statement = statement.where(StockMovement.deposit_id == params.deposit_id)
+    if params.movement_type_code:
+        statement = statement.where(StockMovementType.code == params.movement_type_code.strip().upper())
+    statement = statement.order_by(StockMovement.movement_date, StockMovement.id)
+    yield from session.exec(statement.execution_options(yield_per=REPORT_FETCH_SIZE))
+
+
+def _merma_rows(session: Session, params: MermaReportParams) -> Iterator[tuple]:
+    statement = (
+        select(
+            MermaEvent.id,
+            MermaEvent.detected_at,
+            MermaEvent.stage,
+            MermaEvent.type_label,
+            MermaEvent.cause_label,
+            SKU.code,
+            SKU.name,
+            MermaEvent.quantity,
+            MermaEvent.unit,
+            MermaEvent.lot_code,
+            Deposit.name,
+            ProductionLine.name,
+            MermaEvent.affects_stock,
+        )
+        .join(SKU, SKU.id == MermaEvent.sku_id)
+        .outerjoin(Deposit, Deposit.id == MermaEvent.deposit_id)
+        .outerjoin(ProductionLine, ProductionLine.id == MermaEvent.production_line_id)
+    )
+    if params.date_from:
+        statement = statement.where(MermaEvent.detected_at >= datetime.combine(params.date_from, datetime.min.time()))
+    if params.date_to:
+        statement = statement.where(MermaEvent.detected_at <= datetime.combine(params.date_to, datetime.max.time()))
+    if params.stage:
+        statement = statement.where(MermaEvent.stage == params.stage)
+    if params.sku_id:
+        statement = statement.where(MermaEvent.sku_id == params.sku_id)
+    if params.deposit_id:
+        statement = statement.where(MermaEvent.deposit_id == params.deposit_id)
+    if params.production_line_id:
+        statement = statement.where(MermaEvent.production_line_id == params.production_line_id)
+    if params.affects_stock is not None:
+        statement = statement.where(MermaEvent.affects_stock.is_(params.affects_stock))
+    statement = statement.order_by(MermaEvent.detected_at, MermaEvent.id)
+    yield from session.exec(statement.execution_options(yield_per=REPORT_FETCH_SIZE))
+
+
+REPORT_DEFINITIONS: dict[ReportJobName, ReportDefinition] = {
+    ReportJobName.STOCK_MOVEMENTS: ReportDefinition(
+        params_model=StockMovementReportParams,
+        columns=(
+            "id",
+            "movement_date",
+            "movement_type",
+            "sku_code",
+            "sku_name",
+            "deposit",
+            "quantity",
+            "lot_code",
+            "reference_type",
+            "reference_id",
+            "reference",
+        ),
+        rows=_stock_movement_rows,
+    ),
+    ReportJobName.MERMA_EVENTS: ReportDefinition(
+        params_model=MermaReportParams,
+        columns=(
+            "id",
+            "detected_at",
+            "stage",
+            "type",
+            "cause",
+            "sku_code",
+            "sku_name",
+            "quantity",
+            "unit",
+            "lot_code",
+            "deposit",
+            "production_line",
+            "affects_stock",
+        ),
+        rows=_merma_rows,
+    ),
+}
+
+
+def normalize_report_params(report: ReportJobName, params: dict) -> dict:
+    """Valida los parámetros del reporte y devuelve su forma canónica (sin nulos, serializable)."""
+    model = REPORT_DEFINITIONS[report].params_model.model_validate(params)
+    return jsonable_encoder(model.model_dump(exclude_none=True))
+
+
+def compute_params_hash(
+    report: ReportJobName, report_format: ReportJobFormat, params: dict, user_id: int | None = None
+) -> str:
+    # El solicitante forma parte de la clave: cada usuario solo puede consultar y descargar sus propios trabajos.
+    payload = json.dumps(
+        {"report": report.value, "format": report_format.value, "params": params, "user_id": user_id},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def enqueue_report_job(
+    session: Session,
+    report: ReportJobName,
+    report_format: ReportJobFormat,
+    params: dict,
+    user_id: int | None,
+) -> ReportJob:
+    """Crea el trabajo o devuelve el activo con los mismos parámetros.
+
+    La unicidad la garantiza el índice parcial sobre params_hash, de modo que dos pedidos concurrentes
+    idénticos del mismo usuario terminan compartiendo la misma fila aunque lleguen a la vez.
+    """
+    params = normalize_report_params(report, params)
+    params_hash = compute_params_hash(report, report_format, params, user_id)
+    now = datetime.utcnow()
+    for _ in range(3):
+        statement = (
+            insert(ReportJob)
+            .values(
+                report=report.value,
+                format=report_format.value,
+                params=params,
+                params_hash=params_hash,
+                status=ReportJobStatus.PENDING,
+                requested_by_user_id=user_id,
+                created_at=now,
+                updated_at=now,
+            )
+            .on_conflict_do_nothing(
+                index_elements=["params_hash"],
+                index_where=text(ACTIVE_REPORT_JOB_PREDICATE),
+            )
+            .returning(ReportJob.id)
+        )
+        job_id = session.execute(statement).scalar_one_or_none()
+        if job_id is None:
+            job_id = session.exec(
+                select(ReportJob.id).where(
+                    ReportJob.params_hash == params_hash,
+                    ReportJob.status.in_(ACTIVE_STATUSES),
+                )
+            ).first()
+        if job_id is not None:
+            session.commit()
+            return session.get(ReportJob, job_id)
+        # El trabajo activo terminó entre el INSERT y el SELECT: se reintenta.
+        session.rollback()
+    raise RuntimeError("No se pudo encolar el reporte")
+
+
+def claim_next_report_job(session: Session, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> ReportJob | None:
+    """Toma el próximo trabajo pendiente o uno RUNNING cuyo worker dejó de renovar el heartbeat."""
+    while True:
+        now = datetime.utcnow()
+        last_seen = func.coalesce(ReportJob.heartbeat_at, ReportJob.started_at, ReportJob.updated_at)
+        job = session.exec(
+            select(ReportJob)
+            .where(
+                or_(
+                    ReportJob.status == ReportJobStatus.PENDING,
+                    and_(
+                        ReportJob.status == ReportJobStatus.RUNNING,
+                        last_seen < now - timedelta(seconds=lease_seconds),
+                    ),
+                )
+            )
+            .order_by(ReportJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if not job:
+            session.rollback()
+            return None
+        job.updated_at = now
+        if job.status == ReportJobStatus.RUNNING and job.attempts >= MAX_REPORT_JOB_ATTEMPTS:
+            logger.warning("El reporte %s agotó sus intentos", job.id)
+            job.status = ReportJobStatus.FAILED
+            job.error = "El worker dejó de responder al generar el reporte"
+            job.finished_at = now
+            session.add(job)
+            session.commit()
+            continue
+        if job.status == ReportJobStatus.RUNNING:
+            logger.warning("Se retoma el reporte %s abandonado por otro worker", job.id)
+        job.status = ReportJobStatus.RUNNING
+        job.started_at = now
+        job.heartbeat_at = now
+        job.attempts += 1
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job
+
+
+def _keep_alive(
+    session_factory: Callable[[], Session], job_id: int, interval: float, stop_event: threading.Event
+) -> None:
+    while not stop_event.wait(interval):
+        try:
+            with session_factory() as session:
+                session.execute(
+                    update(ReportJob)
+                    .where(ReportJob.id == job_id, ReportJob.status == ReportJobStatus.RUNNING)
+                    .values(heartbeat_at=datetime.utcnow())
+                )
+                session.commit()
+        except Exception:  # noqa: BLE001 - se reintenta en el próximo intervalo
+            logger.exception("No se pudo renovar el heartbeat del reporte %s", job_id)
+
+
+def _write_rows(path: Path, report_format: ReportJobFormat, columns: tuple[str, ...], rows: Iterable[tuple]) -> int:
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as handle:
+        if report_format == ReportJobFormat.CSV:
+            writer = csv.writer(handle)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(jsonable_encoder(list(row)))
+                count += 1
+        else:
+            for row in rows:
+                handle.write(json.dumps(jsonable_encoder(dict(zip(columns, row))), ensure_ascii=False))
+                handle.write("\n")
+                count += 1
+    return count
+
+
+def run_report_job(session: Session, job: ReportJob) -> ReportJob:
+    report = ReportJobName(job.report)
+    report_format = ReportJobFormat(job.format)
+    definition = REPORT_DEFINITIONS[report]
+    reports_dir = get_reports_dir()
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    filename = f"{job.id}-{report.value}.{report_format.value}.gz"
+    target = reports_dir / filename
+    partial = reports_dir / f".{filename}.partial"
+    try:
+        params = definition.params_model.model_validate(job.params)
+        row_count = _write_rows(partial, report_format, definition.columns, definition.rows(session, params))
+        partial.replace(target)
+    except Exception as exc:  # noqa: BLE001 - el error queda registrado en el trabajo
+        logger.exception("Falló el reporte %s", job.id)
+        session.rollback()
+        partial.unlink(missing_ok=True)
+        job.status = ReportJobStatus.FAILED
+        job.error = str(exc)[:1000]
+    else:
+        job.status = ReportJobStatus.COMPLETED
+        job.row_count = row_count
+        job.result_path = str(target.relative_to(get_storage_root()))
+    job.finished_at = datetime.utcnow()
+    job.updated_at = job.finished_at
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def resolve_report_result_path(job: ReportJob) -> Path | None:
+    if job.status != ReportJobStatus.COMPLETED or not job.result_path:
+        return None
+    path = get_storage_root() / job.result_path
+    return path if path.exists() else None
+
+
+def process_pending_report_jobs(
+    session_factory: Callable[[], Session],
+    max_jobs: int | None = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+) -> int:
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        with session_factory() as session:
+            job = claim_next_report_job(session, lease_seconds)
+            if not job:
+                break
+            stop_heartbeat = threading.Event()
+            heartbeat = threading.Thread(
+                target=_keep_alive,
+                args=(session_factory, job.id, lease_seconds / 3, stop_heartbeat),
+                name=f"report-heartbeat-{job.id}",
+                daemon=True,
+            )
+            heartbeat.start()
+            try:
+                run_report_job(session, job)
+            finally:
+                stop_heartbeat.set()
+                heartbeat.join()
+        processed += 1
+    return processed
+
+
+def _worker_loop(
+    session_factory: Callable[[], Session], poll_seconds: float, lease_seconds: float, stop_event: threading.Event
+) -> None:
+    while not stop_event.is_set():
+        try:
+            processed = process_pending_report_jobs(session_factory, lease_seconds=lease_seconds)
+        except Exception:  # noqa: BLE001 - el hilo no debe morir por un error de conexión
+            logger.exception("Error en el worker de reportes")
+            processed = 0
+        if not processed:
+            stop_event.wait(poll_seconds)
+
+
+def start_report_workers(
+    session_factory: Callable[[], Session],
+    threads: int,
+    poll_seconds: float,
+    stop_event: threading.Event | None = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+) -> tuple[threading.Event, list[threading.Thread]]:
+    stop_event = stop_event or threading.Event()
+    workers = [
+        threading.Thread(
+            target=_worker_loop,
+            args=(session_factory, poll_seconds, lease_seconds, stop_event),
+            name=f"report-worker-{index}",
+            daemon=True,
+        )
+        for index in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    return stop_event, workers
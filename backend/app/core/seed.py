@@ -1,3 +1,9 @@
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlmodel import Session, select
 
 from ..models import (
@@ -11,6 +17,7 @@ from ..models import (
     Permission,
     Role,
     RolePermission,
+    SeedState,
     SKU,
     SKUType,
     StockMovementType,
@@ -443,125 +450,135 @@ DEFAULT_STOCK_MOVEMENT_TYPES = [
 ]
 
 
-def _get_existing_map(session: Session, model, field: str):
-    records = session.exec(select(model)).all()
-    return {getattr(item, field): item for item in records}
-
-
-def seed_initial_data(session: Session) -> None:
-    """Carga datos mínimos sin duplicar registros."""
-
-    existing_roles = _get_existing_map(session, Role, "name")
-    for payload in DEFAULT_ROLES:
-        if payload["name"] not in existing_roles:
-            session.add(Role(**payload))
+SEED_STATE_NAME = "initial"
 
-    existing_permissions = _get_existing_map(session, Permission, "key")
-    for payload in DEFAULT_PERMISSIONS:
-        if payload["key"] not in existing_permissions:
-            session.add(Permission(**payload))
 
-    existing_deposits = _get_existing_map(session, Deposit, "name")
-    for payload in DEFAULT_DEPOSITS:
-        if payload["name"] not in existing_deposits:
-            session.add(Deposit(**payload))
+def seed_content_hash() -> str:
+    """Huella de los datos por defecto; cambia solo si se edita alguna de las constantes DEFAULT_*."""
+    content = {
+        "roles": DEFAULT_ROLES,
+        "permissions": DEFAULT_PERMISSIONS,
+        "role_permissions": DEFAULT_ROLE_PERMISSIONS,
+        "deposits": DEFAULT_DEPOSITS,
+        "sku_types": DEFAULT_SKU_TYPES,
+        "skus": DEFAULT_SKUS,
+        "recipes": DEFAULT_RECIPES,
+        "production_lines": DEFAULT_PRODUCTION_LINES,
+        "merma_types": DEFAULT_MERMA_TYPES,
+        "merma_causes": DEFAULT_MERMA_CAUSES,
+        "stock_movement_types": DEFAULT_STOCK_MOVEMENT_TYPES,
+    }
+    serialized = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
 
-    existing_sku_types = _get_existing_map(session, SKUType, "code")
-    for payload in DEFAULT_SKU_TYPES:
-        code = payload["code"]
-        if code not in existing_sku_types:
-            session.add(SKUType(**payload))
 
-    existing_movement_types = _get_existing_map(session, StockMovementType, "code")
-    for payload in DEFAULT_STOCK_MOVEMENT_TYPES:
-        code = payload["code"]
-        if code not in existing_movement_types:
-            session.add(StockMovementType(**payload))
+def _rows(model, payloads: list[dict]) -> list[dict]:
+    # Se valida con el modelo para completar defaults (timestamps, is_active) igual que un alta por ORM.
+    return [model(**payload).model_dump(exclude={"id"}) for payload in payloads]
 
-    session.commit()
 
-    role_map = _get_existing_map(session, Role, "name")
-    permission_map = _get_existing_map(session, Permission, "key")
-    existing_role_permissions = {(item.role_id, item.permission_id) for item in session.exec(select(RolePermission)).all()}
-    for role_name, permission_keys in DEFAULT_ROLE_PERMISSIONS.items():
-        role = role_map.get(role_name)
-        if not role:
-            continue
-        for key in permission_keys:
-            permission = permission_map.get(key)
-            if not permission:
-                continue
-            pair = (role.id, permission.id)
-            if pair in existing_role_permissions:
-                continue
-            session.add(RolePermission(role_id=role.id, permission_id=permission.id))
-            existing_role_permissions.add(pair)
-
-    sku_type_map = _get_existing_map(session, SKUType, "code")
-    existing_skus = _get_existing_map(session, SKU, "code")
-    for payload in DEFAULT_SKUS:
-        if payload["code"] in existing_skus:
-            continue
-        sku_type = sku_type_map.get(payload["sku_type_code"])
-        if not sku_type:
-            continue
-        session.add(
-            SKU(
-                code=payload["code"],
-                name=payload["name"],
-                sku_type_id=sku_type.id,
-                unit=payload["unit"],
-            )
-        )
+def _insert_missing(session: Session, model, payloads: list[dict], conflict_columns: list[str]) -> None:
+    if not payloads:
+        return
+    session.execute(
+        pg_insert(model).values(_rows(model, payloads)).on_conflict_do_nothing(index_elements=conflict_columns)
+    )
 
-    session.commit()
 
-    existing_lines = _get_existing_map(session, ProductionLine, "name")
-    for payload in DEFAULT_PRODUCTION_LINES:
-        if payload["name"] not in existing_lines:
-            session.add(ProductionLine(**payload))
+def _id_map(session: Session, column) -> dict:
+    model = column.class_
+    return dict(session.execute(select(column, model.id)).all())
 
-    existing_types = {(item.stage, item.code): item for item in session.exec(select(MermaType)).all()}
-    for payload in DEFAULT_MERMA_TYPES:
-        key = (payload["stage"], payload["code"])
-        if key not in existing_types:
-            session.add(MermaType(**payload))
 
-    existing_causes = {(item.stage, item.code): item for item in session.exec(select(MermaCause)).all()}
-    for payload in DEFAULT_MERMA_CAUSES:
-        key = (payload["stage"], payload["code"])
-        if key not in existing_causes:
-            session.add(MermaCause(**payload))
-
-    session.commit()
-
-    # Recipes reference SKUs, so we seed them after committing SKUs
-    sku_map = _get_existing_map(session, SKU, "code")
-    for recipe in DEFAULT_RECIPES:
-        product = sku_map.get(recipe["product_code"])
-        if not product:
-            continue
-        existing_recipe = session.exec(select(Recipe).where(Recipe.product_id == product.id)).first()
-        if existing_recipe:
-            continue
-
-        new_recipe = Recipe(product_id=product.id, name=recipe["name"])
-        session.add(new_recipe)
-        session.flush()
-
-        for item in recipe["items"]:
-            component = sku_map.get(item["component_code"])
-            if not component:
-                continue
-            session.add(
-                RecipeItem(
-                    recipe_id=new_recipe.id,
-                    component_id=component.id,
-                    quantity=item["quantity"],
-                )
-            )
+def _insert_missing_recipes(session: Session, sku_ids: dict[str, int]) -> None:
+    # recipes no tiene clave única por producto: se insertan solo las de productos sin receta.
+    recipes = {
+        sku_ids[recipe["product_code"]]: recipe for recipe in DEFAULT_RECIPES if recipe["product_code"] in sku_ids
+    }
+    if not recipes:
+        return
+    with_recipe = set(session.execute(select(Recipe.product_id).where(Recipe.product_id.in_(recipes))).scalars())
+    missing = {product_id: recipe for product_id, recipe in recipes.items() if product_id not in with_recipe}
+    if not missing:
+        return
+    created = session.execute(
+        insert(Recipe)
+        .values(
+            _rows(Recipe, [{"product_id": product_id, "name": recipe["name"]} for product_id, recipe in missing.items()])
+        )
+        .returning(Recipe.id, Recipe.product_id)
+    ).all()
+    items = [
+        {"recipe_id": recipe_id, "component_id": sku_ids[item["component_code"]], "quantity": item["quantity"]}
+        for recipe_id, product_id in created
+        for item in missing[product_id]["items"]
+        if item["component_code"] in sku_ids
+    ]
+    if items:
+        session.execute(insert(RecipeItem).values(_rows(RecipeItem, items)))
+
+
+def seed_initial_data(session: Session, force: bool = False) -> bool:
+    """Carga datos mínimos sin duplicar registros.
+
+    Cada tabla se siembra con un único INSERT ... ON CONFLICT DO NOTHING dentro de una sola transacción, de modo
+    que los registros existentes (incluidas las ediciones hechas desde la aplicación) no se modifican. El hash del
+    contenido queda en seed_state: si no cambió, la siguiente corrida termina tras una lectura. Devuelve si sembró.
+    """
+    content_hash = seed_content_hash()
+    state = session.get(SeedState, SEED_STATE_NAME)
+    if state is not None and state.content_hash == content_hash and not force:
+        return False
+
+    _insert_missing(session, Role, DEFAULT_ROLES, ["name"])
+    _insert_missing(session, Permission, DEFAULT_PERMISSIONS, ["key"])
+    _insert_missing(session, Deposit, DEFAULT_DEPOSITS, ["name"])
+    _insert_missing(session, SKUType, DEFAULT_SKU_TYPES, ["code"])
+    _insert_missing(session, StockMovementType, DEFAULT_STOCK_MOVEMENT_TYPES, ["code"])
+    _insert_missing(session, ProductionLine, DEFAULT_PRODUCTION_LINES, ["name"])
+    _insert_missing(session, MermaType, DEFAULT_MERMA_TYPES, ["stage", "code"])
+    _insert_missing(session, MermaCause, DEFAULT_MERMA_CAUSES, ["stage", "code"])
+
+    role_ids = _id_map(session, Role.name)
+    permission_ids = _id_map(session, Permission.key)
+    role_permissions = [
+        {"role_id": role_ids[role_name], "permission_id": permission_ids[key]}
+        for role_name, permission_keys in DEFAULT_ROLE_PERMISSIONS.items()
+        if role_name in role_ids
+        for key in permission_keys
+        if key in permission_ids
+    ]
+    if role_permissions:
+        session.execute(
+            pg_insert(RolePermission)
+            .values(_rows(RolePermission, role_permissions))
+            .on_conflict_do_nothing(index_elements=["role_id", "permission_id"])
+        )
 
+    sku_type_ids = _id_map(session, SKUType.code)
+    skus = [
+        {
+            "code": payload["code"],
+            "name": payload["name"],
+            "sku_type_id": sku_type_ids[payload["sku_type_code"]],
+            "unit": payload["unit"],
+        }
+        for payload in DEFAULT_SKUS
+        if payload["sku_type_code"] in sku_type_ids
+    ]
+    _insert_missing(session, SKU, skus, ["code"])
+    _insert_missing_recipes(session, _id_map(session, SKU.code))
+
+    session.execute(
+        pg_insert(SeedState)
+        .values(name=SEED_STATE_NAME, content_hash=content_hash, applied_at=datetime.utcnow())
+        .on_conflict_do_update(
+            index_elements=["name"],
+            set_={"content_hash": content_hash, "applied_at": datetime.utcnow()},
+        )
+    )
     session.commit()
+    return True
 
 
 if __name__ == "__main__":  # Manual seeding helper
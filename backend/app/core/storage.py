@@ -19,6 +19,14 @@ def get_remitos_dir_new() -> Path:
     return get_storage_root() / "remitos"
 
 
+def get_reports_dir() -> Path:
+    return get_storage_root() / "reports"
+
+
+def get_archives_dir() -> Path:
+    return get_storage_root() / "archives"
+
+
 def get_remitos_dir_legacy() -> Path:
     return _project_storage_dir() / "remitos"
 
@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..models import SKU, Deposit, Order, OrderItem, ProductionLot, Shipment, SyncTombstone
+
+# Entidad de /sync -> modelo; todas se recorren por (updated_at, id).
+SYNC_ENTITIES = {
+    "orders": Order,
+    "order_items": OrderItem,
+    "shipments": Shipment,
+    "skus": SKU,
+    "deposits": Deposit,
+    "production_lots": ProductionLot,
+}
+TOMBSTONES_KEY = "deleted"
+_ENTITY_BY_MODEL = {model: entity for entity, model in SYNC_ENTITIES.items()}
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def encode_sync_token(watermarks: dict[str, tuple[datetime, int]]) -> str:
+    payload = {name: [timestamp.isoformat(), row_id] for name, (timestamp, row_id) in watermarks.items()}
+    raw = json.dumps({"v": 1, "w": payload}, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> dict[str, tuple[datetime, int]]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if payload.get("v") != 1:
+            raise InvalidSyncToken(token)
+        return {
+            name: (datetime.fromisoformat(timestamp), int(row_id))
+            for name, (timestamp, row_id) in payload["w"].items()
+            if name in SYNC_ENTITIES or name == TOMBSTONES_KEY
+        }
+    except (ValueError, TypeError, KeyError, AttributeError, UnicodeDecodeError) as exc:
+        raise InvalidSyncToken(token) from exc
+
+
+@event.listens_for(Session, "before_flush")
+def _record_tombstones(session: Session, _flush_context, _instances) -> None:
+    """Los borrados físicos de entidades sincronizadas dejan una lápida en la misma transacción."""
+    for instance in session.deleted:
+        entity = _ENTITY_BY_MODEL.get(type(instance))
+        if entity is not None and instance.id is not None:
+            session.add(SyncTombstone(entity=entity, entity_id=instance.id))
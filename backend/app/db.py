@@ -1,12 +1,70 @@
-from collections.abc import Generator
+import re
+from collections.abc import AsyncGenerator, Generator
+from pathlib import Path
 
+from alembic.script import ScriptDirectory
+from fastapi import Request
+from sqlalchemy import make_url, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import Pool
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .core.config import get_settings
+from .core.pool import ASYNC_POOL_CLASSES, POOL_CLASSES, PoolMetrics, apply_session_timeouts, instrumented_pool_class
 from .core.seed import seed_initial_data
 
 settings = get_settings()
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+ALEMBIC_DIR = Path(__file__).resolve().parents[1] / "alembic"
+
+
+def _pool_options(pool_base: type[Pool], role: str) -> dict:
+    options: dict = {"poolclass": instrumented_pool_class(pool_base, PoolMetrics(role))}
+    if settings.db_pool_class == "queue":
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_timeout=settings.db_pool_timeout_seconds,
+        )
+    return options
+
+
+def _create_engine(url: str, role: str, statement_timeout_ms: int) -> Engine:
+    new_engine = create_engine(url, pool_pre_ping=True, **_pool_options(POOL_CLASSES[settings.db_pool_class], role))
+    apply_session_timeouts(new_engine, statement_timeout_ms, settings.db_lock_timeout_ms)
+    return new_engine
+
+
+def _create_async_engine(url: str, role: str, statement_timeout_ms: int) -> AsyncEngine:
+    async_url = make_url(url).set(drivername="postgresql+psycopg_async")
+    pool_base = ASYNC_POOL_CLASSES[settings.db_pool_class]
+    new_engine = create_async_engine(async_url, pool_pre_ping=True, **_pool_options(pool_base, role))
+    apply_session_timeouts(new_engine.sync_engine, statement_timeout_ms, settings.db_lock_timeout_ms)
+    return new_engine
+
+
+engine = _create_engine(settings.database_url, "primary", settings.db_statement_timeout_ms)
+# Sin réplica configurada las lecturas usan el mismo engine que las escrituras.
+read_engine = (
+    _create_engine(settings.read_database_url, "read", settings.read_db_statement_timeout_ms)
+    if settings.read_database_url
+    else engine
+)
+# Engines asyncio para los endpoints de lectura `async def`; comparten la configuración de pool y timeouts.
+async_engine = _create_async_engine(settings.database_url, "async-primary", settings.db_statement_timeout_ms)
+async_read_engine = (
+    _create_async_engine(settings.read_database_url, "async-read", settings.read_db_statement_timeout_ms)
+    if settings.read_database_url
+    else async_engine
+)
+
+# Posición WAL del primario tras la última escritura del cliente (cookie o header) para leer lo propio.
+PRIMARY_LSN_COOKIE = "fnc_primary_lsn"
+PRIMARY_LSN_HEADER = "X-Primary-LSN"
+_LSN_PATTERN = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
 
 
 def init_db() -> None:
@@ -16,7 +74,83 @@ def init_db() -> None:
             seed_initial_data(session)
 
 
+def get_alembic_head() -> str | None:
+    return ScriptDirectory(str(ALEMBIC_DIR)).get_current_head()
+
+
+def verify_schema_revision() -> str:
+    """Comprueba con una sola consulta que la base esté migrada a la revisión head de alembic."""
+    expected = get_alembic_head()
+    try:
+        with engine.connect() as connection:
+            current = connection.execute(text("SELECT version_num FROM alembic_version")).scalars().all()
+    except ProgrammingError as exc:
+        raise RuntimeError("La base no tiene tabla alembic_version; ejecute `alembic upgrade head`") from exc
+    if expected not in current:
+        raise RuntimeError(
+            f"La base está en la revisión {', '.join(current) or 'vacía'} y el código espera {expected}; "
+            "ejecute `alembic upgrade head`"
+        )
+    return expected
+
+
+def prepare_database(mode: str) -> None:
+    if mode == "verify":
+        verify_schema_revision()
+    else:
+        init_db()
+
+
 def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
 
+
+def current_primary_lsn() -> str | None:
+    if read_engine is engine:
+        return None
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+
+
+def _requested_lsn(request: Request) -> str | None:
+    lsn = request.headers.get(PRIMARY_LSN_HEADER) or request.cookies.get(PRIMARY_LSN_COOKIE)
+    return lsn if lsn and _LSN_PATTERN.match(lsn) else None
+
+
+_REPLAY_CHECK = text("SELECT COALESCE(pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn), false)")
+
+
+def _replica_has_replayed(session: Session, lsn: str) -> bool:
+    return bool(session.execute(_REPLAY_CHECK, {"lsn": lsn}).scalar())
+
+
+def get_read_session(request: Request) -> Generator[Session, None, None]:
+    """Sesión para endpoints de solo lectura: usa la réplica salvo que aún no haya aplicado la última escritura
+    del cliente (LSN recibido por header o cookie), en cuyo caso lee del primario."""
+    if read_engine is engine:
+        with Session(engine) as session:
+            yield session
+        return
+    lsn = _requested_lsn(request)
+    with Session(read_engine) as session:
+        if lsn is None or _replica_has_replayed(session, lsn):
+            yield session
+            return
+    with Session(engine) as session:
+        yield session
+
+
+async def get_async_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Versión asyncio de get_read_session, con la misma regla de lectura sobre la réplica."""
+    if async_read_engine is async_engine:
+        async with AsyncSession(async_engine) as session:
+            yield session
+        return
+    lsn = _requested_lsn(request)
+    async with AsyncSession(async_read_engine) as session:
+        if lsn is None or (await session.execute(_REPLAY_CHECK, {"lsn": lsn})).scalar():
+            yield session
+            return
+    async with AsyncSession(async_engine) as session:
+        yield session
@@ -1,15 +1,68 @@
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
+from . import IMPORT_STARTED
 from .api.routes import api_router
+from .core.audit import start_audit_outbox, stop_audit_outbox
+from .core.conditional import NotModified
 from .core.config import get_settings
-from .db import init_db
+from .core.idempotency import REPLAYED_HEADER, idempotency_middleware
+from .core.report_jobs import start_report_workers
+from .db import (
+    PRIMARY_LSN_COOKIE,
+    PRIMARY_LSN_HEADER,
+    async_engine,
+    current_primary_lsn,
+    engine,
+    prepare_database,
+    read_engine,
+)
 
 settings = get_settings()
+# uvicorn solo configura handlers para sus propios loggers; así la línea de arranque queda en su salida.
+logger = logging.getLogger("uvicorn.error")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await run_in_threadpool(prepare_database, settings.db_startup_mode)
+    database_ms = (time.perf_counter() - started) * 1000
+
+    report_workers_stop = None
+    if settings.report_worker_threads > 0:
+        report_workers_stop, _ = start_report_workers(
+            lambda: Session(engine),
+            settings.report_worker_threads,
+            settings.report_worker_poll_seconds,
+            lease_seconds=settings.report_job_lease_seconds,
+        )
+    if settings.audit_outbox_enabled:
+        start_audit_outbox(lambda: Session(engine), settings.audit_outbox_batch_size)
+
+    logger.info(
+        "Arranque en %.0f ms (base %.0f ms, modo %s)",
+        (time.perf_counter() - IMPORT_STARTED) * 1000,
+        database_ms,
+        settings.db_startup_mode,
+    )
+    yield
+
+    if report_workers_stop is not None:
+        report_workers_stop.set()
+    if settings.audit_outbox_enabled:
+        stop_audit_outbox(timeout=10)
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -17,9 +70,28 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", PRIMARY_LSN_HEADER, REPLAYED_HEADER],
     )
 
-    init_db()
+    @app.exception_handler(NotModified)
+    async def _not_modified(_request: Request, exc: NotModified) -> Response:
+        return Response(status_code=304, headers=exc.headers)
+
+    app.middleware("http")(idempotency_middleware(async_engine, settings.idempotency_key_ttl_seconds))
+
+    if read_engine is not engine:
+        @app.middleware("http")
+        async def _track_primary_lsn(request: Request, call_next):
+            response = await call_next(request)
+            if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+                lsn = await run_in_threadpool(current_primary_lsn)
+                if lsn:
+                    response.headers[PRIMARY_LSN_HEADER] = lsn
+                    response.set_cookie(
+                        PRIMARY_LSN_COOKIE, lsn, max_age=settings.primary_lsn_cookie_max_age, httponly=True
+                    )
+            return response
+
     app.include_router(api_router, prefix=settings.api_prefix)
     return app
 
@@ -0,0 +1,67 @@
+"""Tareas de mantenimiento.
+
+- `python -m app.maintenance partitions [--months-ahead N] [--archive-before-months M]`
+- `python -m app.maintenance seed [--force]`: carga los datos iniciales; puede repetirse sin duplicar registros y,
+  si el contenido no cambió desde la última carga, termina sin escribir (`--force` lo vuelve a aplicar).
+- `python -m app.maintenance idempotency`: borra las respuestas de Idempotency-Key vencidas.
+"""
+import argparse
+import logging
+from datetime import date
+
+from sqlmodel import Session
+
+from .core.idempotency import sweep_expired_idempotency_keys
+from .core.partitions import PARTITIONED_TABLES, add_months, archive_partitions, ensure_partitions
+from .core.seed import seed_initial_data
+from .db import engine
+
+logger = logging.getLogger(__name__)
+
+
+def run_partition_maintenance(session: Session, months_ahead: int, archive_before_months: int | None) -> None:
+    cutoff = add_months(date.today(), -archive_before_months) if archive_before_months else None
+    for table in PARTITIONED_TABLES:
+        created = ensure_partitions(session, table, months_ahead)
+        logger.info("%s: particiones creadas %s", table, created or "ninguna")
+        if cutoff is not None:
+            archived = archive_partitions(session, table, cutoff)
+            logger.info("%s: particiones archivadas %s", table, [path.name for path in archived] or "ninguna")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de la base.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    partitions = subparsers.add_parser(
+        "partitions", help="Crea las particiones mensuales próximas y archiva las antiguas"
+    )
+    partitions.add_argument("--months-ahead", type=int, default=3)
+    partitions.add_argument(
+        "--archive-before-months",
+        type=int,
+        default=None,
+        help="Archiva y elimina las particiones de meses anteriores a hoy menos N meses",
+    )
+    seed = subparsers.add_parser("seed", help="Carga roles, permisos, catálogos y datos de ejemplo faltantes")
+    seed.add_argument(
+        "--force", action="store_true", help="Aplica el seed aunque su contenido no haya cambiado desde la última carga"
+    )
+    subparsers.add_parser("idempotency", help="Borra las claves de idempotencia vencidas")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "partitions":
+        with Session(engine) as session:
+            run_partition_maintenance(session, args.months_ahead, args.archive_before_months)
+    elif args.command == "seed":
+        with Session(engine) as session:
+            applied = seed_initial_data(session, force=args.force)
+        logger.info("Datos iniciales cargados" if applied else "Datos iniciales sin cambios; no se aplicó el seed")
+    elif args.command == "idempotency":
+        with Session(engine) as session:
+            removed = sweep_expired_idempotency_keys(session)
+        logger.info("Claves de idempotencia vencidas borradas: %s", removed)
+
+
+if __name__ == "__main__":
+    main()
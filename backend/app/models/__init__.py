@@ -5,16 +5,31 @@ from .common import (
     MermaStage,
     OrderStatus,
     RemitoStatus,
+    ReportJobStatus,
     ShipmentStatus,
     UnitOfMeasure,
 )
-from .inventory import Deposit, InventoryCount, InventoryCountItem, ProductionLot, StockLevel, StockMovement, StockMovementType
+from .inventory import (
+    Deposit,
+    InventoryCount,
+    InventoryCountItem,
+    LotLineage,
+    LotSequence,
+    ProductionLot,
+    StockLevel,
+    StockMovement,
+    StockMovementType,
+)
 from .order import Order, OrderItem, Remito, RemitoItem
 from .purchase import PurchaseReceipt, PurchaseReceiptItem, Supplier
 from .shipment import Shipment, ShipmentItem
 from .sku import Recipe, RecipeItem, SKU, SKUType, SemiConversionRule
 from .merma import MermaCause, MermaEvent, MermaType, ProductionLine
 from .audit import AuditLog
+from .idempotency import IdempotencyKey
+from .report import ReportJob
+from .seed import SeedState
+from .sync import SyncTombstone
 from .user import Permission, Role, RolePermission, User
 
 __all__ = [
@@ -24,12 +39,15 @@ __all__ = [
     "MermaStage",
     "OrderStatus",
     "RemitoStatus",
+    "ReportJobStatus",
     "ShipmentStatus",
     "UnitOfMeasure",
     "SKUType",
     "Deposit",
     "InventoryCount",
     "InventoryCountItem",
+    "LotLineage",
+    "LotSequence",
     "ProductionLot",
     "StockLevel",
     "StockMovement",
@@ -52,6 +70,10 @@ __all__ = [
     "SKU",
     "SemiConversionRule",
     "AuditLog",
+    "ReportJob",
+    "IdempotencyKey",
+    "SeedState",
+    "SyncTombstone",
     "Role",
     "Permission",
     "RolePermission",
@@ -1,6 +1,7 @@
 from typing import Optional, TYPE_CHECKING
 
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, Relationship
 
 from .common import AuditAction, TimestampedModel, enum_column
@@ -10,13 +11,23 @@ if TYPE_CHECKING:  # pragma: no cover
 
 
 class AuditLog(TimestampedModel, table=True):
+    # En Postgres la tabla está particionada por mes de created_at (migración 20261019_0025).
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index(
+            "ix_audit_logs_changes",
+            "changes",
+            postgresql_using="gin",
+            postgresql_ops={"changes": "jsonb_path_ops"},
+        ),
+        Index("ix_audit_logs_created_at_id", "created_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     entity_type: str = Field(max_length=100, index=True)
     entity_id: int | None = Field(default=None, index=True)
     action: AuditAction = Field(sa_column=enum_column(AuditAction, "auditaction"))
-    changes: dict | None = Field(default=None, sa_column=Column(JSON))
+    changes: dict | None = Field(default=None, sa_column=Column(JSONB))
     user_id: int | None = Field(default=None, foreign_key="users.id")
     ip_address: str | None = Field(default=None, max_length=64)
 
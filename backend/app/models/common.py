@@ -68,6 +68,13 @@ class InventoryCountStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+class ReportJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class AuditAction(str, Enum):
     CREATE = "create"
     UPDATE = "update"
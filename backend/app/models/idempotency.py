@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Index, JSON, LargeBinary
+from sqlmodel import Field, SQLModel
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """Respuesta guardada de una solicitud con Idempotency-Key, para devolverla en los reintentos."""
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+
+    # Hash del header Authorization: la misma clave enviada por otro usuario es otra entrada.
+    scope: str = Field(primary_key=True, max_length=64)
+    key: str = Field(primary_key=True, max_length=255)
+    request_hash: str = Field(max_length=64)
+    status_code: int
+    response_headers: list = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+    response_body: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    expires_at: datetime = Field(nullable=False)
@@ -1,8 +1,8 @@
 from datetime import date, datetime
 from typing import Optional, TYPE_CHECKING
 
-from sqlmodel import Field, Relationship
-from sqlalchemy import UniqueConstraint
+from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import CheckConstraint, Index, UniqueConstraint
 
 from .common import InventoryCountStatus, TimestampedModel, UnitOfMeasure, enum_column
 
@@ -26,6 +26,7 @@ class StockMovementType(TimestampedModel, table=True):
 
 class Deposit(TimestampedModel, table=True):
     __tablename__ = "deposits"
+    __table_args__ = (Index("ix_deposits_updated_at_id", "updated_at", "id"),)
 
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(max_length=255, unique=True)
@@ -40,6 +41,7 @@ class Deposit(TimestampedModel, table=True):
 
 class StockLevel(TimestampedModel, table=True):
     __tablename__ = "stock_levels"
+    __table_args__ = (Index("ix_stock_levels_updated_at", "updated_at"),)
 
     id: Optional[int] = Field(default=None, primary_key=True)
     sku_id: int = Field(foreign_key="skus.id")
@@ -52,7 +54,12 @@ class StockLevel(TimestampedModel, table=True):
 
 class ProductionLot(TimestampedModel, table=True):
     __tablename__ = "production_lots"
-    __table_args__ = (UniqueConstraint("lot_code", name="uq_production_lots_code"),)
+    __table_args__ = (
+        UniqueConstraint("lot_code", name="uq_production_lots_code"),
+        Index("ix_production_lots_produced_at_id", "produced_at", "id"),
+        Index("ix_production_lots_deposit_updated_at", "deposit_id", "updated_at"),
+        Index("ix_production_lots_updated_at_id", "updated_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     lot_code: str = Field(max_length=64, index=True)
@@ -72,7 +79,40 @@ class ProductionLot(TimestampedModel, table=True):
     movements: list["StockMovement"] = Relationship(back_populates="production_lot")
 
 
+class LotSequence(SQLModel, table=True):
+    """Último número de secuencia emitido por fecha, línea y SKU para los códigos de lote de producción."""
+
+    __tablename__ = "lot_sequences"
+
+    produced_at: date = Field(primary_key=True)
+    production_line_id: int = Field(foreign_key="production_lines.id", primary_key=True)
+    sku_id: int = Field(foreign_key="skus.id", primary_key=True)
+    last_value: int = Field(default=0)
+
+
+class LotLineage(SQLModel, table=True):
+    """Arista de trazabilidad: un lote consumido por otro lote o despachado en un remito."""
+
+    __tablename__ = "lot_lineage"
+    __table_args__ = (
+        CheckConstraint(
+            "child_lot_id IS NOT NULL OR remito_id IS NOT NULL", name="ck_lot_lineage_has_target"
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    parent_lot_id: int = Field(foreign_key="production_lots.id", index=True)
+    child_lot_id: int | None = Field(default=None, foreign_key="production_lots.id", index=True)
+    remito_id: int | None = Field(default=None, foreign_key="remitos.id", index=True)
+    remito_item_id: int | None = Field(default=None, foreign_key="remito_items.id")
+    quantity: float
+    stock_movement_id: int | None = Field(default=None, foreign_key="stock_movements.id")
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
 class StockMovement(TimestampedModel, table=True):
+    # En Postgres la tabla está particionada por mes de movement_date (migración 20261019_0025); las FKs hacia
+    # stock_movements.id declaradas en otros modelos existen solo en el ORM.
     __tablename__ = "stock_movements"
 
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -83,7 +123,7 @@ class StockMovement(TimestampedModel, table=True):
     reference_type: str | None = Field(default=None, max_length=50)
     reference_id: int | None = Field(default=None)
     reference_item_id: int | None = Field(default=None)
-    reference: str | None = Field(default=None, max_length=100)
+    reference: str | None = Field(default=None, max_length=100, index=True)
     lot_code: str | None = Field(default=None, max_length=64)
     production_lot_id: int | None = Field(default=None, foreign_key="production_lots.id")
     movement_date: date = Field(default_factory=date.today)
@@ -116,6 +156,9 @@ class InventoryCount(TimestampedModel, table=True):
     created_by_user_id: int | None = Field(default=None, foreign_key="users.id")
     updated_by_user_id: int | None = Field(default=None, foreign_key="users.id")
     approved_by_user_id: int | None = Field(default=None, foreign_key="users.id")
+    snapshot_movement_id: int | None = Field(
+        default=None, description="Último stock_movements.id al iniciar el conteo (marca de corte del sistema)"
+    )
 
     deposit: Deposit = Relationship()
     created_by_user: Optional["User"] = Relationship(sa_relationship_kwargs={"foreign_keys": "[InventoryCount.created_by_user_id]"})
@@ -135,6 +178,9 @@ class InventoryCountItem(TimestampedModel, table=True):
     counted_quantity: float
     system_quantity: float
     difference: float
+    expected_quantity: float | None = Field(
+        default=None, description="Stock del sistema al aprobar: system_quantity más los movimientos posteriores al corte"
+    )
     unit: UnitOfMeasure = UnitOfMeasure.UNIT
     stock_movement_id: int | None = Field(default=None, foreign_key="stock_movements.id")
 
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Field, Relationship
 
 from .common import MermaAction, MermaStage, TimestampedModel, UnitOfMeasure, enum_column
@@ -51,6 +51,10 @@ class MermaCause(TimestampedModel, table=True):
 
 class MermaEvent(TimestampedModel, table=True):
     __tablename__ = "merma_events"
+    __table_args__ = (
+        Index("ix_merma_events_detected_at_stage", "detected_at", "stage"),
+        Index("ix_merma_events_detected_at_id", "detected_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     stage: MermaStage = Field(sa_column=enum_column(MermaStage, "mermastage"))
@@ -1,6 +1,7 @@
 from datetime import date, datetime
 from typing import Optional, TYPE_CHECKING
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship
 
 from .common import OrderStatus, RemitoStatus, TimestampedModel, enum_column
@@ -14,6 +15,12 @@ if TYPE_CHECKING:  # pragma: no cover
 
 class Order(TimestampedModel, table=True):
     __tablename__ = "orders"
+    # Validador de GET condicional (count + max(updated_at)) por destino.
+    __table_args__ = (
+        Index("ix_orders_destination_deposit_updated_at", "destination_deposit_id", "updated_at"),
+        # Recorrido de /sync.
+        Index("ix_orders_updated_at_id", "updated_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     destination: str = Field(max_length=255)
@@ -43,6 +50,7 @@ class Order(TimestampedModel, table=True):
 
 class OrderItem(TimestampedModel, table=True):
     __tablename__ = "order_items"
+    __table_args__ = (Index("ix_order_items_updated_at_id", "updated_at", "id"),)
 
     id: Optional[int] = Field(default=None, primary_key=True)
     order_id: int = Field(foreign_key="orders.id")
@@ -55,6 +63,7 @@ class OrderItem(TimestampedModel, table=True):
 
 class Remito(TimestampedModel, table=True):
     __tablename__ = "remitos"
+    __table_args__ = (Index("ix_remitos_updated_at", "updated_at"),)
 
     id: Optional[int] = Field(default=None, primary_key=True)
     order_id: int | None = Field(default=None, foreign_key="orders.id")
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, Index, JSON, text
+from sqlmodel import Field
+
+from .common import ReportJobStatus, TimestampedModel, enum_column
+
+ACTIVE_REPORT_JOB_PREDICATE = "status IN ('pending', 'running')"
+
+
+class ReportJob(TimestampedModel, table=True):
+    __tablename__ = "report_jobs"
+    __table_args__ = (
+        # Solo puede haber un trabajo activo por combinación de parámetros: los pedidos idénticos lo comparten.
+        Index(
+            "uq_report_jobs_active_params_hash",
+            "params_hash",
+            unique=True,
+            postgresql_where=text(ACTIVE_REPORT_JOB_PREDICATE),
+        ),
+        Index("ix_report_jobs_status_id", "status", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    report: str = Field(max_length=64)
+    format: str = Field(max_length=16)
+    params: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    params_hash: str = Field(max_length=64, index=True)
+    status: ReportJobStatus = Field(
+        default=ReportJobStatus.PENDING, sa_column=enum_column(ReportJobStatus, "reportjobstatus")
+    )
+    result_path: str | None = Field(default=None, max_length=500)
+    row_count: int | None = None
+    error: str | None = Field(default=None, max_length=1000)
+    requested_by_user_id: int | None = Field(default=None, foreign_key="users.id")
+    started_at: datetime | None = None
+    # El worker lo renueva mientras genera el archivo; si vence, otro worker puede retomar el trabajo.
+    heartbeat_at: datetime | None = None
+    attempts: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    finished_at: datetime | None = None
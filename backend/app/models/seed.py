@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class SeedState(SQLModel, table=True):
+    """Hash del contenido sembrado por última vez; si no cambió, el seed termina con una sola lectura."""
+
+    __tablename__ = "seed_state"
+
+    name: str = Field(primary_key=True, max_length=50)
+    content_hash: str = Field(max_length=64)
+    applied_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
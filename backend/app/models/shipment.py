@@ -1,6 +1,7 @@
 from datetime import date
 from typing import Optional, TYPE_CHECKING
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship
 
 from .common import ShipmentStatus, TimestampedModel, enum_column
@@ -13,6 +14,10 @@ if TYPE_CHECKING:  # pragma: no cover
 
 class Shipment(TimestampedModel, table=True):
     __tablename__ = "shipments"
+    __table_args__ = (
+        Index("ix_shipments_deposit_updated_at", "deposit_id", "updated_at"),
+        Index("ix_shipments_updated_at_id", "updated_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     deposit_id: int = Field(foreign_key="deposits.id")
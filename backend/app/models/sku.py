@@ -1,7 +1,7 @@
 from typing import Optional, TYPE_CHECKING
 
 from sqlmodel import Field, Relationship
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint
 
 from .common import TimestampedModel, UnitOfMeasure
 
@@ -25,6 +25,7 @@ class SKUType(TimestampedModel, table=True):
 
 class SKU(TimestampedModel, table=True):
     __tablename__ = "skus"
+    __table_args__ = (Index("ix_skus_updated_at_id", "updated_at", "id"),)
 
     id: Optional[int] = Field(default=None, primary_key=True)
     code: str = Field(index=True, unique=True, max_length=64)
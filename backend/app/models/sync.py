@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class SyncTombstone(SQLModel, table=True):
+    """Registro de un borrado físico para que /sync lo informe a los clientes que ya tenían la fila."""
+
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (Index("ix_sync_tombstones_deleted_at_id", "deleted_at", "id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entity: str = Field(max_length=50)
+    entity_id: int
+    deleted_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
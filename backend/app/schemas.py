@@ -1,5 +1,6 @@
 from datetime import date, datetime
 from enum import Enum
+from typing import Literal
 
 from sqlmodel import Field, SQLModel
 
@@ -10,6 +11,7 @@ from .models.common import (
     MermaStage,
     OrderStatus,
     RemitoStatus,
+    ReportJobStatus,
     ShipmentStatus,
     UnitOfMeasure,
 )
@@ -165,6 +167,64 @@ class ProductionLotRead(ProductionLotBase):
     production_line_name: str | None = None
 
 
+class ProductionLotAggregate(str, Enum):
+    SKU = "sku"
+    DEPOSIT = "deposit"
+    LINE = "line"
+
+
+class ProductionLotSummary(SQLModel):
+    group_id: int | None = None
+    group_code: str | None = None
+    group_name: str | None = None
+    lot_count: int
+    produced_quantity: float
+    remaining_quantity: float
+
+
+class LotTraceDirection(str, Enum):
+    UP = "up"
+    DOWN = "down"
+
+
+class LotTraceNode(SQLModel):
+    lot_id: int
+    lot_code: str
+    sku_id: int
+    sku_code: str
+    sku_name: str
+    deposit_id: int
+    deposit_name: str
+    produced_at: date
+    remaining_quantity: float
+    is_blocked: bool
+    depth: int
+
+
+class LotTraceEdge(SQLModel):
+    parent_lot_id: int
+    child_lot_id: int
+    quantity: float
+
+
+class LotTraceRemito(SQLModel):
+    remito_id: int
+    lot_id: int
+    quantity: float
+    status: RemitoStatus
+    destination: str
+    dispatched_at: datetime | None = None
+
+
+class LotTrace(SQLModel):
+    lot_id: int
+    direction: LotTraceDirection
+    depth: int
+    nodes: list[LotTraceNode]
+    edges: list[LotTraceEdge]
+    remitos: list[LotTraceRemito]
+
+
 class StockLevelRead(SQLModel):
     deposit_id: int
     deposit_name: str
@@ -336,6 +396,30 @@ class PurchaseReceiptRead(SQLModel):
     items: list[PurchaseReceiptItemRead]
 
 
+class PurchaseReceiptImportRow(SQLModel):
+    supplier: str = Field(min_length=1, description="Nombre o CUIT del proveedor")
+    deposit: str = Field(min_length=1, description="Nombre del depósito")
+    document_number: str | None = None
+    received_at: date | None = None
+    notes: str | None = None
+    sku_code: str = Field(min_length=1)
+    quantity: float
+    unit: UnitOfMeasure | None = None
+    lot_code: str | None = None
+    expiry_date: date | None = None
+    unit_cost: float | None = None
+
+
+class PurchaseReceiptImportProgress(SQLModel):
+    status: Literal["running", "completed", "failed"]
+    receipts_done: int = 0
+    receipts_total: int
+    items_done: int = 0
+    items_total: int
+    receipt_ids: list[int] = Field(default_factory=list)
+    error: str | None = None
+
+
 class ExpiryReportStatus(str, Enum):
     GREEN = "green"
     YELLOW = "yellow"
@@ -364,6 +448,33 @@ class ExpiryReport(SQLModel):
     items: list[ExpiryReportRow]
 
 
+class ProductionEfficiencyRow(SQLModel):
+    lot_id: int | None = None
+    lot_code: str | None = None
+    produced_at: date | None = None
+    sku_id: int | None = None
+    sku_code: str | None = None
+    sku_name: str | None = None
+    production_line_id: int | None = None
+    production_line_name: str | None = None
+    lots: int
+    produced_quantity: float
+    theoretical_consumption: float
+    actual_consumption: float
+    variance: float
+    variance_pct: float | None = None
+    yield_pct: float | None = None
+
+
+class ProductionEfficiencyReport(SQLModel):
+    date_from: date | None = None
+    date_to: date | None = None
+    lots: list[ProductionEfficiencyRow]
+    by_line: list[ProductionEfficiencyRow]
+    by_sku: list[ProductionEfficiencyRow]
+    totals: ProductionEfficiencyRow
+
+
 class UserCreate(SQLModel):
     email: str
     full_name: str
@@ -678,6 +789,7 @@ class MermaEventRead(SQLModel):
     production_line_id: int | None = None
     production_line_name: str | None = None
     reported_by_user_id: int | None = None
+    reported_by_user_name: str | None = None
     reported_by_role: str | None = None
     notes: str | None = None
     detected_at: datetime
@@ -688,6 +800,48 @@ class MermaEventRead(SQLModel):
     stock_movement_id: int | None = None
 
 
+class MermaAnalyticsDimension(str, Enum):
+    STAGE = "stage"
+    TYPE = "type"
+    CAUSE = "cause"
+    PRODUCTION_LINE = "production_line"
+    DEPOSIT = "deposit"
+    SKU = "sku"
+
+
+class MermaAnalyticsPeriod(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class MermaAnalyticsRow(SQLModel):
+    period_start: date | None = None
+    stage: MermaStage | None = None
+    type_id: int | None = None
+    type_label: str | None = None
+    cause_id: int | None = None
+    cause_label: str | None = None
+    production_line_id: int | None = None
+    production_line_name: str | None = None
+    deposit_id: int | None = None
+    deposit_name: str | None = None
+    sku_id: int | None = None
+    sku_code: str | None = None
+    sku_name: str | None = None
+    rolled_up: list[str] = Field(default_factory=list)
+    is_total: bool = False
+    quantity: float
+    base_quantity: float
+    events: int
+
+
+class MermaAnalyticsReport(SQLModel):
+    group_by: list[MermaAnalyticsDimension]
+    period: MermaAnalyticsPeriod | None = None
+    rows: list[MermaAnalyticsRow]
+
+
 class InventoryCountItemCreate(SQLModel):
     sku_id: int
     counted_quantity: float
@@ -717,10 +871,41 @@ class InventoryCountItemRead(SQLModel):
     counted_quantity: float
     system_quantity: float
     difference: float
+    expected_quantity: float | None = None
     unit: UnitOfMeasure
     stock_movement_id: int | None = None
 
 
+class InventoryCountItemPatch(SQLModel):
+    sku_id: int
+    production_lot_id: int | None = None
+    counted_quantity: float | None = None
+    remove: bool = False
+
+
+class InventoryCountItemsPatch(SQLModel):
+    items: list[InventoryCountItemPatch]
+
+
+class InventoryCountItemsDiff(SQLModel):
+    count_id: int
+    created: list[InventoryCountItemRead]
+    updated: list[InventoryCountItemRead]
+    removed: list[InventoryCountItemRead]
+    unchanged: int
+
+
+class InventoryCountPrefillRequest(SQLModel):
+    sku_type_ids: list[int] = Field(default_factory=list)
+    production_line_id: int | None = None
+    include_empty: bool = False
+
+
+class InventoryCountPrefillResult(SQLModel):
+    count_id: int
+    inserted: int
+
+
 class InventoryCountRead(SQLModel):
     id: int
     deposit_id: int
@@ -739,6 +924,7 @@ class InventoryCountRead(SQLModel):
     updated_by_name: str | None = None
     approved_by_user_id: int | None = None
     approved_by_name: str | None = None
+    snapshot_movement_id: int | None = None
     items: list[InventoryCountItemRead]
 
 
@@ -752,3 +938,107 @@ class AuditLogRead(SQLModel):
     user_name: str | None = None
     ip_address: str | None = None
     created_at: datetime
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    XLSX = "xlsx"
+
+
+class ReportJobName(str, Enum):
+    STOCK_MOVEMENTS = "stock_movements"
+    MERMA_EVENTS = "merma_events"
+
+
+class ReportJobFormat(str, Enum):
+    CSV = "csv"
+    JSONL = "jsonl"
+
+
+class StockMovementReportParams(SQLModel):
+    date_from: date | None = None
+    date_to: date | None = None
+    sku_id: int | None = None
+    deposit_id: int | None = None
+    movement_type_code: str | None = None
+
+
+class MermaReportParams(SQLModel):
+    date_from: date | None = None
+    date_to: date | None = None
+    stage: MermaStage | None = None
+    sku_id: int | None = None
+    deposit_id: int | None = None
+    production_line_id: int | None = None
+    affects_stock: bool | None = None
+
+
+class ReportJobCreate(SQLModel):
+    report: ReportJobName
+    format: ReportJobFormat = ReportJobFormat.CSV
+    params: dict = Field(default_factory=dict)
+
+
+class ReportJobRead(SQLModel):
+    id: int
+    report: str
+    format: str
+    params: dict
+    status: ReportJobStatus
+    row_count: int | None = None
+    error: str | None = None
+    download_url: str | None = None
+    requested_by_user_id: int | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+class SyncOrderItemRead(OrderItemRead):
+    order_id: int
+
+
+class SyncTombstoneRead(SQLModel):
+    entity: str
+    id: int
+    deleted_at: datetime
+
+
+class SyncRead(SQLModel):
+    token: str
+    has_more: bool
+    orders: list[OrderRead] = Field(default_factory=list)
+    order_items: list[SyncOrderItemRead] = Field(default_factory=list)
+    shipments: list[ShipmentRead] = Field(default_factory=list)
+    skus: list[SKURead] = Field(default_factory=list)
+    deposits: list[DepositRead] = Field(default_factory=list)
+    production_lots: list[ProductionLotRead] = Field(default_factory=list)
+    deleted: list[SyncTombstoneRead] = Field(default_factory=list)
+
+
+class BootstrapRead(SQLModel):
+    version: str
+    units: list[UnitRead] | None = None
+    sku_types: list[SKUTypeRead] | None = None
+    skus: list[SKURead] | None = None
+    deposits: list[DepositRead] | None = None
+    movement_types: list[StockMovementTypeRead] | None = None
+    production_lines: list[ProductionLineRead] | None = None
+    merma_types: list[MermaTypeRead] | None = None
+    merma_causes: list[MermaCauseRead] | None = None
+    recipes: list[RecipeRead] | None = None
+
+
+class DbPoolStats(SQLModel):
+    role: str
+    pool_class: str
+    size: int | None = None
+    max_overflow: int | None = None
+    checked_in: int | None = None
+    checked_out: int | None = None
+    overflow: int | None = None
+    saturation: float | None = None
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_avg_ms: float = 0.0
+    wait_max_ms: float = 0.0
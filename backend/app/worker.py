@@ -0,0 +1,45 @@
+"""Worker de reportes asíncronos: `python -m app.worker [--threads N] [--lease-seconds S] [--once]`."""
+import argparse
+import logging
+import signal
+
+from sqlmodel import Session
+
+from .core.config import get_settings
+from .core.report_jobs import process_pending_report_jobs, start_report_workers
+from .db import engine
+
+
+def _session_factory() -> Session:
+    return Session(engine)
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Procesa los trabajos de reportes pendientes.")
+    parser.add_argument("--threads", type=int, default=max(settings.report_worker_threads, 1))
+    parser.add_argument("--poll-seconds", type=float, default=settings.report_worker_poll_seconds)
+    parser.add_argument("--lease-seconds", type=float, default=settings.report_job_lease_seconds)
+    parser.add_argument("--once", action="store_true", help="Procesa la cola pendiente y termina")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        processed = process_pending_report_jobs(_session_factory, lease_seconds=args.lease_seconds)
+        logging.getLogger(__name__).info("Reportes procesados: %s", processed)
+        return
+
+    stop_event, workers = start_report_workers(
+        _session_factory, args.threads, args.poll_seconds, lease_seconds=args.lease_seconds
+    )
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    try:
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(timeout=1)
+    except KeyboardInterrupt:
+        stop_event.set()
+
+
+if __name__ == "__main__":
+    main()
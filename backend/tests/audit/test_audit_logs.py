@@ -0,0 +1,48 @@
+import json
+from uuid import uuid4
+
+from sqlmodel import Session
+
+from app.core.audit import record_audit
+from app.db import engine
+from app.models import AuditAction
+
+
+def _record_events(entity_type):
+    with Session(engine) as session:
+        record_audit(session, entity_type, 1, AuditAction.STATUS, 1, {"status": "cancelled", "shipment_id": 812})
+        record_audit(session, entity_type, 2, AuditAction.STATUS, 1, {"status": "confirmed", "shipment_id": 812})
+        record_audit(session, entity_type, 3, AuditAction.UPDATE, None, {"status": "cancelled"})
+        session.commit()
+
+
+def test_audit_logs_contains_filter(client):
+    entity_type = f"test-{uuid4().hex[:8]}"
+    _record_events(entity_type)
+
+    res = client.get(
+        "/api/audit/logs", params={"entity_type": entity_type, "contains": json.dumps({"status": "cancelled"})}
+    )
+    assert res.status_code == 200
+    assert sorted(row["entity_id"] for row in res.json()) == [1, 3]
+
+    res = client.get("/api/audit/logs", params={"entity_type": entity_type, "contains": '{"shipment_id": 812}'})
+    rows = res.json()
+    assert sorted(row["entity_id"] for row in rows) == [1, 2]
+    assert all(row["user_name"] for row in rows)
+
+    assert client.get("/api/audit/logs", params={"contains": "{"}).status_code == 400
+    assert client.get("/api/audit/logs", params={"contains": "[1]"}).status_code == 400
+
+
+def test_audit_logs_cursor_pagination(client):
+    entity_type = f"test-{uuid4().hex[:8]}"
+    _record_events(entity_type)
+
+    first = client.get("/api/audit/logs", params={"entity_type": entity_type, "limit": 2})
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/api/audit/logs", params={"entity_type": entity_type, "limit": 2, "cursor": cursor})
+    assert "X-Next-Cursor" not in second.headers
+    ids = [row["id"] for row in first.json() + second.json()]
+    assert len(ids) == len(set(ids)) == 3
@@ -0,0 +1,56 @@
+from uuid import uuid4
+
+from sqlmodel import Session, select
+
+from app.core.audit import record_audit, start_audit_outbox, stop_audit_outbox
+from app.db import engine
+from app.models import AuditAction, AuditLog, Deposit
+
+
+def _audit_rows(entity_type):
+    with Session(engine) as session:
+        return session.exec(select(AuditLog).where(AuditLog.entity_type == entity_type)).all()
+
+
+def test_audit_events_are_written_at_commit():
+    entity_type = f"test-{uuid4().hex[:8]}"
+    with Session(engine) as session:
+        record_audit(
+            session,
+            entity_type,
+            1,
+            AuditAction.CREATE,
+            None,
+            {"status": AuditAction.STATUS, "notes": None, "_sa_instance_state": object()},
+        )
+        record_audit(session, entity_type, 2, AuditAction.UPDATE, None, [{"id": 1}])
+        assert _audit_rows(entity_type) == []
+        session.commit()
+
+    rows = sorted(_audit_rows(entity_type), key=lambda row: row.entity_id)
+    assert [row.action for row in rows] == [AuditAction.CREATE, AuditAction.UPDATE]
+    assert rows[0].changes == {"status": "status", "notes": None}
+    assert rows[1].changes == {"items": [{"id": 1}]}
+
+
+def test_audit_events_are_discarded_on_rollback():
+    entity_type = f"test-{uuid4().hex[:8]}"
+    with Session(engine) as session:
+        session.exec(select(Deposit)).first()
+        record_audit(session, entity_type, 1, AuditAction.CREATE)
+        session.rollback()
+        session.commit()
+    assert _audit_rows(entity_type) == []
+
+
+def test_audit_outbox_writes_after_commit():
+    entity_type = f"test-{uuid4().hex[:8]}"
+    outbox = start_audit_outbox(lambda: Session(engine), batch_size=10, poll_seconds=0.05)
+    try:
+        with Session(engine) as session:
+            record_audit(session, entity_type, 1, AuditAction.CREATE)
+            session.commit()
+    finally:
+        stop_audit_outbox(timeout=5)
+    assert not outbox._thread.is_alive()
+    assert len(_audit_rows(entity_type)) == 1
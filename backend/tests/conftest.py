@@ -65,3 +65,22 @@ def client():
     Cliente HTTP para pruebas.
     """
     return TestClient(app)
+
+
+@pytest.fixture()
+def fetch_all_pages(client):
+    """
+    Recorre un listado paginado siguiendo X-Next-Cursor y devuelve todas las filas.
+    """
+    def _fetch(path, params=None):
+        params = {"limit": 500, **(params or {})}
+        rows = []
+        while True:
+            page = client.get(path, params=params)
+            assert page.status_code == 200
+            rows.extend(page.json())
+            if "X-Next-Cursor" not in page.headers:
+                return rows
+            params["cursor"] = page.headers["X-Next-Cursor"]
+
+    return _fetch
@@ -0,0 +1,20 @@
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+from sqlmodel import create_engine
+
+from app import db
+from app.core.pool import PoolMetrics, apply_session_timeouts, instrumented_pool_class, pool_stats
+
+
+def test_session_timeouts_are_applied_on_connect():
+    metrics = PoolMetrics("test")
+    test_engine = create_engine(db.engine.url, poolclass=instrumented_pool_class(NullPool, metrics))
+    apply_session_timeouts(test_engine, 1500, 250)
+    with test_engine.connect() as connection:
+        assert connection.execute(text("SHOW statement_timeout")).scalar() == "1500ms"
+        assert connection.execute(text("SHOW lock_timeout")).scalar() == "250ms"
+
+    stats = pool_stats(test_engine)
+    assert stats["pool_class"] == "InstrumentedNullPool"
+    assert stats["checkouts"] == 1
+    test_engine.dispose()
@@ -0,0 +1,35 @@
+from sqlmodel import create_engine
+from starlette.requests import Request
+
+from app import db
+
+
+def _request(headers=None):
+    raw_headers = [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers})
+
+
+def _session_engine(request):
+    dependency = db.get_read_session(request)
+    session = next(dependency)
+    bound = session.get_bind()
+    dependency.close()
+    return bound
+
+
+def test_read_session_uses_primary_without_replica():
+    assert _session_engine(_request()) is db.engine
+
+
+def test_read_session_sticks_to_primary_until_replica_catches_up(monkeypatch):
+    replica = create_engine(db.engine.url)
+    monkeypatch.setattr(db, "read_engine", replica)
+    lsn = db.current_primary_lsn()
+    assert lsn
+
+    assert _session_engine(_request()) is replica
+    assert _session_engine(_request({"Cookie": f"{db.PRIMARY_LSN_COOKIE}=not-an-lsn"})) is replica
+    # El primario no está en recuperación, así que como réplica nunca "alcanza" el LSN pedido.
+    assert _session_engine(_request({db.PRIMARY_LSN_HEADER: lsn})) is db.engine
+    assert _session_engine(_request({"Cookie": f"{db.PRIMARY_LSN_COOKIE}={lsn}"})) is db.engine
+    replica.dispose()
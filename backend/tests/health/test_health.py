@@ -1,3 +1,7 @@
+from app.api.deps import get_current_user
+from app.main import app
+
+
 def test_health_ok(client):
     res = client.get("/api/health")
     assert res.status_code == 200
@@ -5,3 +9,23 @@ def test_health_ok(client):
     data = res.json()
     assert data["status"] == "ok"
     assert "version" in data
+
+
+def test_db_pool_metrics(client):
+    client.get("/api/skus")
+    res = client.get("/api/metrics/db-pool")
+    assert res.status_code == 200
+
+    primary = res.json()[0]
+    assert primary["role"] == "primary"
+    assert primary["pool_class"] == "InstrumentedQueuePool"
+    assert primary["checkouts"] > 0
+    assert 0 <= primary["saturation"] <= 1
+
+
+def test_db_pool_metrics_requires_token(client):
+    override = app.dependency_overrides.pop(get_current_user)
+    try:
+        assert client.get("/api/metrics/db-pool").status_code == 401
+    finally:
+        app.dependency_overrides[get_current_user] = override
@@ -0,0 +1,24 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import db
+from app.main import app
+
+
+def test_alembic_head_is_single_revision():
+    assert db.get_alembic_head()
+
+
+def test_verify_mode_rejects_unmigrated_database(monkeypatch):
+    monkeypatch.setattr(db, "get_alembic_head", lambda: "no-such-revision")
+    with pytest.raises(RuntimeError):
+        db.prepare_database("verify")
+
+
+def test_lifespan_logs_cold_start(caplog):
+    with caplog.at_level(logging.INFO, logger="uvicorn.error"):
+        with TestClient(app) as client:
+            assert client.get("/api/health").status_code == 200
+    assert any("Arranque en" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,141 @@
+from datetime import date
+
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from alembic.script import ScriptDirectory
+from sqlmodel import Session, select
+
+from app.core.config import get_settings
+from app.core.partitions import (
+    _partition_month,
+    add_months,
+    archive_partitions,
+    ensure_partitions,
+    is_partitioned,
+    partition_name,
+)
+from app.db import ALEMBIC_DIR, engine
+from app.models import MermaEvent, StockMovement
+
+PARTITION_REVISION = "20261019_0025"
+
+
+def _run_partition_migration(action):
+    module = ScriptDirectory(str(ALEMBIC_DIR)).get_revision(PARTITION_REVISION).module
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            getattr(module, action)()
+
+
+def _row_counts(session):
+    return {
+        table: session.execute(sa.text(f"SELECT count(*) FROM {table}")).scalar()
+        for table in ("stock_movements", "audit_logs")
+    }
+
+
+def _create_merma(client):
+    payload = {
+        "stage": "PRODUCTION",
+        "sku_id": next(sku["id"] for sku in client.get("/api/skus").json() if sku["code"] == "CUC-PT-24"),
+        "production_line_id": client.get("/api/production-lines").json()[0]["id"],
+        "deposit_id": 1,
+        "quantity": 1,
+        "type_id": client.get("/api/mermas/types").json()[0]["id"],
+        "cause_id": client.get("/api/mermas/causes").json()[0]["id"],
+        "affects_stock": False,
+    }
+    res = client.post("/api/mermas", json=payload)
+    assert res.status_code in (200, 201)
+    return res.json()["id"]
+
+
+def test_month_helpers():
+    assert add_months(date(2026, 11, 20), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 5), -1) == date(2025, 12, 1)
+    assert _partition_month("stock_movements", "stock_movements_p202601") == date(2026, 1, 1)
+    assert _partition_month("stock_movements", "stock_movements_default") is None
+
+
+def test_partition_maintenance_skips_plain_tables():
+    with Session(engine) as session:
+        assert ensure_partitions(session, "stock_movements", 3) == []
+        assert archive_partitions(session, "audit_logs", date.today()) == []
+
+
+def test_partition_migration_round_trip(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(get_settings(), "storage_root", str(tmp_path))
+    merma_id = _create_merma(client)
+    with Session(engine) as session:
+        before = _row_counts(session)
+        first_date = session.execute(sa.text("SELECT min(movement_date) FROM stock_movements")).scalar()
+        # Un índice único debe sobrevivir al cambio sumando la clave de partición.
+        session.execute(sa.text("CREATE UNIQUE INDEX IF NOT EXISTS ux_audit_logs_round_trip ON audit_logs (id, entity_type)"))
+        session.commit()
+
+    _run_partition_migration("upgrade")
+    # Dos movimientos fuera de las particiones creadas por la migración caen en DEFAULT.
+    old_month, future_month = add_months(first_date, -1), add_months(date.today(), 12)
+    movement_ids = []
+    try:
+        with Session(engine) as session:
+            assert is_partitioned(session, "stock_movements") and is_partitioned(session, "audit_logs")
+            assert _row_counts(session) == before
+            definition = session.execute(
+                sa.text("SELECT pg_get_indexdef(to_regclass('ux_audit_logs_round_trip'))")
+            ).scalar()
+            assert definition.endswith("(id, entity_type, created_at)")
+
+            template = session.exec(select(StockMovement).order_by(StockMovement.id)).first()
+            old, future = (
+                StockMovement(
+                    sku_id=template.sku_id,
+                    deposit_id=template.deposit_id,
+                    movement_type_id=template.movement_type_id,
+                    quantity=1,
+                    movement_date=movement_date,
+                )
+                for movement_date in (old_month, future_month)
+            )
+            session.add_all([old, future])
+            session.flush()
+            movement_ids = [old.id, future.id]
+            merma = session.get(MermaEvent, merma_id)
+            merma.stock_movement_id = old.id
+            session.add(merma)
+            session.commit()
+
+            old_partition = partition_name("stock_movements", old_month)
+            future_partition = partition_name("stock_movements", future_month)
+            assert {old_partition, future_partition} <= set(ensure_partitions(session, "stock_movements", 3))
+            assert session.execute(sa.text("SELECT count(*) FROM stock_movements_default")).scalar() == 0
+            assert session.execute(sa.text(f"SELECT id FROM {future_partition}")).scalars().all() == [future.id]
+
+            archived = archive_partitions(session, "stock_movements", add_months(old_month, 1))
+            assert [path.name for path in archived] == [f"{old_partition}.jsonl.gz"]
+            session.expire_all()
+            assert session.get(MermaEvent, merma_id).stock_movement_id is None
+            assert session.get(StockMovement, movement_ids[0]) is None
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                sa.text("UPDATE merma_events SET stock_movement_id = NULL WHERE id = :id"), {"id": merma_id}
+            )
+            for movement_id in movement_ids:
+                connection.execute(sa.text("DELETE FROM stock_movements WHERE id = :id"), {"id": movement_id})
+        _run_partition_migration("downgrade")
+
+    with Session(engine) as session:
+        assert not is_partitioned(session, "stock_movements") and not is_partitioned(session, "audit_logs")
+        assert _row_counts(session)["stock_movements"] == before["stock_movements"]
+        session.execute(sa.text("DROP INDEX IF EXISTS ux_audit_logs_round_trip"))
+        session.commit()
+    inspector = sa.inspect(engine)
+    assert any(fk["referred_table"] == "stock_movements" for fk in inspector.get_foreign_keys("merma_events"))
+    assert [index["name"] for index in inspector.get_indexes("audit_logs")] == [
+        "ix_audit_logs_changes",
+        "ix_audit_logs_created_at_id",
+        "ix_audit_logs_entity_id",
+        "ix_audit_logs_entity_type",
+    ]
@@ -0,0 +1,27 @@
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.core.seed import SEED_STATE_NAME, seed_content_hash, seed_initial_data
+from app.db import engine
+from app.models import MermaCause, Permission, Recipe, RecipeItem, RolePermission, SeedState, SKU
+
+
+def _counts(session: Session) -> dict:
+    return {
+        model.__tablename__: session.exec(select(func.count()).select_from(model)).one()
+        for model in (Permission, RolePermission, SKU, MermaCause, Recipe, RecipeItem)
+    }
+
+
+def test_seed_is_idempotent_and_skips_unchanged_content():
+    with Session(engine) as session:
+        before = _counts(session)
+        assert seed_initial_data(session, force=True) is True
+        assert _counts(session) == before
+
+        state = session.get(SeedState, SEED_STATE_NAME)
+        assert state is not None
+        assert state.content_hash == seed_content_hash()
+
+        assert seed_initial_data(session) is False
+        assert _counts(session) == before
@@ -0,0 +1,57 @@
+import uuid
+
+from app.db import get_read_session
+from app.main import app
+
+
+def test_bootstrap_matches_catalog_endpoints(client):
+    res = client.get("/api/bootstrap", params={"include": "skus,deposits,recipes,units"})
+    assert res.status_code == 200
+    data = res.json()
+    assert set(data) == {"version", "skus", "deposits", "recipes", "units"}
+
+    assert data["skus"] == client.get("/api/skus").json()
+    assert data["deposits"] == client.get("/api/deposits").json()
+    assert data["units"] == client.get("/api/units").json()
+    recipes = sorted(client.get("/api/recipes").json(), key=lambda recipe: recipe["id"])
+    assert data["recipes"] == recipes
+
+
+def test_bootstrap_etag_and_invalidation_on_write(client):
+    first = client.get("/api/bootstrap", params={"include": "deposits,movement_types"})
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    cached = client.get(
+        "/api/bootstrap", params={"include": "deposits,movement_types"}, headers={"If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    name = f"TEST-BOOTSTRAP-{uuid.uuid4().hex[:6]}"
+    assert client.post("/api/deposits", json={"name": name}).status_code == 201
+
+    refreshed = client.get(
+        "/api/bootstrap", params={"include": "deposits,movement_types"}, headers={"If-None-Match": etag}
+    )
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert name in {deposit["name"] for deposit in refreshed.json()["deposits"]}
+
+
+def test_bootstrap_rejects_unknown_catalog(client):
+    res = client.get("/api/bootstrap", params={"include": "skus,nope"})
+    assert res.status_code == 400
+    assert "nope" in res.json()["detail"]
+
+
+def test_bootstrap_builds_catalogs_from_primary(client):
+    def _no_replica():
+        raise AssertionError("/bootstrap no debe leer de la réplica")
+
+    app.dependency_overrides[get_read_session] = _no_replica
+    try:
+        assert client.get("/api/bootstrap", params={"include": "deposits"}).status_code == 200
+    finally:
+        app.dependency_overrides.pop(get_read_session, None)
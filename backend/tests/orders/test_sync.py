@@ -0,0 +1,62 @@
+from uuid import uuid4
+
+from app.api import routes
+
+
+def _catch_up(client, token=None):
+    while True:
+        res = client.get("/api/sync", params={"since": token, "limit": 1000} if token else {"limit": 1000})
+        assert res.status_code == 200
+        data = res.json()
+        token = data["token"]
+        if not data["has_more"]:
+            return token, data
+
+
+def test_sync_returns_changes_and_tombstones(client, monkeypatch):
+    monkeypatch.setattr(routes.settings, "sync_safety_lag_seconds", 0)
+    token, _ = _catch_up(client)
+
+    deposit = client.post(
+        "/api/deposits", json={"name": f"SYNC-{uuid4().hex[:6]}", "controls_lot": False, "is_store": True}
+    ).json()
+    sku = next(item for item in client.get("/api/skus").json() if item["sku_type_code"] not in {"MP", "SEMI"})
+    order = client.post(
+        "/api/orders",
+        json={
+            "destination_deposit_id": deposit["id"],
+            "requested_by": "Tester",
+            "items": [{"sku_id": sku["id"], "quantity": 2, "current_stock": 10}],
+        },
+    )
+    assert order.status_code == 201
+    order = order.json()
+
+    token, changes = _catch_up(client, token)
+    assert [item["id"] for item in changes["orders"]] == [order["id"]]
+    assert [item["order_id"] for item in changes["order_items"]] == [order["id"]]
+    assert deposit["id"] in {item["id"] for item in changes["deposits"]}
+    assert changes["deleted"] == []
+
+    _, unchanged = _catch_up(client, token)
+    assert unchanged["orders"] == [] and unchanged["deposits"] == []
+
+    assert client.delete(f"/api/orders/{order['id']}").status_code == 204
+    _, changes = _catch_up(client, token)
+    deleted = {(item["entity"], item["id"]) for item in changes["deleted"]}
+    assert ("orders", order["id"]) in deleted
+    assert ("order_items", order["items"][0]["id"]) in deleted
+
+
+def test_sync_pages_with_limit(client, monkeypatch):
+    monkeypatch.setattr(routes.settings, "sync_safety_lag_seconds", 0)
+    first = client.get("/api/sync", params={"limit": 1}).json()
+    assert len(first["skus"]) == 1
+    assert first["has_more"] is True
+    second = client.get("/api/sync", params={"since": first["token"], "limit": 1}).json()
+    assert second["skus"][0]["id"] != first["skus"][0]["id"]
+
+
+def test_sync_rejects_invalid_token(client):
+    res = client.get("/api/sync", params={"since": "no-es-un-token"})
+    assert res.status_code == 400
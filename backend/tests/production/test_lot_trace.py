@@ -0,0 +1,54 @@
+from uuid import uuid4
+
+
+def _get_sku(client, code):
+    return next(sku for sku in client.get("/api/skus").json() if sku["code"] == code)
+
+
+def test_lot_trace_follows_recipe_consumption(client):
+    flour = _get_sku(client, "MP-HARINA")
+    product = _get_sku(client, "CUC-PT-24")
+    supplier = client.post("/api/suppliers", json={"name": f"Molino {uuid4().hex[:8]}"}).json()
+    flour_lot_code = f"MP-{uuid4().hex[:10]}"
+    # Vencimiento antiguo para que el consumo FIFO tome este lote primero.
+    res = client.post(
+        "/api/purchases/receipts",
+        json={
+            "supplier_id": supplier["id"],
+            "deposit_id": 1,
+            "items": [
+                {"sku_id": flour["id"], "quantity": 1, "unit": "kg", "lot_code": flour_lot_code, "expiry_date": "1990-01-01"}
+            ],
+        },
+    )
+    assert res.status_code == 201
+    flour_lot = client.get(f"/api/production/lots?lot_code={flour_lot_code}").json()[0]
+
+    movement_types = client.get("/api/stock/movement-types").json()
+    production_type_id = next(item["id"] for item in movement_types if item["code"] == "PRODUCTION")
+    line_id = client.get("/api/production-lines").json()[0]["id"]
+    reference = f"TRACE-{uuid4().hex[:8]}"
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": product["id"],
+            "deposit_id": 1,
+            "quantity": 2,
+            "movement_type_id": production_type_id,
+            "production_line_id": line_id,
+            "reference": reference,
+        },
+    )
+    assert res.status_code in (200, 201)
+    movements = client.get(f"/api/stock/movements?sku_id={product['id']}&limit=200").json()["items"]
+    product_lot_id = next(item["production_lot_id"] for item in movements if item["reference"] == reference)
+
+    down = client.get(f"/api/production/lots/{flour_lot['id']}/trace?direction=down").json()
+    assert [(node["lot_id"], node["depth"]) for node in down["nodes"]] == [(flour_lot["id"], 0), (product_lot_id, 1)]
+    assert down["edges"] == [{"parent_lot_id": flour_lot["id"], "child_lot_id": product_lot_id, "quantity": 1.0}]
+
+    up = client.get(f"/api/production/lots/{product_lot_id}/trace?direction=up&depth=1").json()
+    assert flour_lot["id"] in {node["lot_id"] for node in up["nodes"] if node["depth"] == 1}
+    assert up["remitos"] == []
+
+    assert client.get("/api/production/lots/0/trace").status_code == 404
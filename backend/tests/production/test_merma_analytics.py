@@ -0,0 +1,62 @@
+def _get_sku_id(client, code):
+    res = client.get("/api/skus")
+    assert res.status_code == 200
+    skus = res.json()
+    sku = next(s for s in skus if s["code"] == code)
+    return sku["id"]
+
+
+def _create_merma(client, quantity):
+    type_id = client.get("/api/mermas/types").json()[0]["id"]
+    cause_id = client.get("/api/mermas/causes").json()[0]["id"]
+    line_id = client.get("/api/production-lines").json()[0]["id"]
+    payload = {
+        "stage": "PRODUCTION",
+        "sku_id": _get_sku_id(client, "CUC-PT-24"),
+        "production_line_id": line_id,
+        "deposit_id": 1,
+        "quantity": quantity,
+        "type_id": type_id,
+        "cause_id": cause_id,
+        "affects_stock": False,
+    }
+    res = client.post("/api/mermas", json=payload)
+    assert res.status_code in (200, 201)
+    return res.json()
+
+
+def test_merma_analytics_rollup_matches_listing(client, fetch_all_pages):
+    _create_merma(client, 3)
+    _create_merma(client, 2)
+
+    events = fetch_all_pages("/api/mermas", {"stage": "PRODUCTION"})
+    expected_total = sum(event["quantity"] for event in events)
+
+    res = client.get(
+        "/api/mermas/analytics",
+        params=[("group_by", "stage"), ("group_by", "type"), ("stage", "PRODUCTION"), ("period", "month")],
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert data["group_by"] == ["stage", "type"]
+
+    totals = [row for row in data["rows"] if row["is_total"]]
+    assert len(totals) == 1
+    assert totals[0]["quantity"] == expected_total
+    assert totals[0]["events"] == len(events)
+
+    detail = [row for row in data["rows"] if not row["rolled_up"]]
+    assert detail
+    assert all(row["type_label"] for row in detail)
+    assert sum(row["quantity"] for row in detail) == expected_total
+
+
+def test_merma_analytics_without_rollup_has_no_subtotals(client):
+    _create_merma(client, 1)
+
+    res = client.get("/api/mermas/analytics", params={"group_by": "sku", "rollup": False})
+    assert res.status_code == 200
+    rows = res.json()["rows"]
+    assert rows
+    assert all(not row["rolled_up"] for row in rows)
+    assert all(row["sku_code"] for row in rows)
@@ -0,0 +1,57 @@
+def _get_sku_id(client, code):
+    res = client.get("/api/skus")
+    assert res.status_code == 200
+    skus = res.json()
+    sku = next(s for s in skus if s["code"] == code)
+    return sku["id"]
+
+
+def _create_merma(client, quantity):
+    payload = {
+        "stage": "PRODUCTION",
+        "sku_id": _get_sku_id(client, "CUC-PT-24"),
+        "production_line_id": client.get("/api/production-lines").json()[0]["id"],
+        "deposit_id": 1,
+        "quantity": quantity,
+        "type_id": client.get("/api/mermas/types").json()[0]["id"],
+        "cause_id": client.get("/api/mermas/causes").json()[0]["id"],
+        "affects_stock": False,
+    }
+    res = client.post("/api/mermas", json=payload)
+    assert res.status_code in (200, 201)
+    return res.json()
+
+
+def test_merma_listing_keyset_pagination(client):
+    for quantity in (1, 2, 3):
+        _create_merma(client, quantity)
+
+    full = client.get("/api/mermas", params={"limit": 6}).json()
+    seen = []
+    cursor = None
+    while len(seen) < len(full):
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        res = client.get("/api/mermas", params=params)
+        assert res.status_code == 200
+        seen.extend(event["id"] for event in res.json())
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen[: len(full)] == [event["id"] for event in full]
+    assert full[0]["sku_code"] == "CUC-PT-24"
+    assert full[0]["deposit_name"]
+
+
+def test_merma_listing_fields_projection(client):
+    _create_merma(client, 1)
+
+    res = client.get("/api/mermas", params={"fields": "sku_code,quantity", "limit": 1})
+    assert res.status_code == 200
+    assert set(res.json()[0]) == {"id", "sku_code", "quantity"}
+
+    res = client.get("/api/mermas", params={"fields": "unknown"})
+    assert res.status_code == 400
+    assert client.get("/api/mermas", params={"cursor": "nope"}).status_code == 400
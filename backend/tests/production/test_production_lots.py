@@ -0,0 +1,63 @@
+def _get_sku_id(client, code):
+    return next(sku["id"] for sku in client.get("/api/skus").json() if sku["code"] == code)
+
+
+def _produce(client, sku_id, quantity):
+    movement_types = client.get("/api/stock/movement-types").json()
+    production_type_id = next(item["id"] for item in movement_types if item["code"] == "PRODUCTION")
+    line_id = client.get("/api/production-lines").json()[0]["id"]
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": sku_id,
+            "deposit_id": 1,
+            "quantity": quantity,
+            "movement_type_id": production_type_id,
+            "production_line_id": line_id,
+        },
+    )
+    assert res.status_code in (200, 201)
+
+
+def test_production_lots_keyset_pagination(client):
+    sku_id = _get_sku_id(client, "CUC-PT-24")
+    for _ in range(3):
+        _produce(client, sku_id, 1)
+
+    first = client.get(f"/api/production/lots?sku_id={sku_id}&limit=2")
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+    assert first.json()[0]["sku_code"] == "CUC-PT-24"
+    assert first.json()[0]["deposit_name"]
+
+    second = client.get(f"/api/production/lots?sku_id={sku_id}&limit=2&cursor={cursor}").json()
+    first_ids = {lot["id"] for lot in first.json()}
+    assert second and not first_ids & {lot["id"] for lot in second}
+    ordered = [(lot["produced_at"], lot["id"]) for lot in first.json() + second]
+    assert ordered == sorted(ordered, reverse=True)
+
+    assert client.get("/api/production/lots?cursor=%%%").status_code == 400
+
+
+def test_production_lots_aggregate_by_sku(client):
+    sku_id = _get_sku_id(client, "CUC-PT-24")
+    _produce(client, sku_id, 2)
+
+    summary = client.get("/api/production/lots?aggregate=sku&deposit_id=1").json()
+    row = next(item for item in summary if item["group_id"] == sku_id)
+    assert row["group_code"] == "CUC-PT-24"
+
+    lots, cursor = [], None
+    while True:
+        path = f"/api/production/lots?sku_id={sku_id}&deposit_id=1&limit=500"
+        res = client.get(f"{path}&cursor={cursor}" if cursor else path)
+        lots.extend(res.json())
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert row["lot_count"] == len(lots)
+    assert abs(row["remaining_quantity"] - sum(lot["remaining_quantity"] for lot in lots)) < 1e-6
+
+    by_line = client.get("/api/production/lots?aggregate=line").json()
+    assert all(item["group_code"] is None for item in by_line)
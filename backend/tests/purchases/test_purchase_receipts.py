@@ -0,0 +1,142 @@
+import json
+from uuid import uuid4
+
+from app.api import routes
+
+
+def _get_sku(client, code):
+    return next(sku for sku in client.get("/api/skus").json() if sku["code"] == code)
+
+
+def _create_supplier(client):
+    res = client.post("/api/suppliers", json={"name": f"Proveedor {uuid4().hex[:8]}", "tax_id": uuid4().hex[:11]})
+    assert res.status_code in (200, 201)
+    return res.json()
+
+
+def _stock_quantity(client, sku_id, deposit_id):
+    levels = client.get("/api/stock-levels").json()
+    return sum(level["quantity"] for level in levels if level["sku_id"] == sku_id and level["deposit_id"] == deposit_id)
+
+
+def test_purchase_receipt_posts_items_lots_and_stock(client):
+    sku = _get_sku(client, "MP-HARINA")
+    supplier = _create_supplier(client)
+    before = _stock_quantity(client, sku["id"], 1)
+    lot_code = f"MP-{uuid4().hex[:10]}"
+    res = client.post(
+        "/api/purchases/receipts",
+        json={
+            "supplier_id": supplier["id"],
+            "deposit_id": 1,
+            "document_number": f"R-{uuid4().hex[:6]}",
+            "items": [
+                {"sku_id": sku["id"], "quantity": 10, "unit": "kg", "lot_code": lot_code, "expiry_date": "2030-01-01"},
+                {"sku_id": sku["id"], "quantity": 5, "unit": "kg", "lot_code": lot_code},
+                {"sku_id": sku["id"], "quantity": 2, "unit": "kg", "lot_code": f"{lot_code}-B"},
+            ],
+        },
+    )
+    assert res.status_code == 201
+    receipt = res.json()
+    assert len(receipt["items"]) == 3
+    assert all(item["stock_movement_id"] for item in receipt["items"])
+    assert _stock_quantity(client, sku["id"], 1) == before + 17
+
+    lots = {lot["lot_code"]: lot for lot in client.get(f"/api/production/lots?sku_id={sku['id']}&deposit_id=1").json()}
+    assert lots[lot_code]["remaining_quantity"] == 15
+    assert lots[lot_code]["expiry_date"] == "2030-01-01"
+    assert lots[f"{lot_code}-B"]["remaining_quantity"] == 2
+
+    # Un segundo ingreso sobre el mismo lote suma a su saldo sin crear otro.
+    res = client.post(
+        "/api/purchases/receipts",
+        json={
+            "supplier_id": supplier["id"],
+            "deposit_id": 1,
+            "items": [{"sku_id": sku["id"], "quantity": 3, "unit": "kg", "lot_code": lot_code}],
+        },
+    )
+    assert res.status_code == 201
+    lot = client.get(f"/api/production/lots/{lots[lot_code]['id']}").json()
+    assert lot["remaining_quantity"] == 18
+
+
+def test_purchase_receipt_import_commits_in_chunks(client):
+    sku = _get_sku(client, "MP-HARINA")
+    supplier = _create_supplier(client)
+    deposit = next(deposit for deposit in client.get("/api/deposits").json() if deposit["id"] == 1)
+    before = _stock_quantity(client, sku["id"], 1)
+    prefix = f"IMP-{uuid4().hex[:8]}"
+    content = "\n".join(
+        [
+            "supplier;deposit;document_number;received_at;sku_code;quantity;unit;lot_code;expiry_date",
+            f"{supplier['name']};{deposit['name']};{prefix}-1;2026-10-01;MP-HARINA;4;kg;{prefix}-A;",
+            f"{supplier['tax_id']};{deposit['name']};{prefix}-1;2026-10-01;MP-HARINA;6;;{prefix}-B;2031-01-01",
+            f"{supplier['name']};{deposit['name']};{prefix}-2;2026-10-02;MP-HARINA;1;kg;{prefix}-A;",
+        ]
+    )
+    res = client.post(
+        "/api/purchases/receipts/import?chunk_size=1",
+        files={"file": ("remitos.csv", content.encode(), "text/csv")},
+    )
+    assert res.status_code == 200
+    progress = [json.loads(line) for line in res.text.splitlines()]
+    assert [line["receipts_done"] for line in progress] == [1, 2, 2]
+    assert progress[-1]["status"] == "completed"
+    assert progress[-1]["items_done"] == 3
+    assert len(progress[-1]["receipt_ids"]) == 2
+    assert _stock_quantity(client, sku["id"], 1) == before + 11
+
+    receipts = client.get(f"/api/purchases/receipts?supplier_id={supplier['id']}").json()
+    assert sorted(receipt["document_number"] for receipt in receipts) == [f"{prefix}-1", f"{prefix}-2"]
+
+
+def test_purchase_receipt_import_validates_whole_file(client):
+    supplier = _create_supplier(client)
+    rows = [
+        {"supplier": supplier["name"], "deposit": "Depósito inexistente", "sku_code": "MP-HARINA", "quantity": 1},
+        {"supplier": supplier["name"], "deposit": "x", "sku_code": "NO-EXISTE", "quantity": 1, "lot_code": "L1"},
+    ]
+    res = client.post(
+        "/api/purchases/receipts/import",
+        files={"file": ("remitos.json", json.dumps(rows).encode(), "application/json")},
+    )
+    assert res.status_code == 400
+    assert "Fila 2" in res.json()["detail"]
+    assert "Fila 3" in res.json()["detail"]
+    assert client.get(f"/api/purchases/receipts?supplier_id={supplier['id']}").json() == []
+
+
+def test_purchase_receipt_import_reports_unexpected_errors(client, monkeypatch):
+    supplier = _create_supplier(client)
+    deposit = next(deposit for deposit in client.get("/api/deposits").json() if deposit["id"] == 1)
+    prefix = f"IMP-{uuid4().hex[:8]}"
+    content = "\n".join(
+        [
+            "supplier;deposit;document_number;sku_code;quantity;unit;lot_code",
+            f"{supplier['name']};{deposit['name']};{prefix}-1;MP-HARINA;4;kg;{prefix}-A",
+            f"{supplier['name']};{deposit['name']};{prefix}-2;MP-HARINA;1;kg;{prefix}-B",
+        ]
+    )
+    create_receipts = routes._create_purchase_receipts
+    calls = []
+
+    def _fail_second_chunk(session, payloads, user_id):
+        calls.append(payloads)
+        if len(calls) == 2:
+            raise RuntimeError("conexión perdida")
+        return create_receipts(session, payloads, user_id)
+
+    monkeypatch.setattr(routes, "_create_purchase_receipts", _fail_second_chunk)
+    res = client.post(
+        "/api/purchases/receipts/import?chunk_size=1",
+        files={"file": ("remitos.csv", content.encode(), "text/csv")},
+    )
+    assert res.status_code == 200
+    progress = [json.loads(line) for line in res.text.splitlines()]
+    assert [line["status"] for line in progress] == ["running", "failed"]
+    assert progress[-1]["receipts_done"] == 1
+    assert progress[-1]["error"]
+    receipts = client.get(f"/api/purchases/receipts?supplier_id={supplier['id']}").json()
+    assert [receipt["document_number"] for receipt in receipts] == [f"{prefix}-1"]
@@ -0,0 +1,34 @@
+def test_order_list_matches_detail(client):
+    orders = client.get("/api/orders").json()
+    assert orders
+    for order in orders[:5]:
+        assert client.get(f"/api/orders/{order['id']}").json() == order
+
+
+def test_stock_movement_list_balances_match_stock_levels(client):
+    data = client.get("/api/stock/movements", params={"limit": 20}).json()
+    assert data["total"] >= len(data["items"]) > 0
+    levels = {
+        (level["deposit_id"], level["sku_id"]): level["quantity"] for level in client.get("/api/stock-levels").json()
+    }
+    for movement in data["items"]:
+        assert movement["sku_code"] and movement["movement_type_code"]
+        assert movement["current_balance"] == levels.get((movement["deposit_id"], movement["sku_id"]), 0)
+
+
+def test_stock_reports(client):
+    summary = client.get("/api/reports/stock-summary").json()
+    levels = client.get("/api/stock-levels").json()
+    assert round(sum(row["quantity"] for row in summary["totals_by_deposit"]), 6) == round(
+        sum(level["quantity"] for level in levels), 6
+    )
+
+    alerts = client.get("/api/reports/stock-alerts", params={"include_inactive": True}).json()
+    assert alerts["total"] == len(alerts["items"])
+    assert all(item["sku_type_code"] for item in alerts["items"])
+
+    expirations = client.get("/api/reports/stock-expirations").json()
+    assert all(item["remaining_quantity"] > 0 for item in expirations["items"])
+
+    efficiency = client.get("/api/reports/production-efficiency")
+    assert efficiency.status_code == 200
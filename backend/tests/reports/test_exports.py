@@ -0,0 +1,41 @@
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+
+def test_stock_movements_csv_export(client):
+    res = client.get("/api/stock/movements", params={"format": "csv"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    assert "attachment" in res.headers["content-disposition"]
+
+    rows = list(csv.reader(io.StringIO(res.content.decode("utf-8-sig"))))
+    assert rows[0][:3] == ["movement_id", "movement_date", "movement_type"]
+    total = client.get("/api/stock/movements", params={"limit": 1}).json()["total"]
+    assert len(rows) - 1 == total
+
+
+def test_production_lots_xlsx_export_is_valid_workbook(client, fetch_all_pages):
+    res = client.get("/api/production/lots", params={"format": "xlsx", "include_blocked": True})
+    assert res.status_code == 200
+
+    with zipfile.ZipFile(io.BytesIO(res.content)) as archive:
+        assert "xl/workbook.xml" in archive.namelist()
+        sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+
+    namespace = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+    rows = sheet.findall(".//x:sheetData/x:row", namespace)
+    header = [cell.findtext(".//x:t", namespaces=namespace) for cell in rows[0]]
+    assert header[:2] == ["lot_id", "lot_code"]
+    lots = fetch_all_pages("/api/production/lots", {"include_blocked": True})
+    assert len(rows) - 1 == len(lots)
+
+
+def test_list_exports_accept_format(client):
+    for path in ("/api/orders", "/api/remitos", "/api/mermas", "/api/audit/logs"):
+        res = client.get(path, params={"format": "csv"})
+        assert res.status_code == 200, path
+        assert res.content.startswith("\ufeff".encode("utf-8"))
+
+    assert client.get("/api/orders", params={"format": "pdf"}).status_code == 422
@@ -0,0 +1,84 @@
+import uuid
+
+
+def _get_sku_type_id(client, code: str) -> int:
+    res = client.get("/api/sku-types")
+    assert res.status_code == 200
+    return next(item["id"] for item in res.json() if item["code"] == code)
+
+
+def _get_movement_type_id(client, code):
+    res = client.get("/api/stock/movement-types")
+    assert res.status_code == 200
+    return next(t["id"] for t in res.json() if t["code"] == code)
+
+
+def test_production_efficiency_compares_recipe_with_consumption(client):
+    product = client.post(
+        "/api/skus",
+        json={
+            "code": f"TEST-EFF-{uuid.uuid4().hex[:6]}",
+            "name": "Producto eficiencia",
+            "sku_type_id": _get_sku_type_id(client, "PT"),
+            "unit": "unit",
+            "is_active": True,
+        },
+    ).json()
+    skus = client.get("/api/skus?include_inactive=true").json()
+    component_id = next(item["id"] for item in skus if item["code"] == "MP-HARINA")
+    res = client.post(
+        "/api/recipes",
+        json={
+            "product_id": product["id"],
+            "name": "Receta eficiencia",
+            "items": [{"component_id": component_id, "quantity": 0.5}],
+            "is_active": True,
+        },
+    )
+    assert res.status_code in (200, 201)
+
+    line_id = client.get("/api/production-lines").json()[0]["id"]
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": product["id"],
+            "deposit_id": 1,
+            "quantity": 4,
+            "movement_type_id": _get_movement_type_id(client, "PRODUCTION"),
+            "production_line_id": line_id,
+        },
+    )
+    assert res.status_code in (200, 201)
+    lot_code = client.get(f"/api/production/lots?sku_id={product['id']}").json()[0]["lot_code"]
+
+    # Consumo extra registrado contra el mismo lote: genera desvío positivo.
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": component_id,
+            "deposit_id": 1,
+            "quantity": 0.5,
+            "movement_type_id": _get_movement_type_id(client, "CONSUMPTION"),
+            "reference": lot_code,
+        },
+    )
+    assert res.status_code in (200, 201)
+
+    res = client.get("/api/reports/production-efficiency", params={"sku_id": product["id"]})
+    assert res.status_code == 200
+    data = res.json()
+
+    assert len(data["lots"]) == 1
+    lot = data["lots"][0]
+    assert lot["lot_code"] == lot_code
+    assert lot["produced_quantity"] == 4
+    assert lot["theoretical_consumption"] == 2
+    assert lot["actual_consumption"] == 2.5
+    assert lot["variance"] == 0.5
+    assert lot["variance_pct"] == 25
+    assert lot["yield_pct"] == 80
+
+    assert [row["sku_id"] for row in data["by_sku"]] == [product["id"]]
+    assert [row["production_line_id"] for row in data["by_line"]] == [line_id]
+    assert data["totals"]["lots"] == 1
+    assert data["totals"]["actual_consumption"] == 2.5
@@ -0,0 +1,115 @@
+import gzip
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from app import worker
+from app.api.routes import _get_owned_report_job_or_404
+from app.core.config import get_settings
+from app.core.report_jobs import MAX_REPORT_JOB_ATTEMPTS, process_pending_report_jobs
+from app.db import engine
+from app.models import ReportJob
+from app.models.common import ReportJobStatus
+
+
+def _insert_running_job(attempts, heartbeat_at):
+    with Session(engine) as session:
+        job = ReportJob(
+            report="stock_movements",
+            format="csv",
+            params={"movement_type_code": f"t-{uuid.uuid4().hex[:8]}"},
+            params_hash=uuid.uuid4().hex,
+            status=ReportJobStatus.RUNNING,
+            started_at=heartbeat_at,
+            heartbeat_at=heartbeat_at,
+            attempts=attempts,
+        )
+        session.add(job)
+        session.commit()
+        return job.id
+
+
+def test_report_job_is_deduplicated_and_produces_file(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(get_settings(), "storage_root", str(tmp_path))
+    # Un código de tipo único evita compartir el trabajo con ejecuciones anteriores.
+    payload = {
+        "report": "stock_movements",
+        "format": "csv",
+        "params": {"movement_type_code": f"t-{uuid.uuid4().hex[:8]}", "sku_id": None},
+    }
+
+    first = client.post("/api/reports/jobs", json=payload)
+    assert first.status_code == 202
+    second = client.post("/api/reports/jobs", json=payload)
+    assert second.status_code == 202
+    assert second.json()["id"] == first.json()["id"]
+    assert first.json()["status"] == "pending"
+
+    process_pending_report_jobs(lambda: Session(engine))
+
+    job = client.get(f"/api/reports/jobs/{first.json()['id']}").json()
+    assert job["status"] == "completed"
+    assert job["row_count"] == 0
+
+    res = client.get(job["download_url"])
+    assert res.status_code == 200
+    header = gzip.decompress(res.content).decode().splitlines()[0]
+    assert header.startswith("id,movement_date,movement_type")
+
+    third = client.post("/api/reports/jobs", json=payload)
+    assert third.json()["id"] != first.json()["id"]
+
+
+def test_report_job_rejects_invalid_params(client):
+    res = client.post(
+        "/api/reports/jobs",
+        json={"report": "merma_events", "params": {"date_from": "not-a-date"}},
+    )
+    assert res.status_code == 422
+
+
+def test_abandoned_running_job_is_reclaimed(monkeypatch, tmp_path):
+    monkeypatch.setattr(get_settings(), "storage_root", str(tmp_path))
+    stale = datetime.utcnow() - timedelta(hours=1)
+    abandoned_id = _insert_running_job(1, stale)
+    exhausted_id = _insert_running_job(MAX_REPORT_JOB_ATTEMPTS, stale)
+    alive_id = _insert_running_job(1, datetime.utcnow())
+
+    process_pending_report_jobs(lambda: Session(engine), lease_seconds=60)
+
+    with Session(engine) as session:
+        abandoned = session.get(ReportJob, abandoned_id)
+        assert abandoned.status == ReportJobStatus.COMPLETED
+        assert abandoned.attempts == 2
+        exhausted = session.get(ReportJob, exhausted_id)
+        assert exhausted.status == ReportJobStatus.FAILED
+        assert exhausted.error
+        alive = session.get(ReportJob, alive_id)
+        assert alive.status == ReportJobStatus.RUNNING
+        # Se cierra para que no bloquee pedidos posteriores con los mismos parámetros.
+        alive.status = ReportJobStatus.FAILED
+        session.add(alive)
+        session.commit()
+
+
+def test_report_job_is_hidden_from_other_users(client):
+    payload = {"report": "stock_movements", "params": {"movement_type_code": f"t-{uuid.uuid4().hex[:8]}"}}
+    job_id = client.post("/api/reports/jobs", json=payload).json()["id"]
+    stranger = SimpleNamespace(id=999, email="otro@local", role_id=None)
+
+    with Session(engine) as session:
+        with pytest.raises(HTTPException) as exc:
+            _get_owned_report_job_or_404(session, job_id, stranger)
+    assert exc.value.status_code == 404
+
+
+def test_standalone_worker_uses_configured_lease(monkeypatch):
+    calls = []
+    monkeypatch.setattr(worker, "process_pending_report_jobs", lambda factory, **kwargs: calls.append(kwargs) or 0)
+    monkeypatch.setattr("sys.argv", ["worker", "--once"])
+    worker.main()
+    assert calls == [{"lease_seconds": get_settings().report_job_lease_seconds}]
@@ -0,0 +1,72 @@
+import pytest
+
+
+def _get_id(client, path, field, value):
+    res = client.get(path)
+    assert res.status_code == 200
+    return next(item["id"] for item in res.json() if item[field] == value)
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/api/orders?destination_deposit_id=1", "/api/shipments", "/api/remitos", "/api/production/lots?deposit_id=1"],
+)
+def test_list_endpoints_answer_304_for_current_validators(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    by_etag = client.get(path, headers={"If-None-Match": etag})
+    assert by_etag.status_code == 304
+    assert by_etag.content == b""
+    assert by_etag.headers["etag"] == etag
+
+    if "last-modified" in first.headers:
+        by_date = client.get(path, headers={"If-Modified-Since": first.headers["last-modified"]})
+        assert by_date.status_code == 304
+
+    # Un ETag distinto manda: aunque la fecha coincida, se responde el listado completo.
+    mismatch = client.get(
+        path, headers={"If-None-Match": 'W/"otro"', "If-Modified-Since": first.headers.get("last-modified", "")}
+    )
+    assert mismatch.status_code == 200
+
+
+def test_stock_levels_validator_changes_after_movement(client):
+    first = client.get("/api/stock-levels")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert client.get("/api/stock-levels", headers={"If-None-Match": etag}).status_code == 304
+
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": _get_id(client, "/api/skus", "code", "MP-HARINA"),
+            "deposit_id": 1,
+            "quantity": 1,
+            "movement_type_id": _get_id(client, "/api/stock/movement-types", "code", "ADJUSTMENT"),
+        },
+    )
+    assert res.status_code in (200, 201)
+
+    refreshed = client.get("/api/stock-levels", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+
+
+@pytest.mark.parametrize("path", ["/api/shipments", "/api/stock-levels", "/api/production/lots?deposit_id=1"])
+def test_validator_changes_after_joined_deposit_rename(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    deposit = next(item for item in client.get("/api/deposits").json() if item["id"] == 1)
+    res = client.put("/api/deposits/1", json={"name": f"{deposit['name']} (renombrado)"})
+    assert res.status_code == 200
+    try:
+        # El listado no cambió sus propias filas, pero el nombre del depósito que expone sí.
+        refreshed = client.get(path, headers={"If-None-Match": etag})
+        assert refreshed.status_code == 200
+        assert refreshed.headers["etag"] != etag
+    finally:
+        client.put("/api/deposits/1", json={"name": deposit["name"]})
@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlmodel import Session, select
+
+from app.core.idempotency import sweep_expired_idempotency_keys
+from app.core.security import create_access_token
+from app.db import engine
+from app.models import IdempotencyKey
+
+
+def _get_id(client, path, field, value):
+    return next(item["id"] for item in client.get(path).json() if item[field] == value)
+
+
+def _movement_payload(client, quantity=1):
+    return {
+        "sku_id": _get_id(client, "/api/skus", "code", "MP-HARINA"),
+        "deposit_id": 1,
+        "quantity": quantity,
+        "movement_type_id": _get_id(client, "/api/stock/movement-types", "code", "ADJUSTMENT"),
+    }
+
+
+def _idempotency_headers(key, sub="1", minutes=30):
+    token = create_access_token({"sub": sub}, expires_delta=timedelta(minutes=minutes))
+    return {"Idempotency-Key": key, "Authorization": f"Bearer {token}"}
+
+
+def _stock_quantity(client, sku_id):
+    levels = client.get("/api/stock-levels").json()
+    return sum(level["quantity"] for level in levels if level["sku_id"] == sku_id and level["deposit_id"] == 1)
+
+
+def test_retry_with_same_key_replays_without_reexecuting(client):
+    payload = _movement_payload(client)
+    headers = _idempotency_headers(f"test-{uuid4()}")
+    before = _stock_quantity(client, payload["sku_id"])
+
+    first = client.post("/api/stock/movements", json=payload, headers=headers)
+    assert first.status_code in (200, 201)
+    assert "idempotent-replayed" not in first.headers
+
+    retry = client.post("/api/stock/movements", json=payload, headers=headers)
+    assert retry.status_code == first.status_code
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert _stock_quantity(client, payload["sku_id"]) == before + 1
+
+    conflict = client.post("/api/stock/movements", json=_movement_payload(client, quantity=2), headers=headers)
+    assert conflict.status_code == 422
+
+
+def test_concurrent_duplicates_execute_once(client):
+    payload = _movement_payload(client)
+    headers = _idempotency_headers(f"test-{uuid4()}")
+    before = _stock_quantity(client, payload["sku_id"])
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        responses = list(
+            executor.map(lambda _: client.post("/api/stock/movements", json=payload, headers=headers), range(3))
+        )
+    assert {response.status_code for response in responses} <= {200, 201}
+    assert len({response.content for response in responses}) == 1
+    assert _stock_quantity(client, payload["sku_id"]) == before + 1
+
+
+def test_key_is_scoped_to_user_across_token_refresh(client):
+    payload = _movement_payload(client)
+    key = f"test-{uuid4()}"
+    before = _stock_quantity(client, payload["sku_id"])
+
+    first = client.post("/api/stock/movements", json=payload, headers=_idempotency_headers(key, minutes=30))
+    assert first.status_code in (200, 201)
+    # Un token renovado del mismo usuario reproduce la respuesta; otro usuario tiene su propio espacio de claves.
+    refreshed = client.post("/api/stock/movements", json=payload, headers=_idempotency_headers(key, minutes=60))
+    assert refreshed.headers["idempotent-replayed"] == "true"
+    other_user = client.post("/api/stock/movements", json=payload, headers=_idempotency_headers(key, sub="2"))
+    assert "idempotent-replayed" not in other_user.headers
+    assert _stock_quantity(client, payload["sku_id"]) == before + 2
+
+
+def test_requests_without_token_are_not_stored(client):
+    payload = _movement_payload(client)
+    key = f"test-{uuid4()}"
+
+    for _ in range(2):
+        res = client.post("/api/stock/movements", json=payload, headers={"Idempotency-Key": key})
+        assert res.status_code in (200, 201)
+        assert "idempotent-replayed" not in res.headers
+    with Session(engine) as session:
+        assert session.exec(select(IdempotencyKey).where(IdempotencyKey.key == key)).first() is None
+
+
+def test_streaming_responses_pass_through(client):
+    supplier = client.post("/api/suppliers", json={"name": f"Proveedor {uuid4().hex[:8]}", "tax_id": uuid4().hex[:11]})
+    deposit = next(deposit for deposit in client.get("/api/deposits").json() if deposit["id"] == 1)
+    content = "\n".join(
+        [
+            "supplier;deposit;document_number;sku_code;quantity;unit;lot_code",
+            f"{supplier.json()['name']};{deposit['name']};IMP-{uuid4().hex[:8]};MP-HARINA;1;kg;IMP-{uuid4().hex[:8]}",
+        ]
+    )
+    key = f"test-{uuid4()}"
+
+    res = client.post(
+        "/api/purchases/receipts/import",
+        files={"file": ("remitos.csv", content.encode(), "text/csv")},
+        headers=_idempotency_headers(key),
+    )
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    assert "idempotent-replayed" not in res.headers
+    with Session(engine) as session:
+        assert session.exec(select(IdempotencyKey).where(IdempotencyKey.key == key)).first() is None
+
+
+def test_sweep_removes_expired_keys():
+    key = f"test-{uuid4()}"
+    with Session(engine) as session:
+        session.add(
+            IdempotencyKey(
+                scope="test",
+                key=key,
+                request_hash="x",
+                status_code=201,
+                response_body=b"{}",
+                expires_at=datetime.utcnow() - timedelta(seconds=1),
+            )
+        )
+        session.commit()
+        assert sweep_expired_idempotency_keys(session) >= 1
+        assert session.exec(select(IdempotencyKey).where(IdempotencyKey.key == key)).first() is None
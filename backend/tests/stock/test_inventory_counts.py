@@ -1,5 +1,11 @@
+import uuid
 from datetime import date
 
+from sqlmodel import Session
+
+from app.db import engine
+from app.models import SemiConversionRule
+
 
 def _get_sku_id(client, code):
     res = client.get("/api/skus")
@@ -65,3 +71,311 @@ def test_inventory_count_flow(client):
     approved = approve_res.json()
     assert approved["status"] == "approved"
     assert approved["items"][0]["stock_movement_id"]
+
+
+def test_inventory_count_items_patch_upserts_and_returns_diff(client):
+    sku_id = _get_sku_id(client, "CUC-PT-24")
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": sku_id,
+            "deposit_id": 1,
+            "quantity": 4,
+            "movement_type_id": _get_movement_type_id(client, "PRODUCTION"),
+            "production_line_id": _get_production_line_id(client),
+        },
+    )
+    assert res.status_code in (200, 201)
+    lot = client.get(f"/api/production/lots?sku_id={sku_id}&deposit_id=1&available_only=true").json()[0]
+
+    count = client.post(
+        "/api/inventory-counts",
+        json={
+            "deposit_id": 1,
+            "items": [{"sku_id": sku_id, "counted_quantity": 1, "production_lot_id": lot["id"]}],
+        },
+    ).json()
+
+    res = client.patch(
+        f"/api/inventory-counts/{count['id']}/items",
+        json={"items": [{"sku_id": sku_id, "production_lot_id": lot["id"], "counted_quantity": 1}]},
+    )
+    assert res.status_code == 200
+    assert res.json()["unchanged"] == 1
+    assert res.json()["updated"] == []
+
+    res = client.patch(
+        f"/api/inventory-counts/{count['id']}/items",
+        json={"items": [{"sku_id": sku_id, "production_lot_id": lot["id"], "counted_quantity": 2}]},
+    )
+    diff = res.json()
+    assert [item["counted_quantity"] for item in diff["updated"]] == [2]
+    assert diff["updated"][0]["difference"] == 2 - lot["remaining_quantity"]
+
+    res = client.patch(
+        f"/api/inventory-counts/{count['id']}/items",
+        json={"items": [{"sku_id": sku_id, "production_lot_id": lot["id"], "remove": True}]},
+    )
+    assert len(res.json()["removed"]) == 1
+    assert client.get(f"/api/inventory-counts/{count['id']}").json()["items"] == []
+
+    res = client.patch(
+        f"/api/inventory-counts/{count['id']}/items",
+        json={"items": [{"sku_id": sku_id, "production_lot_id": lot["id"], "counted_quantity": 5}]},
+    )
+    assert len(res.json()["created"]) == 1
+
+
+def test_inventory_count_items_patch_requires_quantity(client):
+    sku_id = _get_sku_id(client, "CUC-PT-24")
+    lot = client.get(f"/api/production/lots?sku_id={sku_id}&deposit_id=1&available_only=true").json()[0]
+    count = client.post(
+        "/api/inventory-counts",
+        json={"deposit_id": 1, "items": [{"sku_id": sku_id, "counted_quantity": 1, "production_lot_id": lot["id"]}]},
+    ).json()
+
+    res = client.patch(
+        f"/api/inventory-counts/{count['id']}/items",
+        json={"items": [{"sku_id": sku_id, "production_lot_id": lot["id"]}]},
+    )
+    assert res.status_code == 400
+
+
+def test_inventory_count_prefill_and_sheet_export(client, fetch_all_pages):
+    sku_id = _get_sku_id(client, "CUC-PT-24")
+    lots = fetch_all_pages("/api/production/lots", {"deposit_id": 1, "available_only": True})
+    assert lots
+    seed_lot = next(lot for lot in lots if lot["sku_id"] == sku_id)
+
+    count = client.post(
+        "/api/inventory-counts",
+        json={
+            "deposit_id": 1,
+            "items": [{"sku_id": sku_id, "counted_quantity": 0, "production_lot_id": seed_lot["id"]}],
+        },
+    ).json()
+
+    res = client.post(f"/api/inventory-counts/{count['id']}/prefill", json={})
+    assert res.status_code == 200
+    assert res.json()["inserted"] == len(lots) - 1
+
+    items = client.get(f"/api/inventory-counts/{count['id']}").json()["items"]
+    assert len(items) == len(lots)
+    prefilled = [item for item in items if item["production_lot_id"] != seed_lot["id"]]
+    assert all(item["difference"] == 0 for item in prefilled)
+
+    res = client.post(f"/api/inventory-counts/{count['id']}/prefill", json={})
+    assert res.json()["inserted"] == 0
+
+    sheet = client.get(f"/api/inventory-counts/{count['id']}/sheet")
+    assert sheet.status_code == 200
+    lines = sheet.content.decode("utf-8-sig").splitlines()
+    assert lines[0].startswith("item_id,sku_code,sku_name,lot_code")
+    assert len(lines) == len(lots) + 1
+
+
+def test_inventory_count_reconciles_movements_after_snapshot(client):
+    sku_id = _get_sku_id(client, "CUC-PT-24")
+    production_type_id = _get_movement_type_id(client, "PRODUCTION")
+    line_id = _get_production_line_id(client)
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": sku_id,
+            "deposit_id": 1,
+            "quantity": 6,
+            "movement_type_id": production_type_id,
+            "production_line_id": line_id,
+        },
+    )
+    assert res.status_code in (200, 201)
+    lot = client.get(f"/api/production/lots?sku_id={sku_id}&deposit_id=1&available_only=true").json()[0]
+
+    count = client.post(
+        "/api/inventory-counts",
+        json={"deposit_id": 1, "items": [{"sku_id": sku_id, "counted_quantity": 0, "production_lot_id": lot["id"]}]},
+    ).json()
+    assert count["snapshot_movement_id"]
+    snapshot_quantity = count["items"][0]["system_quantity"]
+
+    # Producción registrada mientras se cuenta: no debe alterar el stock al corte de la línea.
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": sku_id,
+            "deposit_id": 1,
+            "quantity": 2,
+            "movement_type_id": production_type_id,
+            "production_line_id": line_id,
+            "production_lot_id": lot["id"],
+        },
+    )
+    assert res.status_code in (200, 201)
+
+    res = client.patch(
+        f"/api/inventory-counts/{count['id']}/items",
+        json={"items": [{"sku_id": sku_id, "production_lot_id": lot["id"], "counted_quantity": snapshot_quantity - 1}]},
+    )
+    item = res.json()["updated"][0]
+    assert item["system_quantity"] == snapshot_quantity
+    assert item["difference"] == -1
+
+    client.post(f"/api/inventory-counts/{count['id']}/submit")
+    approved = client.post(f"/api/inventory-counts/{count['id']}/approve").json()
+    assert approved["items"][0]["expected_quantity"] == snapshot_quantity + 2
+
+    lot_after = client.get(f"/api/production/lots/{lot['id']}").json()
+    assert lot_after["remaining_quantity"] == snapshot_quantity + 2 - 1
+
+
+def test_inventory_count_approval_posts_adjustments_in_bulk(client):
+    sku_id = _get_sku_id(client, "CUC-PT-24")
+    production_type_id = _get_movement_type_id(client, "PRODUCTION")
+    consumption_type_id = _get_movement_type_id(client, "CONSUMPTION")
+    line_id = _get_production_line_id(client)
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": sku_id,
+            "deposit_id": 1,
+            "quantity": 5,
+            "movement_type_id": production_type_id,
+            "production_line_id": line_id,
+        },
+    )
+    assert res.status_code in (200, 201)
+    lot = client.get(f"/api/production/lots?sku_id={sku_id}&deposit_id=1&available_only=true").json()[0]
+
+    count = client.post(
+        "/api/inventory-counts",
+        json={"deposit_id": 1, "items": [{"sku_id": sku_id, "counted_quantity": 0, "production_lot_id": lot["id"]}]},
+    ).json()
+    system_quantity = count["items"][0]["system_quantity"]
+    client.post(f"/api/inventory-counts/{count['id']}/submit")
+
+    # El lote se consume después del corte: el ajuste completo dejaría el saldo negativo y no se registra nada.
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": sku_id,
+            "deposit_id": 1,
+            "quantity": 1,
+            "movement_type_id": consumption_type_id,
+            "production_lot_id": lot["id"],
+        },
+    )
+    assert res.status_code in (200, 201)
+    res = client.post(f"/api/inventory-counts/{count['id']}/approve")
+    assert res.status_code == 400
+    assert client.get(f"/api/inventory-counts/{count['id']}").json()["status"] == "submitted"
+    assert client.get(f"/api/production/lots/{lot['id']}").json()["remaining_quantity"] == system_quantity - 1
+
+    count = client.post(
+        "/api/inventory-counts",
+        json={
+            "deposit_id": 1,
+            "items": [{"sku_id": sku_id, "counted_quantity": system_quantity + 1, "production_lot_id": lot["id"]}],
+        },
+    ).json()
+    assert count["items"][0]["system_quantity"] == system_quantity - 1
+    client.post(f"/api/inventory-counts/{count['id']}/submit")
+    approved = client.post(f"/api/inventory-counts/{count['id']}/approve").json()
+    assert approved["status"] == "approved"
+    item = approved["items"][0]
+    assert item["stock_movement_id"]
+    assert client.get(f"/api/production/lots/{lot['id']}").json()["remaining_quantity"] == system_quantity + 1
+
+    movements = client.get(f"/api/stock/movements?sku_id={sku_id}&deposit_id=1").json()["items"]
+    adjustment = next(movement for movement in movements if movement["id"] == item["stock_movement_id"])
+    assert adjustment["quantity"] == 2
+    assert adjustment["lot_code"] == lot["lot_code"]
+
+
+def test_inventory_count_approval_converts_semi_units_to_kg(client):
+    # CUC-GRANEL es SEMI y se cuenta en unidades; saldos y movimientos se llevan en kg.
+    sku_id = _get_sku_id(client, "CUC-GRANEL")
+    deposit = client.post(
+        "/api/deposits",
+        json={"name": f"TEST-DEPOSIT-{uuid.uuid4().hex[:6]}", "controls_lot": False, "is_active": True},
+    ).json()
+    with Session(engine) as session:
+        rule = SemiConversionRule(sku_id=sku_id, units_per_kg=4)
+        session.add(rule)
+        session.commit()
+        rule_id = rule.id
+    try:
+        count = client.post(
+            "/api/inventory-counts",
+            json={"deposit_id": deposit["id"], "items": [{"sku_id": sku_id, "counted_quantity": 8}]},
+        ).json()
+        assert count["items"][0]["unit"] == "unit"
+        assert count["items"][0]["difference"] == 8
+        client.post(f"/api/inventory-counts/{count['id']}/submit")
+        approved = client.post(f"/api/inventory-counts/{count['id']}/approve").json()
+        assert approved["status"] == "approved"
+    finally:
+        with Session(engine) as session:
+            session.delete(session.get(SemiConversionRule, rule_id))
+            session.commit()
+
+    movements = client.get(f"/api/stock/movements?sku_id={sku_id}&deposit_id={deposit['id']}").json()["items"]
+    assert [movement["quantity"] for movement in movements] == [2]
+    level = next(
+        level
+        for level in client.get("/api/stock-levels").json()
+        if level["sku_id"] == sku_id and level["deposit_id"] == deposit["id"]
+    )
+    assert level["quantity"] == 2
+
+
+def test_inventory_count_prefill_filters_on_snapshot_quantity(client, fetch_all_pages):
+    sku_id = _get_sku_id(client, "CUC-PT-24")
+    production_type_id = _get_movement_type_id(client, "PRODUCTION")
+    adjustment_type_id = _get_movement_type_id(client, "ADJUSTMENT")
+    line_id = _get_production_line_id(client)
+
+    def _lot_ids():
+        return {lot["id"] for lot in fetch_all_pages("/api/production/lots", {"sku_id": sku_id, "deposit_id": 1})}
+
+    def _produce(quantity):
+        before = _lot_ids()
+        res = client.post(
+            "/api/stock/movements",
+            json={
+                "sku_id": sku_id,
+                "deposit_id": 1,
+                "quantity": quantity,
+                "movement_type_id": production_type_id,
+                "production_line_id": line_id,
+            },
+        )
+        assert res.status_code in (200, 201)
+        (lot_id,) = _lot_ids() - before
+        return lot_id
+
+    anchor_lot_id = _produce(1)
+    consumed_lot_id = _produce(5)
+    anchor = {"sku_id": sku_id, "counted_quantity": 0, "production_lot_id": anchor_lot_id}
+    count = client.post("/api/inventory-counts", json={"deposit_id": 1, "items": [anchor]}).json()
+    assert count["snapshot_movement_id"]
+
+    # Después del corte: se consume el lote que existía y entra uno nuevo.
+    res = client.post(
+        "/api/stock/movements",
+        json={
+            "sku_id": sku_id,
+            "deposit_id": 1,
+            "quantity": 5,
+            "is_outgoing": True,
+            "movement_type_id": adjustment_type_id,
+            "production_lot_id": consumed_lot_id,
+        },
+    )
+    assert res.status_code in (200, 201)
+    received_lot_id = _produce(3)
+
+    assert client.post(f"/api/inventory-counts/{count['id']}/prefill", json={}).status_code == 200
+    items = client.get(f"/api/inventory-counts/{count['id']}").json()["items"]
+    items = {item["production_lot_id"]: item for item in items}
+    assert items[consumed_lot_id]["system_quantity"] == 5
+    assert received_lot_id not in items
@@ -1,3 +1,12 @@
+import uuid
+from datetime import date
+
+from sqlmodel import Session
+
+from app.db import engine
+from app.models import LotSequence
+
+
 def _get_sku_id(client, code):
     res = client.get("/api/skus")
     assert res.status_code == 200
@@ -78,6 +87,57 @@ def test_production_requires_line_and_generates_lot(client):
     assert newest_lot["remaining_quantity"] >= valid_payload["quantity"]
 
 
+def test_lot_codes_follow_sequence_counter(client):
+    # Un SKU propio de la corrida garantiza que la secuencia arranque en cero sin depender de datos previos.
+    sku_type_id = next(item["id"] for item in client.get("/api/sku-types").json() if item["code"] == "PT")
+    sku_code = f"TEST-LOT-{uuid.uuid4().hex[:6].upper()}"
+    res = client.post(
+        "/api/skus",
+        json={"code": sku_code, "name": "SKU de secuencia", "sku_type_id": sku_type_id, "unit": "unit"},
+    )
+    assert res.status_code in (200, 201)
+    sku_id = res.json()["id"]
+    movement_type_id = _get_movement_type_id(client, "PRODUCTION")
+    line_id = _get_production_line_id(client)
+    produced_at = date(2001, 1, 1)
+
+    def produce(lot_code=None):
+        payload = {
+            "sku_id": sku_id,
+            "deposit_id": 1,
+            "quantity": 1,
+            "movement_type_id": movement_type_id,
+            "production_line_id": line_id,
+            "movement_date": produced_at.isoformat(),
+        }
+        if lot_code:
+            payload["lot_code"] = lot_code
+        res = client.post("/api/stock/movements", json=payload)
+        assert res.status_code in (200, 201), res.json()
+
+    def lot_exists(lot_code):
+        return len(client.get(f"/api/production/lots?lot_code={lot_code}").json()) == 1
+
+    try:
+        produce()
+        produce()
+        prefix = f"{produced_at:%y%m%d}-L{line_id}-{sku_code}"
+        assert lot_exists(f"{prefix}-001") and lot_exists(f"{prefix}-002")
+        assert not lot_exists(f"{prefix}-003")
+
+        # Un código manual adelanta el contador: la generación siguiente no lo pisa.
+        produce(f"{prefix}-010")
+        produce()
+        assert lot_exists(f"{prefix}-011")
+        assert not lot_exists(f"{prefix}-003")
+    finally:
+        with Session(engine) as session:
+            sequence = session.get(LotSequence, (produced_at, line_id, sku_id))
+            if sequence:
+                session.delete(sequence)
+                session.commit()
+
+
 def test_invalid_lot_code_is_rejected(client):
     sku_id = _get_sku_id(client, "CUC-PT-24")
     movement_type_id = _get_movement_type_id(client, "PRODUCTION")
@@ -44,6 +44,24 @@ async function apiRequest<T>(path: string, options: RequestInit, defaultError: s
   return response.json() as Promise<T>;
 }
 
+// Listados con cursor: sigue X-Next-Cursor hasta traer todas las páginas.
+async function apiRequestAllPages<T>(path: string, defaultError: string, pageSize = 500): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const query = new URLSearchParams({ limit: String(pageSize) });
+    if (cursor) query.set("cursor", cursor);
+    const response = await apiFetch(`${path}${path.includes("?") ? "&" : "?"}${query.toString()}`);
+    if (!response.ok) {
+      const detail = await response.text();
+      throw new ApiError(response.status, detail || defaultError);
+    }
+    items.push(...((await response.json()) as T[]));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return items;
+}
+
 export type UnitOfMeasure = "unit" | "kg" | "g" | "l" | "ml" | "pack" | "box" | "m" | "cm";
 
 export type MermaStage = "PRODUCTION" | "EMPAQUE" | "STOCK" | "TRANSITO_POST_REMITO" | "ADMINISTRATIVA";
@@ -772,7 +790,7 @@ export async function fetchProductionLots(params?: {
   if (params?.available_only) query.set("available_only", "true");
   if (params?.include_blocked) query.set("include_blocked", "true");
   const path = query.toString() ? `/production/lots?${query.toString()}` : "/production/lots";
-  return apiRequest<ProductionLot[]>(path, {}, "No pudimos obtener los lotes");
+  return apiRequestAllPages<ProductionLot>(path, "No pudimos obtener los lotes");
 }
 
 export async function fetchInventoryCounts(params?: {
@@ -1241,7 +1259,10 @@ export async function fetchMermaEvents(params?: {
   if (params?.cause_id) query.append("cause_id", String(params.cause_id));
   if (params?.affects_stock !== undefined) query.append("affects_stock", params.affects_stock ? "true" : "false");
 
-  return apiRequest(`/mermas${query.toString() ? `?${query.toString()}` : ""}`, {}, "No se pudieron obtener las mermas");
+  return apiRequestAllPages<MermaEvent>(
+    `/mermas${query.toString() ? `?${query.toString()}` : ""}`,
+    "No se pudieron obtener las mermas",
+  );
 }
 
 export async function fetchMermaEventDetail(id: number): Promise<MermaEvent> {